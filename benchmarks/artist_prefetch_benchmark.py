@@ -0,0 +1,97 @@
+"""
+Tags a directory of one artist's downloads through the MusicBrainz stand-in, once file by file and once with the artist's
+catalogue prefetched after the first match, and reports the requests each took and whether every file got its recording.
+The user's pick among the search results is stood in for by the recording the file was named after.
+
+Usage: python -m benchmarks.artist_prefetch_benchmark [release_count]
+"""
+import sys
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Dict
+from unittest import mock
+
+from py_common.logging import HoornLogger, LogType
+
+from benchmarks.musicbrainz_stand_in import TRACKS_PER_RELEASE, start_stand_in
+from src.constants import MUSICBRAINZ_RATE_LIMIT_INTERVAL
+from src.genre_detection.genre_algorithm import GenreAlgorithm
+from src.indexing.library_index import LibraryIndex
+from src.metadata.helpers.release_selection_memory import ReleaseSelectionMemory
+from src.metadata.metadata_manipulator import MetadataManipulator
+from src.musicbrainz.musicbrainz_client import MusicBrainzClient
+
+ARTIST_NUMBER: int = 3
+
+
+def _write_downloads(directory: Path, release_count: int) -> Dict[Path, str]:
+	"""Empty files named the way downloads are, mapped to the recording each one is."""
+	directory.mkdir(parents=True)
+	expected: Dict[Path, str] = {}
+
+	for release_number in range(ARTIST_NUMBER, release_count * 10, 10):
+		for track_number in range(1, TRACKS_PER_RELEASE + 1):
+			path = directory.joinpath(f"{track_number:02d} - Artist {ARTIST_NUMBER} - Song {release_number}-{track_number} (Official Audio).flac")
+			path.touch()
+			expected[path] = f"rec-{release_number}-{track_number}"
+
+	return expected
+
+
+def _tag(logger: HoornLogger, port: int, directory: Path, expected: Dict[Path, str], prefetch: bool) -> Dict[Path, str]:
+	from src.handlers.library_file_handler import LibraryFileHandler
+	from src.metadata.metadata_populater import MetadataPopulater
+
+	client = MusicBrainzClient(logger, host="127.0.0.1", port=port, use_https=False, rate_limit_interval=0)
+	with mock.patch("src.handlers.library_file_handler.LibraryIndex", lambda index_logger: LibraryIndex(index_logger, directory.parent.joinpath("index.db"))), \
+		mock.patch("src.metadata.helpers.musicbrainz_api_helper.ReleaseSelectionMemory", lambda memory_logger: ReleaseSelectionMemory(memory_logger, directory.parent.joinpath("selections.json"))):
+		populater = MetadataPopulater(logger, GenreAlgorithm(logger, client), client, LibraryFileHandler(logger), MetadataManipulator(logger), prefetch_artist_catalogues=prefetch)
+
+	tagged: Dict[Path, str] = {}
+	populater._embed_metadata = lambda file, recording_model: tagged.__setitem__(file, recording_model.mbid)
+	populater._musicbrainz_interpreter.choose_best_result = lambda results, file_stem: expected[directory.joinpath(f"{file_stem}.flac")]
+
+	with mock.patch("builtins.input", lambda prompt: f"Artist {ARTIST_NUMBER}"):
+		populater.find_and_embed_metadata(directory)
+
+	client.close()
+	return tagged
+
+
+def _count(requests_by_path: Counter) -> Counter:
+	kinds: Counter = Counter()
+	for path, count in requests_by_path.items():
+		if "query=" in path:
+			kinds["search"] += count
+		elif "artist=" in path:
+			kinds["browse"] += count
+		else:
+			kinds["lookup"] += count
+	return kinds
+
+
+def run(release_count: int = 5) -> None:
+	logger = HoornLogger(min_level=LogType.ERROR)
+	server = start_stand_in()
+
+	for prefetch in (False, True):
+		with tempfile.TemporaryDirectory() as temporary_directory:
+			directory = Path(temporary_directory).joinpath("downloads")
+			expected = _write_downloads(directory, release_count)
+
+			server.requests_by_path.clear()
+			tagged = _tag(logger, server.server_address[1], directory, expected, prefetch)
+			requests = _count(server.requests_by_path)
+			correct = sum(1 for path, recording_id in expected.items() if tagged.get(path) == recording_id)
+
+		total = sum(requests.values())
+		print(f"{'prefetched' if prefetch else 'file by file':12} {correct} of {len(expected)} files tagged correctly; {total:4d} requests "
+		      f"({requests['search']} searches, {requests['lookup']} lookups, {requests['browse']} browse pages), "
+		      f"{total * MUSICBRAINZ_RATE_LIMIT_INTERVAL:5.0f} s at the MusicBrainz rate limit")
+
+	server.shutdown()
+
+
+if __name__ == "__main__":
+	run(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,84 @@
+"""
+Compares the disk usage and processing time of the download codec policies on YouTube-like sources
+(Opus in WebM and AAC in M4A), by running them through the `TranscodePool` exactly like the downloader does.
+Requires FFmpeg on the PATH to generate the sources.
+
+Usage: python -m benchmarks.codec_policy_benchmark [track_count] [seconds_per_track]
+"""
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from py_common.logging import HoornLogger, LogType
+
+from src.constants import FFMPEG_PATH
+from src.downloading.codec_policy import CodecMode, CodecPolicy
+from src.downloading.transcode_pool import TranscodePool
+
+# (extension, yt-dlp codec name, FFmpeg encoder arguments) of the streams YouTube typically serves.
+SOURCES: List[Tuple[str, str, List[str]]] = [
+	(".webm", "opus", ["-c:a", "libopus", "-b:a", "160k"]),
+	(".m4a", "mp4a.40.2", ["-c:a", "aac", "-b:a", "128k"]),
+]
+
+
+def _generate_source(target: Path, seconds: int, encoder_arguments: List[str]) -> None:
+	# A tone over pink noise: noisy enough that FLAC cannot compress it to nothing, like real music.
+	subprocess.run([FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y",
+	                "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+	                "-f", "lavfi", "-i", f"anoisesrc=color=pink:amplitude=0.2:duration={seconds}",
+	                "-filter_complex", "amix=inputs=2", "-ac", "2", "-ar", "48000", *encoder_arguments, str(target)], check=True)
+
+
+def _run_policy(logger: HoornLogger, policy: CodecPolicy, sources: List[Tuple[Path, str]], directory: Path) -> Tuple[float, int]:
+	directory.mkdir()
+	copies = []
+	for source, codec in sources:
+		copy = directory.joinpath(source.name)
+		shutil.copy(source, copy)
+		copies.append((copy, codec))
+
+	start = time.perf_counter()
+	with TranscodePool(logger, policy) as pool:
+		futures = [pool.submit(copy, codec) for copy, codec in copies]
+	results = [Path(future.result()) for future in futures]
+	elapsed = time.perf_counter() - start
+
+	return elapsed, sum(path.stat().st_size for path in results)
+
+
+def run(track_count: int = 8, seconds_per_track: int = 180) -> None:
+	if shutil.which(FFMPEG_PATH) is None:
+		print(f"FFmpeg ({FFMPEG_PATH}) is required for this benchmark.")
+		return
+
+	logger = HoornLogger(min_level=LogType.WARNING)
+	policies = {
+		"keep native": CodecPolicy(CodecMode.KeepNative),
+		"always FLAC": CodecPolicy(CodecMode.AlwaysFlac),
+		"per source (opus native)": CodecPolicy(CodecMode.PerSource, {"opus": CodecMode.KeepNative}),
+	}
+
+	with tempfile.TemporaryDirectory() as directory:
+		root = Path(directory)
+		sources = []
+		for number in range(track_count):
+			extension, codec, encoder_arguments = SOURCES[number % len(SOURCES)]
+			source = root.joinpath(f"track {number}{extension}")
+			_generate_source(source, seconds_per_track, encoder_arguments)
+			sources.append((source, codec))
+
+		source_size = sum(source.stat().st_size for source, _ in sources)
+		print(f"Tracks: {track_count} x {seconds_per_track}s, sources: {source_size / 2 ** 20:.1f} MiB")
+
+		for number, (name, policy) in enumerate(policies.items()):
+			elapsed, size = _run_policy(logger, policy, sources, root.joinpath(f"policy {number}"))
+			print(f"{name:<26} {elapsed:7.2f}s  {size / 2 ** 20:8.1f} MiB  ({size / source_size:.1f}x source size)")
+
+
+if __name__ == "__main__":
+	run(*(int(argument) for argument in sys.argv[1:3]))
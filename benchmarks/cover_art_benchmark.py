@@ -0,0 +1,88 @@
+"""
+Tags synthetic albums (FLAC, Opus, MP3 and M4A) through the MusicBrainz and Cover Art Archive stand-ins,
+and reports how often covers were downloaded, how long tagging took, and whether every file ended up with its cover.
+A second run with a fresh provider shows the on-disk cache serving every release.
+
+Usage: python -m benchmarks.cover_art_benchmark [release_count]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import mutagen
+from mutagen.flac import FLAC
+from py_common.logging import HoornLogger, LogType
+
+from benchmarks.cover_art_stand_in import start_cover_art_stand_in
+from benchmarks.musicbrainz_stand_in import TRACKS_PER_RELEASE, start_stand_in
+from benchmarks.synthetic_library import generate_synthetic_library
+from src.cover_art.cover_art_archive_client import CoverArtArchiveClient
+from src.cover_art.cover_art_cache import CoverArtCache
+from src.cover_art.cover_art_provider import CoverArtProvider
+from src.metadata.helpers.musicbrainz_api_helper import MusicBrainzAPIHelper
+from src.metadata.metadata_manipulator import MetadataManipulator
+from src.musicbrainz.musicbrainz_client import MusicBrainzClient
+
+
+def _has_cover(path: Path) -> bool:
+	file = mutagen.File(str(path))
+	if isinstance(file, FLAC):
+		return len(file.pictures) == 1
+	if path.suffix == ".mp3":
+		return len(file.tags.getall("APIC")) == 1
+	if path.suffix == ".m4a":
+		return len(file.tags.get("covr", [])) == 1
+	return len(file.tags.get("metadata_block_picture", [])) == 1
+
+
+def _tag(logger: HoornLogger, files: List[Path], musicbrainz_port: int, cover_art_port: int, cache_path: Path) -> CoverArtProvider:
+	client = MusicBrainzClient(logger, host="127.0.0.1", port=musicbrainz_port, use_https=False, rate_limit_interval=0)
+	provider = CoverArtProvider(logger, CoverArtArchiveClient(logger, host="127.0.0.1", port=cover_art_port, use_https=False), CoverArtCache(logger, cache_path))
+	helper = MusicBrainzAPIHelper(logger, None, client, provider)
+	manipulator = MetadataManipulator(logger)
+
+	for number, path in enumerate(files):
+		release_number, track_number = divmod(number, TRACKS_PER_RELEASE)
+		model = helper.get_recording_by_id(f"rec-{release_number}-{track_number + 1}", f"rel-{release_number}", genre="Reggae", subgenres="Dub")
+		manipulator.update_metadata_from_dict(path, model.metadata, model.cover_art)
+
+	client.close()
+	return provider
+
+
+def run(release_count: int = 20) -> None:
+	logger = HoornLogger(min_level=LogType.ERROR)
+	musicbrainz = start_stand_in()
+	cover_art = start_cover_art_stand_in()
+
+	with tempfile.TemporaryDirectory() as directory:
+		files = generate_synthetic_library(Path(directory).joinpath("library"), release_count * TRACKS_PER_RELEASE)
+		cache_path = Path(directory).joinpath("cover_art_cache")
+
+		start = time.perf_counter()
+		provider = _tag(logger, files, musicbrainz.server_address[1], cover_art.server_address[1], cache_path)
+		elapsed = time.perf_counter() - start
+
+		releases_with_cover = sum(1 for number in range(release_count) if number % 7 != 0)
+		expected_covers = [number // TRACKS_PER_RELEASE % 7 != 0 for number in range(len(files))]
+		correct = sum(1 for path, expected in zip(files, expected_covers) if _has_cover(path) == expected)
+		front_requests = sum(count for path, count in cover_art.requests_by_path.items() if "/front" in path)
+		cached_images = sum(1 for path in cache_path.joinpath("objects").rglob("*") if path.is_file())
+
+		print(f"Tracks tagged:                      {len(files)} ({release_count} releases, {releases_with_cover} with a cover)")
+		print(f"Cover downloads / archive requests: {provider.downloads} / {front_requests}")
+		print(f"Files with the expected cover:      {correct} of {len(files)}")
+		print(f"Images in the cache:                {cached_images}")
+		print(f"Time to tag:                        {elapsed * 1000 / len(files):.1f} ms per track")
+
+		provider = _tag(logger, files, musicbrainz.server_address[1], cover_art.server_address[1], cache_path)
+		print(f"Cover downloads on a second run:    {provider.downloads}")
+
+	musicbrainz.shutdown()
+	cover_art.shutdown()
+
+
+if __name__ == "__main__":
+	run(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,70 @@
+"""
+Local stand-in for the Cover Art Archive, matching the releases of the MusicBrainz stand-in.
+
+"/release/rel-<n>/front[-<size>]" redirects (like the real archive) to an image path on the same server, which serves
+a solid colour PNG of that size (1500 pixels for the original). Releases whose number is a multiple of 7 have no cover.
+Every request is counted in `server.requests_by_path`.
+"""
+import re
+import struct
+import threading
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ORIGINAL_SIZE: int = 1500
+
+
+def solid_png(size: int, release_number: int) -> bytes:
+	def chunk(kind: bytes, payload: bytes) -> bytes:
+		return struct.pack(">I", len(payload)) + kind + payload + struct.pack(">I", zlib.crc32(kind + payload))
+
+	colour = bytes([release_number * 37 % 256, release_number * 91 % 256, release_number * 13 % 256])
+	rows = b"".join(b"\x00" + colour * size for _ in range(size))
+	header = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)  # 8 bit RGB
+	return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+
+
+class CoverArtStandInHandler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+	disable_nagle_algorithm = True
+
+	def do_GET(self) -> None:
+		with self.server.lock:
+			self.server.requests_by_path[self.path] += 1
+
+		front = re.fullmatch(r"/release/rel-(\d+)/front(?:-(\d+))?", self.path)
+		if front is not None:
+			release_number = int(front.group(1))
+			if release_number % 7 == 0:
+				return self._send(404, b"No cover art found.", "text/plain")
+			self.send_response(307)
+			self.send_header("Location", f"/images/{release_number}-{front.group(2) or ORIGINAL_SIZE}.png")
+			self.send_header("Content-Length", "0")
+			self.end_headers()
+			return
+
+		image = re.fullmatch(r"/images/(\d+)-(\d+)\.png", self.path)
+		if image is not None:
+			return self._send(200, solid_png(int(image.group(2)), int(image.group(1))), "image/png")
+
+		self._send(404, b"Not Found", "text/plain")
+
+	def _send(self, status: int, body: bytes, content_type: str) -> None:
+		self.send_response(status)
+		self.send_header("Content-Type", content_type)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args) -> None:
+		pass
+
+
+def start_cover_art_stand_in() -> ThreadingHTTPServer:
+	"""Starts the stand-in on a free local port in a daemon thread; use `server.server_address[1]` for the port."""
+	server = ThreadingHTTPServer(("127.0.0.1", 0), CoverArtStandInHandler)
+	server.lock = threading.Lock()
+	server.requests_by_path = Counter()
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	return server
@@ -0,0 +1,70 @@
+"""
+Checks the tempo estimate on synthetic drum patterns across 60-190 BPM, and measures analysis speed and
+peak memory while streaming a long track in decoder-sized chunks (decoding itself is FFmpeg's share and not included).
+
+Usage: python -m benchmarks.energy_tempo_benchmark [minutes_of_audio]
+"""
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.analysis.audio_decoder import DEFAULT_CHUNK_SECONDS
+from src.analysis.energy_tempo_meter import EnergyTempoMeter, TEMPO_SAMPLE_RATE
+
+CHUNK_FRAMES: int = int(TEMPO_SAMPLE_RATE * DEFAULT_CHUNK_SECONDS)
+TEMPI = (60, 70, 85, 90, 100, 110, 120, 128, 135, 140, 150, 160, 174, 190)
+
+
+def _drum_pattern(generator: np.random.Generator, bpm: float, seconds: float, level: float = 0.3) -> np.ndarray:
+	"""Decaying noise bursts on every beat over a quiet noise floor."""
+	samples = generator.standard_normal(int(TEMPO_SAMPLE_RATE * seconds)) * 0.01
+	burst_length = 800
+	envelope = np.exp(-np.arange(burst_length) / 150)
+
+	for beat in np.arange(0, seconds, 60 / bpm):
+		start = int(beat * TEMPO_SAMPLE_RATE)
+		length = min(burst_length, len(samples) - start)
+		samples[start:start + length] += level * envelope[:length] * generator.standard_normal(length)
+
+	return samples.astype(np.float32)
+
+
+def _analyze(samples: np.ndarray):
+	meter = EnergyTempoMeter()
+	for start in range(0, len(samples), CHUNK_FRAMES):
+		meter.feed(samples[start:start + CHUNK_FRAMES])
+	return meter.result()
+
+
+def run(minutes: float = 10.0) -> None:
+	generator = np.random.default_rng(43)
+
+	correct = 0
+	for bpm in TEMPI:
+		# Faster patterns are also played harder, so the energy classes have something to tell apart.
+		level = 0.1 + 0.9 * (bpm - TEMPI[0]) / (TEMPI[-1] - TEMPI[0])
+		result = _analyze(_drum_pattern(generator, bpm, 60, level))
+		is_correct = abs(result.bpm - bpm) <= 1
+		correct += is_correct
+		print(f"{bpm:4d} BPM -> {result.bpm:4d} BPM  {result.energy.value:13} (score {result.energy_score:.2f}){'' if is_correct else '  off'}")
+	print(f"Tempo within 1 BPM: {correct} of {len(TEMPI)}")
+
+	track = _drum_pattern(generator, 128, minutes * 60)
+	tracemalloc.start()
+	start = time.perf_counter()
+	meter = EnergyTempoMeter()
+	for chunk_start in range(0, len(track), CHUNK_FRAMES):
+		meter.feed(track[chunk_start:chunk_start + CHUNK_FRAMES])
+	result = meter.result()
+	elapsed = time.perf_counter() - start
+	_, peak_memory = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+
+	print(f"{minutes:.0f} minute track: {result.bpm} BPM, {result.energy.value}, analyzed in {elapsed:.2f} s ({minutes * 60 / elapsed:.0f}x real time on one core)")
+	print(f"Peak memory while analyzing: {peak_memory / 2 ** 20:.1f} MiB (the whole track would be {track.nbytes / 2 ** 20:.1f} MiB)")
+
+
+if __name__ == "__main__":
+	run(float(sys.argv[1]) if len(sys.argv) > 1 else 10.0)
@@ -0,0 +1,59 @@
+"""
+Rescans a synthetic library repeatedly and shows how much of it each rescan has to list and read:
+the first (deep) scan, the steady state of an unchanged library, one newly added album, and a forced deep scan.
+
+Usage: python -m benchmarks.incremental_rescan_benchmark [file_count]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from py_common.logging import HoornLogger, LogType
+
+from benchmarks.synthetic_library import generate_synthetic_library
+from src.indexing.incremental_scan import MTIME_GRANULARITY_SECONDS
+from src.indexing.library_index import LibraryIndex
+
+
+def _rescan(handler, library: Path, name: str, force_deep_scan: bool = False) -> None:
+	# Directories changed within the mtime granularity of a scan are always listed again, so let the clock move on first.
+	time.sleep(MTIME_GRANULARITY_SECONDS)
+
+	start = time.perf_counter()
+	report = handler.rescan_entire_library(library, force_deep_scan)
+	elapsed = time.perf_counter() - start
+
+	print(f"{name:22} {elapsed:7.2f} s  listed {report.listed_directories:6d} dirs, skipped {report.skipped_directories:6d}, "
+	      f"processed {report.changed_files:6d} files, {report.unchanged_files:6d} unchanged")
+
+
+def run(file_count: int = 20000) -> None:
+	logger = HoornLogger(min_level=LogType.ERROR)
+
+	with tempfile.TemporaryDirectory() as directory:
+		root = Path(directory)
+		library = root / "library"
+		generate_synthetic_library(library, file_count, audio_size=4096)
+
+		with mock.patch("src.handlers.library_file_handler.LibraryIndex", lambda index_logger: LibraryIndex(index_logger, root / "index.db")):
+			from src.handlers.library_file_handler import LibraryFileHandler
+			handler = LibraryFileHandler(logger)
+
+		print(f"Files: {file_count}")
+		_rescan(handler, library, "First rescan")
+		# Organizing moved files around, which the next rescan picks up once.
+		_rescan(handler, library, "Settling rescan")
+		_rescan(handler, library, "Unchanged library")
+
+		generate_synthetic_library(root / "new album", 12, audio_size=4096, seed=47)
+		for file in (root / "new album").rglob("*.*"):
+			file.rename(library / file.name)
+		_rescan(handler, library, "One album added")
+
+		_rescan(handler, library, "Forced deep scan", force_deep_scan=True)
+
+
+if __name__ == "__main__":
+	run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,52 @@
+"""
+Measures tag ingestion throughput and the parent's working-set memory per file,
+comparing the process-pool ingestor with the previous pydantic `RecordingModel` list.
+
+Usage: python -m benchmarks.ingestion_benchmark [file_count]
+"""
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+from py_common.logging import HoornLogger, LogType
+
+from benchmarks.synthetic_library import generate_synthetic_library
+from src.metadata.helpers.recording_model import RecordingModel
+from src.metadata.library_ingestor import LibraryIngestor, MEMORY_BUDGET_BYTES_PER_FILE
+from src.metadata.metadata_manipulator import MetadataManipulator
+
+
+def _measure(build: Callable[[], list]) -> Tuple[float, int]:
+	tracemalloc.start()
+	start = time.perf_counter()
+	result = build()
+	elapsed = time.perf_counter() - start
+	retained, _ = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	del result
+	return elapsed, retained
+
+
+def run(file_count: int = 5000) -> None:
+	logger = HoornLogger(min_level=LogType.WARNING)
+	manipulator = MetadataManipulator(logger)
+	ingestor = LibraryIngestor(logger)
+
+	with tempfile.TemporaryDirectory() as directory:
+		paths: List[Path] = generate_synthetic_library(Path(directory), file_count)
+
+		pydantic_time, pydantic_memory = _measure(lambda: [RecordingModel(metadata=manipulator.get_all_metadata(path), path=path) for path in paths])
+		pool_time, pool_memory = _measure(lambda: ingestor.ingest(paths))
+
+	pool_per_file = pool_memory / file_count
+	print(f"Files:                      {file_count}")
+	print(f"RecordingModel (serial):    {pydantic_time:.3f}s, {pydantic_memory / file_count:.0f} bytes/file retained")
+	print(f"LibraryIngestor (pool):     {pool_time:.3f}s, {pool_per_file:.0f} bytes/file retained")
+	print(f"Budget:                     {MEMORY_BUDGET_BYTES_PER_FILE} bytes/file -> {'OK' if pool_per_file <= MEMORY_BUDGET_BYTES_PER_FILE else 'EXCEEDED'}")
+
+
+if __name__ == "__main__":
+	run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,99 @@
+"""
+Drains a shared job queue with one and with several worker processes. The jobs stand in for network-bound work
+(a fixed wait each): per album directory, one job on the directory and several on its files. One worker process dies
+in the middle of a job. Reports the time taken, whether every job finished exactly once, how the dead worker's job
+was recovered, and whether two jobs ever held overlapping paths at the same time.
+
+Usage: python -m benchmarks.job_queue_benchmark [worker_count]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from py_common.logging import HoornLogger, LogType
+
+from src.jobs.job_queue import JobModel, JobQueue
+from src.jobs.queue_worker import QueueWorker
+
+ALBUMS: int = 30
+TRACKS_PER_ALBUM: int = 6
+JOB_SECONDS: float = 0.05
+LEASE_SECONDS: float = 1.0
+JOB_KIND: str = "simulated"
+
+
+def _enqueue(queue_file: Path, root: Path) -> int:
+	job_queue = JobQueue(HoornLogger(min_level=LogType.ERROR), queue_file)
+	jobs = []
+	for album in range(ALBUMS):
+		directory = root.joinpath(f"album-{album}")
+		jobs.append((JOB_KIND, directory, f"directory:{directory}", {}))
+		for track in range(TRACKS_PER_ALBUM):
+			file = directory.joinpath(f"{track:02d}.flac")
+			jobs.append((JOB_KIND, file, f"file:{file}", {"crash": album == 0 and track == 0}))
+
+	queued = job_queue.enqueue_many(jobs)
+	# Queueing the same work again is a no-op.
+	assert job_queue.enqueue_many(jobs) == 0
+	job_queue.close()
+	return queued
+
+
+def _worker(queue_file: Path, audit_file: Path) -> None:
+	def handle(job: JobModel) -> dict:
+		if job.payload.get("crash") and job.attempts == 1:
+			os._exit(1)
+
+		start = time.time()
+		time.sleep(JOB_SECONDS)
+		with open(audit_file, "a", encoding="utf-8") as audit:
+			audit.write(json.dumps([job.id, str(job.path), job.attempts, start, time.time()]) + "\n")
+		return {}
+
+	logger = HoornLogger(min_level=LogType.ERROR)
+	job_queue = JobQueue(logger, queue_file, retry_backoff=0.1)
+	QueueWorker(logger, job_queue, {JOB_KIND: handle}, lease_seconds=LEASE_SECONDS, poll_interval=0.05).run(stop_when_empty=True)
+
+
+def _overlaps(first: str, second: str) -> bool:
+	return first == second or first.startswith(second + os.sep) or second.startswith(first + os.sep)
+
+
+def _conflicts(entries: List[Tuple[int, str, int, float, float]]) -> int:
+	return sum(1 for i, first in enumerate(entries) for second in entries[i + 1:]
+	           if _overlaps(first[1], second[1]) and first[3] < second[4] and second[3] < first[4])
+
+
+def run(worker_count: int = 4) -> None:
+	print(f"Jobs: {ALBUMS * (TRACKS_PER_ALBUM + 1)} of {JOB_SECONDS * 1000:.0f} ms each, lease {LEASE_SECONDS:.0f} s")
+
+	for workers in sorted({1, worker_count}):
+		with tempfile.TemporaryDirectory() as directory:
+			queue_file, audit_file = Path(directory).joinpath("queue.db"), Path(directory).joinpath("audit.jsonl")
+			queued = _enqueue(queue_file, Path(directory).joinpath("library"))
+
+			start = time.perf_counter()
+			processes = [subprocess.Popen([sys.executable, "-m", "benchmarks.job_queue_benchmark", "--worker", str(queue_file), str(audit_file)]) for _ in range(workers + 1)]
+			for process in processes:
+				process.wait()
+			elapsed = time.perf_counter() - start
+
+			entries = [tuple(json.loads(line)) for line in audit_file.read_text(encoding="utf-8").splitlines()]
+			status = JobQueue(HoornLogger(min_level=LogType.ERROR), queue_file).get_status()
+			recovered = [entry for entry in entries if entry[2] > 1]
+
+		finished_once = len(entries) == queued and len({entry[0] for entry in entries}) == queued
+		print(f"{workers} worker(s) (+1 that dies): {elapsed:5.1f} s; {status['done']} of {queued} done, each exactly once: {finished_once}; "
+		      f"dead worker's job finished on attempt {recovered[0][2] if recovered else '-'}; overlapping paths held at once: {_conflicts(entries)}")
+
+
+if __name__ == "__main__":
+	if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+		_worker(Path(sys.argv[2]), Path(sys.argv[3]))
+	else:
+		run(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
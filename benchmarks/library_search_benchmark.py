@@ -0,0 +1,90 @@
+"""
+Times `find` queries (exact, multi-word, prefix and misspelled) on a library index filled with synthetic rows,
+and the cost of keeping the search index up to date when one file changes.
+
+Usage: python -m benchmarks.library_search_benchmark [track_count]
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from py_common.logging import HoornLogger, LogType
+
+from src.indexing.library_index import LibraryIndex
+from src.indexing.library_search import LibrarySearch
+from src.metadata.metadata_manipulator import MetadataKey
+
+SYLLABLES = ["ka", "lo", "mi", "ra", "ve", "du", "sho", "tin", "bel", "gar", "nu", "pe", "zi", "mor", "lan", "qui"]
+GENRES = ["Reggae", "Hip-Hop", "Christian Music", "Rock", "Electronic", "Jazz"]
+TRACKS_PER_ALBUM: int = 12
+QUERY_REPEATS: int = 20
+
+
+def _words(generator: random.Random, count: int) -> List[str]:
+	return ["".join(generator.choice(SYLLABLES) for _ in range(generator.randint(2, 4))) for _ in range(count)]
+
+
+def _fill(index: LibraryIndex, track_count: int, seed: int = 40) -> None:
+	generator = random.Random(seed)
+	vocabulary = _words(generator, 20_000)
+	artists = [" ".join(generator.sample(vocabulary, 2)).title() for _ in range(2_000)]
+	entries = []
+
+	for number in range(track_count):
+		album = number // TRACKS_PER_ALBUM
+		artist = artists[album % len(artists)]
+		entries.append((Path(f"/library/{album}/{number % TRACKS_PER_ALBUM + 1:02d}.flac"), {
+			MetadataKey.Title: " ".join(generator.sample(vocabulary, generator.randint(1, 4))).title(),
+			MetadataKey.Artist: artist,
+			MetadataKey.AlbumArtist: artist,
+			MetadataKey.Album: " ".join(random.Random(album).sample(vocabulary, 2)).title(),
+			MetadataKey.Genre: GENRES[album % len(GENRES)],
+			MetadataKey.MusicBrainzRecordingID: f"rec-{number}",
+		}))
+
+	index.upsert_many(entries)
+
+
+def _time_query(search: LibrarySearch, query: str) -> None:
+	start = time.perf_counter()
+	for _ in range(QUERY_REPEATS):
+		results = search.find(query)
+	elapsed = (time.perf_counter() - start) / QUERY_REPEATS
+
+	best = f"{results[0].artist} - {results[0].title}" if results else "-"
+	print(f"{query!r:32} {len(results):3d} results  {elapsed * 1000:7.2f} ms   best: {best}")
+
+
+def run(track_count: int = 100_000) -> None:
+	logger = HoornLogger(min_level=LogType.WARNING)
+
+	with tempfile.TemporaryDirectory() as directory:
+		index = LibraryIndex(logger, Path(directory).joinpath("index.db"))
+
+		start = time.perf_counter()
+		_fill(index, track_count)
+		print(f"Indexed {track_count} tracks in {time.perf_counter() - start:.1f} s")
+
+		search = LibrarySearch(logger, index)
+		sample_title, sample_artist = index.query(f'SELECT "{MetadataKey.Title.value}", "{MetadataKey.Artist.value}" FROM recordings WHERE path = ?', ("/library/10/03.flac",))[0]
+		title_word = sample_title.split()[0]
+		artist_word = sample_artist.split()[0]
+		misspelled = title_word[:2] + title_word[3:]
+
+		_time_query(search, title_word)
+		_time_query(search, f"{artist_word} {title_word}")
+		_time_query(search, title_word[:4])
+		_time_query(search, misspelled)
+		_time_query(search, "reggae")
+
+		start = time.perf_counter()
+		index.upsert(Path("/library/10/03.flac"), {MetadataKey.Title: "Retagged Title", MetadataKey.Artist: sample_artist})
+		print(f"Incremental update of one file: {(time.perf_counter() - start) * 1000:.2f} ms")
+		_time_query(search, "retagged")
+
+
+if __name__ == "__main__":
+	run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
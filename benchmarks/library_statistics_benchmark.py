@@ -0,0 +1,66 @@
+"""
+Times the `stats` queries on a library index filled with synthetic rows (no audio files are needed).
+
+Usage: python -m benchmarks.library_statistics_benchmark [track_count]
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from py_common.logging import HoornLogger, LogType
+
+from src.indexing.library_index import LibraryIndex
+from src.indexing.library_statistics import LibraryStatistics
+from src.metadata.metadata_manipulator import MetadataKey
+
+GENRES = ["Reggae", "Hip-Hop", "Christian Music", "Rock", "Electronic", "Jazz", "No Genre", ""]
+TRACKS_PER_ALBUM: int = 12
+
+
+def _fill(index: LibraryIndex, track_count: int, seed: int = 94) -> None:
+	generator = random.Random(seed)
+	entries = []
+
+	for number in range(track_count):
+		album = number // TRACKS_PER_ALBUM
+		track = number % TRACKS_PER_ALBUM + 1
+		if generator.random() < 0.02:
+			continue  # Leave some gaps in the albums.
+
+		genre = generator.choice(GENRES)
+		entries.append((Path(f"/library/{album}/{track:02d}.flac"), {
+			MetadataKey.Title: f"Track {number}",
+			MetadataKey.Artist: f"Artist {album % 500}",
+			MetadataKey.AlbumArtist: f"Artist {album % 500}",
+			MetadataKey.Album: f"Album {album}",
+			MetadataKey.Genre: genre + (";Dub" if genre == "Reggae" else ""),
+			MetadataKey.TrackNumber: str(track),
+			MetadataKey.DiscNumber: "1",
+			MetadataKey.Date: "2001-02-03",
+		}))
+
+	index.upsert_many(entries)
+
+
+def run(track_count: int = 100_000) -> None:
+	logger = HoornLogger(min_level=LogType.WARNING)
+
+	with tempfile.TemporaryDirectory() as directory:
+		index = LibraryIndex(logger, Path(directory).joinpath("index.db"))
+		_fill(index, track_count)
+
+		start = time.perf_counter()
+		statistics = LibraryStatistics(logger, index).collect()
+		elapsed = time.perf_counter() - start
+
+	print(f"Tracks in index:             {statistics.total_tracks}")
+	print(f"Missing genre:               {statistics.missing_by_key[MetadataKey.Genre.value]}")
+	print(f"Main genres:                 {len(statistics.genre_distribution)}")
+	print(f"Albums with track gaps:      {len(statistics.albums_with_track_gaps)}")
+	print(f"Time to collect statistics:  {elapsed * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+	run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
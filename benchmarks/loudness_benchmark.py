@@ -0,0 +1,54 @@
+"""
+Checks the loudness meter against EBU Tech 3341 reference signals and measures how much faster than real time
+it processes decoded audio (decoding itself is FFmpeg's share and not included).
+
+Usage: python -m benchmarks.loudness_benchmark [minutes_of_audio]
+"""
+import sys
+import time
+
+import numpy as np
+
+from src.analysis.audio_decoder import ANALYSIS_SAMPLE_RATE, DEFAULT_CHUNK_SECONDS
+from src.analysis.loudness_meter import LoudnessMeter
+
+CHUNK_FRAMES: int = int(ANALYSIS_SAMPLE_RATE * DEFAULT_CHUNK_SECONDS)
+
+
+def _sine(level_dbfs: float, seconds: float, channels: int = 2) -> np.ndarray:
+	t = np.arange(int(ANALYSIS_SAMPLE_RATE * seconds)) / ANALYSIS_SAMPLE_RATE
+	tone = 10 ** (level_dbfs / 20) * np.sin(2 * np.pi * 1000 * t)
+	return np.repeat(tone[:, None], channels, axis=1).astype(np.float32)
+
+
+def _measure(samples: np.ndarray) -> LoudnessMeter:
+	meter = LoudnessMeter(samples.shape[1])
+	for start in range(0, len(samples), CHUNK_FRAMES):
+		meter.feed(samples[start:start + CHUNK_FRAMES])
+	return meter
+
+
+def run(minutes: float = 10.0) -> None:
+	# EBU Tech 3341 cases 1-3: all should measure -23.0 +- 0.1 LUFS.
+	references = {
+		"1 kHz sine at -23 dBFS": _sine(-23, 20),
+		"1 kHz sine at -33 dBFS, +10 dB": _sine(-33, 20) * np.float32(10 ** (10 / 20)),
+		"-36 / -23 / -36 dBFS (gating)": np.concatenate((_sine(-36, 10), _sine(-23, 60), _sine(-36, 10))),
+	}
+	for name, samples in references.items():
+		print(f"{name:34} {_measure(samples).integrated_loudness():7.2f} LUFS (expected -23.00)")
+
+	generator = np.random.default_rng(42)
+	noise = (generator.standard_normal((int(ANALYSIS_SAMPLE_RATE * 60 * minutes), 2)) * 0.1).astype(np.float32)
+
+	start = time.perf_counter()
+	meter = _measure(noise)
+	loudness = meter.integrated_loudness()
+	elapsed = time.perf_counter() - start
+
+	print(f"{minutes:.0f} minutes of stereo noise:         {loudness:7.2f} LUFS, peak {meter.peak:.3f}")
+	print(f"Measured in {elapsed:.2f} s ({minutes * 60 / elapsed:.0f}x real time on one core)")
+
+
+if __name__ == "__main__":
+	run(float(sys.argv[1]) if len(sys.argv) > 1 else 10.0)
@@ -0,0 +1,132 @@
+"""
+Local HTTP/1.1 stand-in for the parts of the MusicBrainz JSON web service this tool uses.
+Serves deterministic fake recordings and releases, so the client layer can be exercised without network access.
+
+Every release "rel-<n>" holds 12 recordings "rec-<n>-<track>" by artist "art-<n % 10>". Browsing an artist's releases
+or recordings covers the releases numbered below `BROWSABLE_RELEASES`. Every request is counted in `server.requests_by_path`.
+"""
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+TRACKS_PER_RELEASE: int = 12
+BROWSABLE_RELEASES: int = 200
+
+
+def _artist_credit(release_number: int) -> list:
+	artist_id = f"art-{release_number % 10}"
+	return [{"name": f"Artist {release_number % 10}", "joinphrase": "", "artist": {"id": artist_id, "name": f"Artist {release_number % 10}", "sort-name": f"Artist {release_number % 10}"}}]
+
+
+def _split_recording_id(recording_id: str) -> Tuple[int, int]:
+	_, release_number, track_number = recording_id.split("-")
+	return int(release_number), int(track_number)
+
+
+def fake_recording(recording_id: str) -> Dict[str, Any]:
+	release_number, track_number = _split_recording_id(recording_id)
+	return {
+		"id": recording_id,
+		"title": f"Song {release_number}-{track_number}",
+		"length": 180000 + track_number * 1000,
+		"artist-credit": _artist_credit(release_number),
+		"releases": [{"id": f"rel-{release_number}", "title": f"Album {release_number}", "date": "2001-02-03", "status": "Official",
+		              "release-group": {"id": f"rg-{release_number}", "title": f"Album {release_number}", "primary-type": "Album"}}],
+		"tags": [{"name": "reggae", "count": 3}, {"name": "dub", "count": 1}],
+	}
+
+
+def fake_release(release_id: str) -> Dict[str, Any]:
+	release_number = int(release_id.split("-")[1])
+	tracks = []
+	for track_number in range(1, TRACKS_PER_RELEASE + 1):
+		recording = fake_recording(f"rec-{release_number}-{track_number}")
+		tracks.append({"id": f"trk-{release_number}-{track_number}", "position": track_number, "number": str(track_number),
+		               "title": recording["title"], "length": recording["length"], "recording": {key: recording[key] for key in ("id", "title", "length", "artist-credit")}})
+
+	return {
+		"id": release_id,
+		"title": f"Album {release_number}",
+		"date": "2001-02-03",
+		"artist-credit": _artist_credit(release_number),
+		"release-group": {"id": f"rg-{release_number}", "title": f"Album {release_number}", "primary-type": "Album"},
+		"media": [{"position": 1, "format": "CD", "track-count": TRACKS_PER_RELEASE, "tracks": tracks}],
+		"tags": [],
+	}
+
+
+def _browse_page(entity: str, items: List[Dict[str, Any]], query: Dict[str, List[str]]) -> Dict[str, Any]:
+	offset = int(query.get("offset", ["0"])[0])
+	limit = int(query.get("limit", ["25"])[0])
+	return {f"{entity}-count": len(items), f"{entity}-offset": offset, f"{entity}s": items[offset:offset + limit]}
+
+
+def _browse(entity: str, query: Dict[str, List[str]]) -> Dict[str, Any]:
+	artist_id = query.get("artist", [None])[0]
+	release_numbers = [number for number in range(BROWSABLE_RELEASES) if f"art-{number % 10}" == artist_id]
+
+	if entity == "release":
+		return _browse_page(entity, [fake_release(f"rel-{number}") for number in release_numbers], query)
+
+	recordings = []
+	for number in release_numbers:
+		for track_number in range(1, TRACKS_PER_RELEASE + 1):
+			recording = fake_recording(f"rec-{number}-{track_number}")
+			del recording["releases"]
+			recordings.append(recording)
+	return _browse_page(entity, recordings, query)
+
+
+class MusicBrainzStandInHandler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+	disable_nagle_algorithm = True
+
+	def do_GET(self) -> None:
+		with self.server.lock:
+			self.server.requests_by_path[self.path] += 1
+
+		url = urlparse(self.path)
+		parts = url.path.strip("/").split("/")
+		query = parse_qs(url.query)
+
+		if parts[:2] != ["ws", "2"] or len(parts) < 3:
+			return self._send(404, {"error": "Not Found"})
+
+		entity = parts[2]
+		try:
+			if entity == "recording" and len(parts) == 4:
+				return self._send(200, fake_recording(parts[3]))
+			if entity == "release" and len(parts) == 4:
+				return self._send(200, fake_release(parts[3]))
+			if entity == "recording" and "query" in query:
+				recordings = [fake_recording(f"rec-{number}-1") for number in range(3)]
+				return self._send(200, {"count": len(recordings), "offset": 0, "recordings": [dict(recording, score=100) for recording in recordings]})
+			if entity in ("release", "recording") and len(parts) == 3 and ("artist" in query or "track_artist" in query):
+				return self._send(200, _browse(entity, query))
+		except (ValueError, IndexError):
+			return self._send(400, {"error": "Invalid mbid."})
+
+		self._send(404, {"error": "Not Found"})
+
+	def _send(self, status: int, payload: Dict[str, Any]) -> None:
+		body = json.dumps(payload).encode("utf-8")
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args) -> None:
+		pass
+
+
+def start_stand_in(handler=MusicBrainzStandInHandler) -> ThreadingHTTPServer:
+	"""Starts the stand-in on a free local port in a daemon thread; use `server.server_address[1]` for the port."""
+	server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+	server.lock = threading.Lock()
+	server.requests_by_path = Counter()
+	threading.Thread(target=server.serve_forever, daemon=True).start()
+	return server
@@ -0,0 +1,64 @@
+"""
+Measures the per-request latency saved by the keep-alive `MusicBrainzClient` compared to opening a new connection
+for every call (which is what musicbrainzngs does through urllib), against the local MusicBrainz stand-in.
+
+Usage: python -m benchmarks.musicbrainz_transport_benchmark [request_count]
+"""
+import asyncio
+import json
+import sys
+import time
+import urllib.request
+
+from py_common.logging import HoornLogger, LogType
+
+from benchmarks.musicbrainz_stand_in import start_stand_in
+from src.musicbrainz.async_musicbrainz_client import AsyncMusicBrainzClient
+from src.musicbrainz.musicbrainz_client import MusicBrainzClient
+
+
+def _connection_per_request(port: int, request_count: int) -> float:
+	start = time.perf_counter()
+	for number in range(request_count):
+		url = f"http://127.0.0.1:{port}/ws/2/recording/rec-{number}-1?inc=artists+releases+tags&fmt=json"
+		with urllib.request.urlopen(url) as response:
+			json.loads(response.read())
+	return (time.perf_counter() - start) / request_count
+
+
+def _pooled(client: MusicBrainzClient, request_count: int) -> float:
+	start = time.perf_counter()
+	for number in range(request_count):
+		client.get_recording_by_id(f"rec-{number}-1", includes=["artists", "releases", "tags"])
+	return (time.perf_counter() - start) / request_count
+
+
+async def _pooled_async(client: AsyncMusicBrainzClient, request_count: int) -> float:
+	start = time.perf_counter()
+	await asyncio.gather(*(client.get_recording_by_id(f"rec-{number}-1", includes=["artists"]) for number in range(request_count)))
+	return (time.perf_counter() - start) / request_count
+
+
+def run(request_count: int = 500) -> None:
+	server = start_stand_in()
+	port = server.server_address[1]
+	logger = HoornLogger(min_level=LogType.WARNING)
+	client = MusicBrainzClient(logger, host="127.0.0.1", port=port, use_https=False, rate_limit_interval=0)
+
+	try:
+		fresh = _connection_per_request(port, request_count)
+		pooled = _pooled(client, request_count)
+		pooled_async = asyncio.run(_pooled_async(AsyncMusicBrainzClient(client), request_count))
+	finally:
+		client.close()
+		server.shutdown()
+
+	print(f"Requests:                   {request_count}")
+	print(f"New connection per request: {fresh * 1000:.3f} ms/request")
+	print(f"Keep-alive pool:            {pooled * 1000:.3f} ms/request ({client.connection_pool.connections_opened} connections opened in total)")
+	print(f"Keep-alive pool (asyncio):  {pooled_async * 1000:.3f} ms/request")
+	print(f"Saved per request:          {(fresh - pooled) * 1000:.3f} ms (local loopback, no TLS; remote TLS setup typically costs 2-3 round trips more)")
+
+
+if __name__ == "__main__":
+	run(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,104 @@
+"""
+Organizes a synthetic library with the streaming pipeline and with the previous approach (scan everything, read every tag,
+then move), each in a fresh process, and reports peak RSS, the time until the first file was moved and the total time.
+
+Usage: python -m benchmarks.organize_memory_benchmark [file_count]
+"""
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from py_common.logging import HoornLogger, LogType
+
+from benchmarks.synthetic_library import generate_synthetic_library
+
+# Small payloads keep 100k files at about a gigabyte; tag reading and moving do not depend on the audio size.
+AUDIO_SIZE: int = 4096
+MODES = ("all-at-once", "streaming")
+
+
+def _organize_all_at_once(handler, directory: Path, organized: Path) -> None:
+	"""The previous `organize_files`: the whole library is scanned and read into one table before anything moves."""
+	from src.metadata.helpers.library_table import LibraryTable
+
+	records = handler._library_ingestor.ingest(handler.get_music_files(directory))
+	correct_metadata_files, missing_metadata_files = handler._missing_metadata_finder.split_by_completeness(LibraryTable.from_records(records))
+
+	for file in correct_metadata_files.iterate_recording_models():
+		handler._place_accurate_file(file.path, file, organized)
+	for file in missing_metadata_files.iterate_recording_models():
+		handler._place_inaccurate_file(file.path, file, organized)
+
+
+def _peak_rss_mib() -> float:
+	# ru_maxrss survives execve on Linux, so a child started by a large parent would report the parent's peak; VmHWM is this process's own.
+	try:
+		for line in Path("/proc/self/status").read_text().splitlines():
+			if line.startswith("VmHWM:"):
+				return int(line.split()[1]) / 1024
+	except OSError:
+		pass
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _child(mode: str, directory: Path, organized: Path, index_file: Path) -> None:
+	from src.indexing.library_index import LibraryIndex
+
+	logger = HoornLogger(min_level=LogType.ERROR)
+	with mock.patch("src.handlers.library_file_handler.LibraryIndex", lambda index_logger: LibraryIndex(index_logger, index_file)):
+		from src.handlers.library_file_handler import LibraryFileHandler
+		handler = LibraryFileHandler(logger)
+
+	first_move = []
+	place_accurate, place_inaccurate = handler._place_accurate_file, handler._place_inaccurate_file
+
+	def timed(place):
+		def wrapper(*args):
+			if not first_move:
+				first_move.append(time.perf_counter())
+			place(*args)
+		return wrapper
+
+	handler._place_accurate_file, handler._place_inaccurate_file = timed(place_accurate), timed(place_inaccurate)
+
+	start = time.perf_counter()
+	if mode == "streaming":
+		handler.organize_files(handler.iterate_music_files(directory), organized)
+	else:
+		_organize_all_at_once(handler, directory, organized)
+	elapsed = time.perf_counter() - start
+
+	print(json.dumps({
+		"peak_rss_mib": _peak_rss_mib(),
+		"worker_peak_rss_mib": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+		"first_move_seconds": first_move[0] - start if first_move else None,
+		"total_seconds": elapsed,
+	}))
+
+
+def run(file_count: int = 100_000) -> None:
+	print(f"Files: {file_count}")
+
+	for mode in MODES:
+		with tempfile.TemporaryDirectory() as directory:
+			root = Path(directory)
+			generate_synthetic_library(root / "downloads", file_count, audio_size=AUDIO_SIZE)
+
+			output = subprocess.run([sys.executable, "-m", "benchmarks.organize_memory_benchmark", "--child", mode, str(root / "downloads"), str(root / "organized"), str(root / "index.db")],
+			                        capture_output=True, text=True, check=True).stdout
+			result = json.loads(output.strip().splitlines()[-1])
+
+		print(f"{mode:12} peak RSS {result['peak_rss_mib']:7.1f} MiB (pool workers {result['worker_peak_rss_mib']:6.1f} MiB), "
+		      f"first move after {result['first_move_seconds']:7.2f} s, done in {result['total_seconds']:7.1f} s")
+
+
+if __name__ == "__main__":
+	if len(sys.argv) > 1 and sys.argv[1] == "--child":
+		_child(sys.argv[2], Path(sys.argv[3]), Path(sys.argv[4]), Path(sys.argv[5]))
+	else:
+		run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
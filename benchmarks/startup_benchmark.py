@@ -0,0 +1,72 @@
+"""
+Measures how long the CLI takes to show its first prompt, and lists the slowest imports on the way there
+(from `python -X importtime`), to keep heavy dependencies out of start-up.
+
+Usage: python -m benchmarks.startup_benchmark [runs]
+"""
+import os
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+from src.constants import ROOT
+
+# Time to first prompt the CLI should stay under, measured on a warm file system cache.
+TARGET_SECONDS_TO_PROMPT: float = 0.3
+
+# Imports that should only happen once a command needs them.
+DEFERRED_MODULES: List[str] = ["yt_dlp", "musicbrainzngs", "mutagen", "numpy"]
+
+
+def _time_to_first_prompt() -> float:
+	start = time.perf_counter()
+	process = subprocess.Popen([sys.executable, "-m", "src.app"], cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+	output = b""
+	while b">>> " not in output:
+		chunk = os.read(process.stdout.fileno(), 4096)
+		if not chunk:
+			raise RuntimeError("The CLI exited before showing a prompt.")
+		output += chunk
+
+	elapsed = time.perf_counter() - start
+	process.kill()
+	process.wait()
+	return elapsed
+
+
+def _import_times() -> List[Tuple[str, int, int]]:
+	"""Returns (module, nesting depth, cumulative microseconds) for every import made while loading the app."""
+	completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "import src.app"], cwd=ROOT, capture_output=True, text=True, check=True)
+
+	times = []
+	for line in completed.stderr.splitlines():
+		if not line.startswith("import time:") or "cumulative" in line:
+			continue
+		_, cumulative, name = line[len("import time:"):].split("|")
+		depth = (len(name) - len(name.lstrip()) - 1) // 2
+		times.append((name.strip(), depth, int(cumulative)))
+
+	return times
+
+
+def run(runs: int = 5) -> None:
+	import_times = _import_times()
+	loaded = {name for name, _, _ in import_times}
+	direct = sorted(((name, cumulative) for name, depth, cumulative in import_times if depth == 1), key=lambda item: item[1], reverse=True)
+
+	print("Slowest imports made by src.app:")
+	for name, cumulative in direct[:10]:
+		print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+	eager = [module for module in DEFERRED_MODULES if module in loaded]
+	print(f"Heavy modules imported at start-up: {', '.join(eager) if eager else 'none'}")
+
+	timings = sorted(_time_to_first_prompt() for _ in range(runs))
+	median = timings[len(timings) // 2]
+	print(f"Time to first prompt: {median * 1000:.0f} ms median over {runs} runs (target {TARGET_SECONDS_TO_PROMPT * 1000:.0f} ms) - {'OK' if median <= TARGET_SECONDS_TO_PROMPT else 'TOO SLOW'}")
+
+
+if __name__ == "__main__":
+	run(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,162 @@
+"""
+Generates a synthetic music library for the benchmarks.
+
+The files only contain valid container headers, tags and zeroed audio payload; they are not playable,
+but every tag reader (ours and mutagen) treats them exactly like the real thing.
+"""
+import random
+import struct
+from pathlib import Path
+from typing import Dict, List
+
+from mutagen.easyid3 import EasyID3
+from mutagen.easymp4 import EasyMP4
+from mutagen.flac import FLAC
+from mutagen.oggopus import OggOpus
+
+GENRES: List[str] = ["Reggae", "Hip-Hop", "Christian Music", "No Genre"]
+EXTENSIONS: List[str] = [".flac", ".opus", ".mp3", ".m4a"]
+
+
+def _flac_skeleton(audio_size: int) -> bytes:
+	# STREAMINFO: 4096 sample blocks, 44.1kHz, stereo, 16 bit, 10 seconds of samples.
+	stream_info = struct.pack(">HH", 4096, 4096) + b"\x00" * 6
+	stream_info += ((44100 << 44) | (1 << 41) | (15 << 36) | 441000).to_bytes(8, "big")
+	stream_info += b"\x00" * 16
+	padding = b"\x00" * 1024
+
+	return (b"fLaC"
+		+ bytes([0]) + len(stream_info).to_bytes(3, "big") + stream_info
+		+ bytes([0x80 | 1]) + len(padding).to_bytes(3, "big") + padding
+		+ b"\xff\xf8" + b"\x00" * audio_size)
+
+
+def _ogg_crc(data: bytes) -> int:
+	crc = 0
+	for byte in data:
+		crc ^= byte << 24
+		for _ in range(8):
+			crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else crc << 1
+			crc &= 0xFFFFFFFF
+	return crc
+
+
+def _ogg_page(packet: bytes, sequence: int, header_type: int, granule: int) -> bytes:
+	lacing = bytes([255] * (len(packet) // 255) + [len(packet) % 255])
+	header = struct.pack("<4sBBqIIIB", b"OggS", 0, header_type, granule, 0x5EED, sequence, 0, len(lacing)) + lacing
+	page = header + packet
+	return page[:22] + struct.pack("<I", _ogg_crc(page)) + page[26:]
+
+
+def _opus_skeleton(audio_size: int) -> bytes:
+	head = b"OpusHead" + struct.pack("<BBHIhB", 1, 2, 312, 48000, 0, 0)
+	tags = b"OpusTags" + struct.pack("<I", 4) + b"test" + struct.pack("<I", 0)
+
+	pages = _ogg_page(head, 0, 0x02, 0) + _ogg_page(tags, 1, 0x00, 0)
+	chunk = b"\xfc" + b"\x00" * 250
+	sequence = 2
+	written = 0
+	while written < audio_size:
+		written += len(chunk)
+		header_type = 0x04 if written >= audio_size else 0x00
+		pages += _ogg_page(chunk, sequence, header_type, 48000 * sequence)
+		sequence += 1
+
+	return pages
+
+
+def _mp3_skeleton(audio_size: int) -> bytes:
+	# MPEG-1 Layer III, 128 kbps, 44.1kHz: 417 byte frames.
+	frame = b"\xff\xfb\x90\x64" + b"\x00" * 413
+	return frame * max(audio_size // len(frame), 4)
+
+
+def _mp4_atom(name: bytes, payload: bytes) -> bytes:
+	return struct.pack(">I4s", len(payload) + 8, name) + payload
+
+
+def _mp4_skeleton(audio_size: int) -> bytes:
+	mvhd = struct.pack(">B3xIIII", 0, 0, 0, 1000, 10000) + b"\x00" * 80
+	return (_mp4_atom(b"ftyp", b"M4A \x00\x00\x00\x00M4A mp42isom")
+		+ _mp4_atom(b"moov", _mp4_atom(b"mvhd", mvhd))
+		+ _mp4_atom(b"mdat", b"\x00" * audio_size))
+
+
+SKELETONS = {
+	".flac": _flac_skeleton,
+	".opus": _opus_skeleton,
+	".mp3": _mp3_skeleton,
+	".m4a": _mp4_skeleton,
+}
+
+
+def _tags_for(index: int, rng: random.Random) -> Dict[str, str]:
+	album = index // 12
+	return {
+		"title": f"Track {index} Title",
+		"artist": f"Artist {album % 97}",
+		"album": f"Album {album}",
+		"albumartist": f"Artist {album % 97}",
+		"genre": rng.choice(GENRES),
+		"tracknumber": str(index % 12 + 1),
+		"discnumber": "1",
+		"date": f"{1970 + album % 50}-01-01",
+	}
+
+
+def _write_tags(path: Path, tags: Dict[str, str]) -> None:
+	suffix = path.suffix
+	if suffix == ".flac":
+		file = FLAC(path)
+	elif suffix == ".opus":
+		file = OggOpus(path)
+	elif suffix == ".mp3":
+		file = EasyID3()
+	else:
+		file = EasyMP4(path)
+
+	for key, value in tags.items():
+		file[key] = value
+
+	if suffix in (".flac", ".opus"):
+		file["year"] = tags["date"][:4]
+		file["grouping"] = "No Energy"
+		file["description"] = "Subgenres: "
+
+	if suffix == ".mp3":
+		file.save(path)
+	else:
+		file.save()
+
+
+def generate_synthetic_library(root: Path, file_count: int, audio_size: int = 64 * 1024, extensions: List[str] = None, seed: int = 94) -> List[Path]:
+	"""
+	Generates `file_count` tagged files below `root`, spread over album directories of 12 tracks.
+	"""
+	if extensions is None:
+		extensions = EXTENSIONS
+
+	rng = random.Random(seed)
+	skeletons = {extension: SKELETONS[extension](audio_size) for extension in extensions}
+	paths: List[Path] = []
+
+	for index in range(file_count):
+		extension = extensions[index % len(extensions)]
+		tags = _tags_for(index, rng)
+
+		path = root / tags["genre"] / tags["album"] / f"{tags['tracknumber'].zfill(2)} - {tags['title']}{extension}"
+		path.parent.mkdir(parents=True, exist_ok=True)
+		path.write_bytes(skeletons[extension])
+		_write_tags(path, tags)
+		paths.append(path)
+
+	return paths
+
+
+if __name__ == "__main__":
+	import sys
+
+	target = Path(sys.argv[1]) if len(sys.argv) > 1 else Path("synthetic_library")
+	count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+	generated = generate_synthetic_library(target, count)
+	print(f"Generated {len(generated)} files in {target}")
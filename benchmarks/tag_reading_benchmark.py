@@ -0,0 +1,46 @@
+"""
+Compares the header-only tag reader against the full mutagen load used by `MetadataManipulator.get_all_metadata`.
+
+Usage: python -m benchmarks.tag_reading_benchmark [file_count]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from py_common.logging import HoornLogger, LogType
+
+from benchmarks.synthetic_library import generate_synthetic_library
+from src.metadata.metadata_manipulator import MetadataManipulator
+
+
+def _time_reads(manipulator: MetadataManipulator, paths: List[Path], rounds: int) -> float:
+	start = time.perf_counter()
+	for _ in range(rounds):
+		for path in paths:
+			manipulator.get_all_metadata(path)
+	return (time.perf_counter() - start) / rounds
+
+
+def run(file_count: int = 2000, rounds: int = 3) -> None:
+	logger = HoornLogger(min_level=LogType.WARNING)
+	fast = MetadataManipulator(logger)
+	full = MetadataManipulator(logger, use_fast_tag_reader=False)
+
+	with tempfile.TemporaryDirectory() as directory:
+		paths = generate_synthetic_library(Path(directory), file_count)
+
+		mismatches = [path for path in paths if fast.get_all_metadata(path) != full.get_all_metadata(path)]
+		fast_time = _time_reads(fast, paths, rounds)
+		full_time = _time_reads(full, paths, rounds)
+
+	print(f"Files:              {file_count}")
+	print(f"mutagen.File:       {full_time:.3f}s ({full_time / file_count * 1e6:.1f} us/file)")
+	print(f"Header-only reader: {fast_time:.3f}s ({fast_time / file_count * 1e6:.1f} us/file)")
+	print(f"Speed-up:           {full_time / fast_time:.1f}x")
+	print(f"Mismatching files:  {len(mismatches)}")
+
+
+if __name__ == "__main__":
+	run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
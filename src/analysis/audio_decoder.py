@@ -0,0 +1,52 @@
+import subprocess
+from pathlib import Path
+from typing import Iterator
+
+import mutagen
+import numpy as np
+
+from src.constants import FFMPEG_PATH
+
+# Analysis runs on 48 kHz audio, the rate the BS.1770 filter coefficients are specified for.
+ANALYSIS_SAMPLE_RATE: int = 48000
+DEFAULT_CHUNK_SECONDS: float = 10.0
+
+
+def probe_channels(path: Path) -> int:
+	"""Channel count of the audio stream, from the container headers; stereo when mutagen does not know."""
+	try:
+		file = mutagen.File(str(path))
+	except mutagen.MutagenError:
+		return 2
+
+	channels = getattr(getattr(file, "info", None), "channels", None)
+	return channels if channels else 2
+
+
+def decode_audio_chunks(path: Path, channels: int, sample_rate: int = ANALYSIS_SAMPLE_RATE, chunk_seconds: float = DEFAULT_CHUNK_SECONDS) -> Iterator[np.ndarray]:
+	"""
+	Decodes a file with FFmpeg to 32-bit float PCM and yields it as (frames, channels) arrays of at most chunk_seconds,
+	so a whole track never has to sit in memory.
+	"""
+	command = [FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-i", str(path), "-vn",
+	           "-f", "f32le", "-acodec", "pcm_f32le", "-ac", str(channels), "-ar", str(sample_rate), "-"]
+	frame_size = 4 * channels
+	chunk_size = int(sample_rate * chunk_seconds) * frame_size
+
+	process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+	try:
+		while True:
+			data = process.stdout.read(chunk_size)
+			if not data:
+				break
+
+			usable = len(data) - len(data) % frame_size
+			yield np.frombuffer(data[:usable], dtype=np.float32).reshape(-1, channels)
+	finally:
+		process.stdout.close()
+		error_output = process.stderr.read().decode("utf-8", errors="replace").strip()
+		process.stderr.close()
+		return_code = process.wait()
+
+	if return_code != 0:
+		raise RuntimeError(f"FFmpeg failed to decode '{path}' with exit code {return_code}: {error_output}")
@@ -0,0 +1,144 @@
+import enum
+from typing import List, Optional
+
+import numpy as np
+import pydantic
+
+# Tempo and energy only need the rhythm, so the audio is analyzed as 22.05 kHz mono in 1024 sample frames every 512 samples.
+TEMPO_SAMPLE_RATE: int = 22050
+FRAME_SIZE: int = 1024
+HOP_SIZE: int = 512
+FRAME_RATE: float = TEMPO_SAMPLE_RATE / HOP_SIZE
+
+MIN_BPM: float = 60.0
+MAX_BPM: float = 200.0
+# Octave errors are the classic tempo mistake; a log-normal prior around 120 BPM favours the musically likely octave.
+PRIOR_BPM: float = 120.0
+PRIOR_OCTAVES: float = 1.0
+ENVELOPE_SMOOTHING_FRAMES: int = 7
+
+# Needs at least this much audio to say anything useful about tempo.
+MIN_ANALYZED_SECONDS: float = 5.0
+SILENCE_DBFS: float = -60.0
+
+# Energy score weights and the feature ranges that map onto 0..1.
+LOUDNESS_RANGE_DBFS = (-30.0, -8.0)
+ONSET_RATE_RANGE = (0.5, 6.0)
+TEMPO_RANGE_BPM = (70.0, 170.0)
+ENERGY_WEIGHTS = (0.5, 0.3, 0.2)
+MEDIUM_ENERGY_THRESHOLD: float = 0.4
+HIGH_ENERGY_THRESHOLD: float = 0.7
+
+
+class EnergyLevel(enum.Enum):
+	Low = "Low Energy"
+	Medium = "Medium Energy"
+	High = "High Energy"
+
+
+class EnergyTempoModel(pydantic.BaseModel):
+	bpm: int
+	energy: EnergyLevel
+	energy_score: float
+
+
+def estimate_tempo(onset_envelope: np.ndarray, frame_rate: float = FRAME_RATE) -> float:
+	"""Tempo in BPM from the autocorrelation of an onset strength envelope, weighted towards likely tempi."""
+	# Smoothing widens the autocorrelation peaks, so beat periods that fall between two frame lags are not under-scored.
+	kernel = np.hanning(ENVELOPE_SMOOTHING_FRAMES)
+	envelope = np.convolve(onset_envelope, kernel / kernel.sum(), mode="same")
+	envelope -= np.mean(envelope)
+	size = len(envelope)
+
+	# Autocorrelation through the FFT, zero padded so it is linear rather than circular.
+	spectrum = np.fft.rfft(envelope, 2 * size)
+	autocorrelation = np.fft.irfft(np.abs(spectrum) ** 2)[:size]
+
+	lags = np.arange(int(60 * frame_rate / MAX_BPM), min(int(np.ceil(60 * frame_rate / MIN_BPM)), size - 2) + 1)
+	prior = np.exp(-0.5 * (np.log2(60 * frame_rate / lags / PRIOR_BPM) / PRIOR_OCTAVES) ** 2)
+	weighted = autocorrelation[lags] * prior
+	best = int(np.argmax(weighted))
+
+	# Parabolic interpolation between the neighbouring lags for a sub-frame estimate.
+	lag = float(lags[best])
+	if 0 < best < len(lags) - 1:
+		left, centre, right = weighted[best - 1:best + 2]
+		denominator = left - 2 * centre + right
+		if denominator != 0:
+			lag += 0.5 * (left - right) / denominator
+
+	return 60 * frame_rate / lag
+
+
+def _scale(value: float, value_range) -> float:
+	low, high = value_range
+	return float(np.clip((value - low) / (high - low), 0.0, 1.0))
+
+
+class EnergyTempoMeter:
+	"""
+	Streaming onset and RMS features of 22.05 kHz audio, from which tempo and an energy class are estimated.
+	Chunks of any length can be fed in order; only two numbers per 23 ms frame are kept, so memory does not grow with the audio.
+	"""
+
+	def __init__(self):
+		self._window: np.ndarray = np.hanning(FRAME_SIZE).astype(np.float32)
+		self._pending: np.ndarray = np.empty(0, dtype=np.float32)
+		self._previous_spectrum: Optional[np.ndarray] = None
+		self._rms: List[np.ndarray] = []
+		self._onset_strength: List[np.ndarray] = []
+
+	def feed(self, samples: np.ndarray) -> None:
+		mono = samples.mean(axis=1) if samples.ndim == 2 else samples
+		buffer = np.concatenate((self._pending, mono.astype(np.float32)))
+		if len(buffer) < FRAME_SIZE:
+			self._pending = buffer
+			return
+
+		frame_count = (len(buffer) - FRAME_SIZE) // HOP_SIZE + 1
+		frames = np.lib.stride_tricks.sliding_window_view(buffer, FRAME_SIZE)[::HOP_SIZE][:frame_count]
+		self._pending = buffer[frame_count * HOP_SIZE:]
+
+		self._rms.append(np.sqrt(np.mean(np.square(frames), axis=1)))
+
+		# Spectral flux of the log-compressed magnitude: how much new energy appears in each frame.
+		spectrum = np.log1p(100 * np.abs(np.fft.rfft(frames * self._window, axis=1)))
+		previous = self._previous_spectrum if self._previous_spectrum is not None else spectrum[0]
+		differences = np.diff(np.vstack((previous[np.newaxis], spectrum)), axis=0)
+		self._onset_strength.append(np.maximum(differences, 0).sum(axis=1))
+		self._previous_spectrum = spectrum[-1]
+
+	def result(self) -> EnergyTempoModel or None:
+		"""The estimate, or None when the audio is too short or silent to judge."""
+		if not self._rms:
+			return None
+
+		rms = np.concatenate(self._rms)
+		onset_strength = np.concatenate(self._onset_strength)
+		with np.errstate(divide="ignore"):
+			rms_dbfs = 20 * np.log10(rms)
+
+		audible = rms_dbfs > SILENCE_DBFS
+		if np.count_nonzero(audible) < MIN_ANALYZED_SECONDS * FRAME_RATE:
+			return None
+
+		bpm = estimate_tempo(onset_strength)
+		loudness = 10 * np.log10(np.mean(np.square(rms[audible])))
+		onset_rate = self._count_onsets(onset_strength) * FRAME_RATE / np.count_nonzero(audible)
+
+		energy_score = float(np.dot(ENERGY_WEIGHTS, (_scale(loudness, LOUDNESS_RANGE_DBFS), _scale(onset_rate, ONSET_RATE_RANGE), _scale(bpm, TEMPO_RANGE_BPM))))
+		if energy_score >= HIGH_ENERGY_THRESHOLD:
+			energy = EnergyLevel.High
+		elif energy_score >= MEDIUM_ENERGY_THRESHOLD:
+			energy = EnergyLevel.Medium
+		else:
+			energy = EnergyLevel.Low
+
+		return EnergyTempoModel(bpm=int(round(bpm)), energy=energy, energy_score=round(energy_score, 3))
+
+	def _count_onsets(self, onset_strength: np.ndarray) -> int:
+		"""Number of onsets: local maxima of the onset strength that stand out from its typical level."""
+		median = np.median(onset_strength)
+		threshold = median + 2 * np.median(np.abs(onset_strength - median))
+		is_peak = (onset_strength[1:-1] > onset_strength[:-2]) & (onset_strength[1:-1] >= onset_strength[2:]) & (onset_strength[1:-1] > threshold)
+		return int(np.count_nonzero(is_peak))
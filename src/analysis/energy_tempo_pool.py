@@ -0,0 +1,49 @@
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+from py_common.logging import HoornLogger
+
+from src.analysis.audio_decoder import decode_audio_chunks
+from src.analysis.energy_tempo_meter import EnergyTempoMeter, EnergyTempoModel, TEMPO_SAMPLE_RATE
+
+
+def _analyze(path: str) -> EnergyTempoModel or None:
+	"""Decodes one track as mono chunks inside a worker process and estimates its tempo and energy."""
+	meter = EnergyTempoMeter()
+	for chunk in decode_audio_chunks(Path(path), channels=1, sample_rate=TEMPO_SAMPLE_RATE):
+		meter.feed(chunk)
+
+	return meter.result()
+
+
+class EnergyTempoPool:
+	"""
+	Estimates tempo and energy of tracks on a process pool sized to the CPU count.
+	Files can be submitted as soon as they are known, so the analysis runs while the tagging pipeline waits on MusicBrainz and the user.
+	Each worker streams its track in chunks, so memory stays bounded by the number of workers rather than the track lengths.
+	"""
+
+	def __init__(self, logger: HoornLogger, max_workers: int = None):
+		self._logger = logger
+		self._max_workers: int = max_workers if max_workers is not None else os.cpu_count() or 1
+		self._executor: ProcessPoolExecutor or None = None
+
+	def __enter__(self) -> "EnergyTempoPool":
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+		self.shutdown()
+
+	def submit(self, file: Path) -> Future:
+		"""Queues a file for analysis; the future resolves to an `EnergyTempoModel`, or None if the audio could not be judged."""
+		if self._executor is None:
+			self._logger.debug(f"Starting energy/tempo analysis pool with {self._max_workers} processes.")
+			self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+
+		return self._executor.submit(_analyze, str(file))
+
+	def shutdown(self) -> None:
+		if self._executor is not None:
+			self._executor.shutdown(wait=True, cancel_futures=True)
+			self._executor = None
@@ -0,0 +1,94 @@
+from typing import List
+
+import numpy as np
+from scipy.signal import sosfilt
+
+from src.analysis.audio_decoder import ANALYSIS_SAMPLE_RATE
+
+# ITU-R BS.1770-4 K-weighting at 48 kHz: the head-related high shelf followed by the RLB high-pass, as second-order sections.
+K_WEIGHTING_SOS: np.ndarray = np.array([
+	[1.53512485958697, -2.69169618940638, 1.19839281085285, 1.0, -1.69065929318241, 0.73248077421585],
+	[1.0, -2.0, 1.0, 1.0, -1.99004745483398, 0.99007225036621],
+])
+
+# Gating blocks are 400 ms long and start every 100 ms, so they are built from four 100 ms segments.
+SEGMENT_FRAMES: int = ANALYSIS_SAMPLE_RATE // 10
+SEGMENTS_PER_BLOCK: int = 4
+
+ABSOLUTE_GATE_LUFS: float = -70.0
+RELATIVE_GATE_LU: float = -10.0
+
+
+def channel_weights(channels: int) -> np.ndarray:
+	"""BS.1770 channel weights; 5.0/5.1 layouts weight the surrounds by 1.41 and ignore the LFE."""
+	if channels == 6:
+		return np.array([1.0, 1.0, 1.0, 0.0, 1.41, 1.41])
+	if channels == 5:
+		return np.array([1.0, 1.0, 1.0, 1.41, 1.41])
+	return np.ones(channels)
+
+
+def _to_lufs(energy):
+	with np.errstate(divide="ignore"):
+		return -0.691 + 10 * np.log10(energy)
+
+
+def integrated_loudness(block_energies: np.ndarray) -> float:
+	"""
+	Gated loudness in LUFS over the given block energies; -inf when everything is below the absolute gate.
+	Blocks of several tracks can be concatenated to get the loudness of an album.
+	"""
+	above_absolute_gate = block_energies[_to_lufs(block_energies) > ABSOLUTE_GATE_LUFS]
+	if len(above_absolute_gate) == 0:
+		return float("-inf")
+
+	relative_gate = _to_lufs(np.mean(above_absolute_gate)) + RELATIVE_GATE_LU
+	gated = above_absolute_gate[_to_lufs(above_absolute_gate) > relative_gate]
+	return float(_to_lufs(np.mean(gated)))
+
+
+class LoudnessMeter:
+	"""
+	Streaming EBU R128 / BS.1770-4 measurement of 48 kHz audio.
+	Chunks of any length can be fed in order; the filter state and incomplete segments carry over between them.
+	"""
+
+	def __init__(self, channels: int):
+		self._channels: int = channels
+		self._weights: np.ndarray = channel_weights(channels)
+		self._filter_state: np.ndarray = np.zeros((K_WEIGHTING_SOS.shape[0], 2, channels))
+		self._pending: np.ndarray = np.empty((0, channels))
+		self._segment_energies: List[np.ndarray] = []
+		self._peak: float = 0.0
+
+	@property
+	def peak(self) -> float:
+		"""Highest absolute sample value seen (sample peak, linear)."""
+		return self._peak
+
+	def feed(self, samples: np.ndarray) -> None:
+		if len(samples) == 0:
+			return
+
+		self._peak = max(self._peak, float(np.max(np.abs(samples))))
+
+		filtered, self._filter_state = sosfilt(K_WEIGHTING_SOS, samples.astype(np.float64), axis=0, zi=self._filter_state)
+		if len(self._pending) > 0:
+			filtered = np.concatenate((self._pending, filtered))
+
+		whole_segments = len(filtered) // SEGMENT_FRAMES
+		squares = np.square(filtered[:whole_segments * SEGMENT_FRAMES]).reshape(whole_segments, SEGMENT_FRAMES, self._channels)
+		self._segment_energies.append(squares.sum(axis=1) @ self._weights)
+		self._pending = filtered[whole_segments * SEGMENT_FRAMES:]
+
+	def block_energies(self) -> np.ndarray:
+		"""Channel-weighted mean square of every complete 400 ms gating block, in order."""
+		segments = np.concatenate(self._segment_energies) if self._segment_energies else np.empty(0)
+		if len(segments) < SEGMENTS_PER_BLOCK:
+			return np.empty(0)
+
+		block_sums = np.lib.stride_tricks.sliding_window_view(segments, SEGMENTS_PER_BLOCK).sum(axis=1)
+		return block_sums / (SEGMENTS_PER_BLOCK * SEGMENT_FRAMES)
+
+	def integrated_loudness(self) -> float:
+		return integrated_loudness(self.block_energies())
@@ -0,0 +1,155 @@
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pydantic
+from py_common.logging import HoornLogger
+
+from src.analysis.audio_decoder import decode_audio_chunks, probe_channels
+from src.analysis.loudness_meter import LoudnessMeter, integrated_loudness
+from src.handlers.library_file_handler import LibraryFileHandler
+from src.metadata.metadata_manipulator import MetadataKey, MetadataManipulator
+
+# ReplayGain 2.0 normalizes to -18 LUFS.
+REPLAYGAIN_REFERENCE_LUFS: float = -18.0
+
+
+class LoudnessReport(pydantic.BaseModel):
+	analyzed_tracks: int = 0
+	skipped_tracks: int = 0
+	failed_tracks: int = 0
+	albums: int = 0
+
+
+def _measure(path: str) -> Tuple[np.ndarray, float]:
+	"""Decodes and measures one track inside a worker process; returns its gating block energies and sample peak."""
+	channels = probe_channels(Path(path))
+	meter = LoudnessMeter(channels)
+	for chunk in decode_audio_chunks(Path(path), channels):
+		meter.feed(chunk)
+
+	return meter.block_energies(), meter.peak
+
+
+def _format_gain(loudness: float) -> str:
+	return f"{REPLAYGAIN_REFERENCE_LUFS - loudness:.2f} dB"
+
+
+def _format_peak(peak: float) -> str:
+	return f"{peak:.6f}"
+
+
+class ReplayGainAnalyzer:
+	"""
+	Measures the EBU R128 loudness of tracks on a process pool and writes ReplayGain 2.0 track and album tags.
+	An album is only analyzed again when one of its tracks has no ReplayGain yet, going by the library index
+	(or the tags, for files that are not indexed); album gain always covers the whole album.
+	"""
+
+	def __init__(self, logger: HoornLogger, library_file_handler: LibraryFileHandler, metadata_manipulator: MetadataManipulator, max_workers: int = None):
+		self._logger = logger
+		self._library_file_handler: LibraryFileHandler = library_file_handler
+		self._metadata_manipulator: MetadataManipulator = metadata_manipulator
+		self._max_workers: int = max_workers if max_workers is not None else os.cpu_count() or 1
+
+	def analyze_directory(self, directory: Path) -> LoudnessReport:
+		return self.analyze_files(self._library_file_handler.get_music_files(directory))
+
+	def get_unanalyzed_albums(self, directory: Path) -> List[List[Path]]:
+		"""The tracks of each album below the directory that still needs ReplayGain, one list per album."""
+		albums = self._group_by_album(self._library_file_handler.get_music_files(directory))
+		return [files for files, analyzed in albums.values() if not analyzed]
+
+	def analyze_files(self, music_files: List[Path]) -> LoudnessReport:
+		report = LoudnessReport()
+		albums = self._group_by_album(music_files)
+
+		pending: Dict[Tuple[str, str], List[Path]] = {}
+		for album, (files, analyzed) in albums.items():
+			if analyzed:
+				report.skipped_tracks += len(files)
+			else:
+				pending[album] = files
+
+		if not pending:
+			self._logger.info("Every track already has ReplayGain tags, nothing to analyze.")
+			return report
+
+		track_count = sum(len(files) for files in pending.values())
+		self._logger.info(f"Analyzing the loudness of {track_count} tracks in {len(pending)} albums on {self._max_workers} processes...")
+
+		measurements: Dict[Path, Tuple[np.ndarray, float]] = {}
+		remaining: Dict[Tuple[str, str], int] = {album: len(files) for album, files in pending.items()}
+
+		with ProcessPoolExecutor(max_workers=self._max_workers) as executor:
+			futures: Dict[Future, Tuple[Tuple[str, str], Path]] = {}
+			for album, files in pending.items():
+				for file in files:
+					futures[executor.submit(_measure, str(file))] = (album, file)
+
+			# Albums are tagged as soon as their last track is measured, so work is not lost on an interruption.
+			for future in as_completed(futures):
+				album, file = futures[future]
+				try:
+					measurements[file] = future.result()
+				except Exception as e:
+					self._logger.error(f"Could not analyze the loudness of {file.name}: {e}")
+					report.failed_tracks += 1
+
+				remaining[album] -= 1
+				if remaining[album] == 0:
+					report.analyzed_tracks += self._write_album(album, pending[album], measurements)
+					report.albums += 1
+
+		return report
+
+	def _group_by_album(self, files: List[Path]) -> Dict[Tuple[str, str], Tuple[List[Path], bool]]:
+		"""Groups files by album artist and album, and tells per album whether all of its tracks were analyzed before."""
+		albums: Dict[Tuple[str, str], Tuple[List[Path], bool]] = {}
+		library_index = self._library_file_handler.library_index
+
+		for file in files:
+			metadata = library_index.get_metadata(file)
+			if metadata is None:
+				metadata = self._metadata_manipulator.get_all_metadata(file)
+
+			album_title = metadata.get(MetadataKey.Album, "")
+			# Tracks without an album only get track gain, so each is its own group (with an empty album title).
+			album = (metadata.get(MetadataKey.AlbumArtist, metadata.get(MetadataKey.Artist, "")), album_title) if album_title else (str(file), "")
+			analyzed = MetadataKey.ReplayGainTrackGain in metadata and (MetadataKey.ReplayGainAlbumGain in metadata or not album_title)
+
+			album_files, album_analyzed = albums.get(album, ([], True))
+			album_files.append(file)
+			albums[album] = (album_files, album_analyzed and analyzed)
+
+		return albums
+
+	def _write_album(self, album: Tuple[str, str], files: List[Path], measurements: Dict[Path, Tuple[np.ndarray, float]]) -> int:
+		"""Writes the gain tags of one album's tracks with one save per file; returns the number of tracks written."""
+		measured = [file for file in files if file in measurements]
+		# Album gain is only meaningful when every track could be measured.
+		is_complete_album = album[1] != "" and len(measured) == len(files)
+
+		if is_complete_album:
+			album_loudness = integrated_loudness(np.concatenate([measurements[file][0] for file in measured]))
+			album_peak = max(measurements[file][1] for file in measured)
+
+		written = 0
+		for file in measured:
+			block_energies, peak = measurements.pop(file)
+			loudness = integrated_loudness(block_energies)
+			if loudness == float("-inf"):
+				self._logger.warning(f"{file.name} is silent or too short to measure, skipping its ReplayGain.")
+				continue
+
+			tags = {MetadataKey.ReplayGainTrackGain: _format_gain(loudness), MetadataKey.ReplayGainTrackPeak: _format_peak(peak)}
+			if is_complete_album and album_loudness != float("-inf"):
+				tags[MetadataKey.ReplayGainAlbumGain] = _format_gain(album_loudness)
+				tags[MetadataKey.ReplayGainAlbumPeak] = _format_peak(album_peak)
+
+			self._metadata_manipulator.update_metadata_from_dict(file, tags)
+			written += 1
+
+		return written
@@ -1,6 +1,7 @@
+import json
 from pathlib import Path
 from pprint import pprint
-from typing import List
+from typing import List, TYPE_CHECKING
 
 from py_common.cli_framework import CommandLineInterface
 from py_common.logging import HoornLogger, HoornLogOutputInterface, DefaultHoornLogOutput, FileHoornLogOutput, LogType
@@ -8,10 +9,18 @@ from py_common.logging import HoornLogger, HoornLogOutputInterface, DefaultHoorn
 from src.constants import DOWNLOAD_PATH, ORGANIZED_PATH
 from src.downloading.download_model import DownloadModel
 from src.downloading.music_download_interface import MusicDownloadInterface
-from src.downloading.yt_dlp_music_downloader import YTDLPMusicDownloader
-from src.genre_detection.genre_algorithm import GenreAlgorithm
+from src.lazy_component import LazyComponent, lazy_action
 from src.metadata.helpers.track_model import TrackModel
-from src.metadata.metadata_api import MetadataAPI
+from src.server.metadata_server_client import MetadataServerClient, MetadataServerError
+
+# The subsystems below pull in yt_dlp, musicbrainzngs, mutagen and numpy; they are imported by the factories
+# in `register_commands` when a command first needs them, so the prompt appears without paying for all of them.
+if TYPE_CHECKING:
+	from src.genre_detection.genre_algorithm import GenreAlgorithm
+	from src.indexing.library_search import LibrarySearch
+	from src.indexing.library_statistics import LibraryStatistics
+	from src.metadata.metadata_api import MetadataAPI
+	from src.musicbrainz.musicbrainz_client import MusicBrainzClient
 
 
 def get_user_local_app_data_dir() -> Path:
@@ -24,7 +33,7 @@ def clean_exit(hlogger: HoornLogger):
 	hlogger.debug("Clean Exit...")
 	exit()
 
-def clear_metadata_files(metadata_api: MetadataAPI):
+def clear_metadata_files(metadata_api: "MetadataAPI"):
 	clear_options: List[str] = ["Genre", "Date"]
 	choice: str = input("Choose a metadata option to clear (Genre/Date): ")
 
@@ -39,14 +48,14 @@ def clear_metadata_files(metadata_api: MetadataAPI):
 	elif choice.lower() == "date":
 		metadata_api.clear_dates(directory)
 
-def print_metadata_keys(metadata_api: MetadataAPI):
+def print_metadata_keys(metadata_api: "MetadataAPI"):
 	audio_file = Path(input("Enter the path to the audio file: "))
 	metadata_keys = metadata_api.get_metadata_keys(audio_file)
 	print("Available metadata keys:")
 	for key in metadata_keys:
 		pprint(f"- {key}")
 
-def populate_metadata_from_musicbrainz(metadata_api: MetadataAPI):
+def populate_metadata_from_musicbrainz(metadata_api: "MetadataAPI"):
 	directory_path = input("Enter the directory path to populate metadata (leave empty for default): ")
 
 	if directory_path == "":
@@ -55,7 +64,7 @@ def populate_metadata_from_musicbrainz(metadata_api: MetadataAPI):
 
 	metadata_api.populate_metadata_from_musicbrainz(directory_path)
 
-def populate_metadata_from_musicbrainz_album(metadata_api: MetadataAPI):
+def populate_metadata_from_musicbrainz_album(metadata_api: "MetadataAPI"):
 	directory_path = input("Enter the directory path to populate metadata (leave empty for default): ")
 	album_id = input("Enter the MusicBrainz album ID: ")
 
@@ -65,7 +74,7 @@ def populate_metadata_from_musicbrainz_album(metadata_api: MetadataAPI):
 
 	metadata_api.populate_metadata_from_musicbrainz_album(directory_path, album_id)
 
-def organize_music_files(metadata_api: MetadataAPI):
+def organize_music_files(metadata_api: "MetadataAPI"):
 	directory_path = input("Enter the directory path to organize music (leave empty for default): ")
 	organized_path = input("Enter the directory path to save organized music (leave empty for default): ")
 
@@ -78,7 +87,20 @@ def organize_music_files(metadata_api: MetadataAPI):
 
 	metadata_api.organize_music_files(directory_path, organized_path)
 
-def recheck_missing_metadata(metadata_api: MetadataAPI):
+def organize_music_files_staged(metadata_api: "MetadataAPI"):
+	directory_path = input("Enter the directory path to organize music (leave empty for default): ")
+	organized_path = input("Enter the directory path to save organized music (leave empty for default): ")
+
+	if directory_path == "":
+		directory_path = DOWNLOAD_PATH
+	else: directory_path = Path(directory_path)
+	if organized_path == "":
+		organized_path = ORGANIZED_PATH
+	else: organized_path = Path(organized_path)
+
+	metadata_api.organize_music_files_staged(directory_path, organized_path)
+
+def recheck_missing_metadata(metadata_api: "MetadataAPI"):
 	organized_path = input("Enter the directory path to save organized music (leave empty for default): ")
 
 	if organized_path == "":
@@ -87,22 +109,29 @@ def recheck_missing_metadata(metadata_api: MetadataAPI):
 
 	metadata_api.recheck_missing_metadata(organized_path)
 
-def rescan_entire_library(metadata_api: MetadataAPI):
+def rescan_entire_library(metadata_api: "MetadataAPI"):
 	organized_path = input("Enter the directory path to save organized music (leave empty for default): ")
+	force_deep_scan = input("Check every file instead of only changed directories? (y/n): ").lower() == 'y'
 
 	if organized_path == "":
 		organized_path = ORGANIZED_PATH
 	else: organized_path = Path(organized_path)
 
-	metadata_api.rescan_entire_library(organized_path)
+	metadata_api.rescan_entire_library(organized_path, force_deep_scan)
+
+def download_tracks(downloader: MusicDownloadInterface):
+	downloader.download_tracks()
 
-def download_and_assign_metadata(downloader: MusicDownloadInterface, metadata_api: MetadataAPI):
+def add_album_to_downloads(metadata_api: "MetadataAPI"):
+	metadata_api.add_album_to_downloads()
+
+def download_and_assign_metadata(downloader: MusicDownloadInterface, metadata_api: "MetadataAPI"):
 	download_files: List[DownloadModel] = downloader.download_tracks()
 
 	for download_model in download_files:
 		metadata_api.populate_metadata_from_musicbrainz_for_file(download_model)
 
-def make_description_compatible_for_library(metadata_api: MetadataAPI):
+def make_description_compatible_for_library(metadata_api: "MetadataAPI"):
 	organized_path = input("Enter the directory path to save organized music (leave empty for default): ")
 
 	if organized_path == "":
@@ -111,18 +140,212 @@ def make_description_compatible_for_library(metadata_api: MetadataAPI):
 
 	metadata_api.make_description_compatible_for_library(organized_path)
 
-def print_track_ids_from_album(metadata_api: MetadataAPI):
+def print_track_ids_from_album(metadata_api: "MetadataAPI"):
 	track_models: List[TrackModel] = metadata_api.get_track_ids_from_album()
 	print("Track IDs:")
 	for track_model in track_models:
 		print(f"- {track_model.track_number} - {track_model.mbid} - {track_model.title}")
 
-def get_genre_data(genre_algorithm: GenreAlgorithm):
+def watch_download_folder(metadata_api: "MetadataAPI"):
+	watch_library = input("Do you want to watch the organized library as well? (y/n): ").lower() == 'y'
+
+	from src.watching.watch_folder_daemon import WatchFolderDaemon
+
+	daemon: WatchFolderDaemon = WatchFolderDaemon(logger, metadata_api)
+	daemon.run(DOWNLOAD_PATH, ORGANIZED_PATH, watch_library)
+
+def serve_metadata_api(metadata_api: "MetadataAPI", genre_algorithm: "GenreAlgorithm"):
+	from src.server.metadata_server import MetadataServer
+
+	server: MetadataServer = MetadataServer(logger, metadata_api, genre_algorithm)
+	server.serve_forever()
+
+def call_metadata_server():
+	method: str = input("Enter the method to call on the running server: ")
+	params: str = input("Enter the parameters as a JSON object (leave empty for none): ")
+
+	client: MetadataServerClient = MetadataServerClient()
+	try:
+		pprint(client.call(method, **(json.loads(params) if params else {})))
+	except (MetadataServerError, ValueError, OSError) as e:
+		logger.error(f"Calling '{method}' on the metadata server failed: {e}")
+	finally:
+		client.close()
+
+def analyze_loudness(metadata_api: "MetadataAPI"):
+	directory_path = input("Enter the directory path to analyze (leave empty for the library): ")
+
+	if directory_path == "":
+		directory_path = ORGANIZED_PATH
+	else: directory_path = Path(directory_path)
+
+	report = metadata_api.analyze_loudness(directory_path)
+	print(f"Tracks given ReplayGain: {report.analyzed_tracks} in {report.albums} albums")
+	print(f"Tracks already analyzed: {report.skipped_tracks}")
+	if report.failed_tracks > 0:
+		logger.warning(f"{report.failed_tracks} tracks could not be decoded, see the log for details.")
+
+def export_tag_manifest(metadata_api: "MetadataAPI"):
+	directory_path = input("Enter the directory path to export tags from (leave empty for the library): ")
+	manifest_path = Path(input("Enter the manifest path to write (.csv, .json or .parquet): "))
+
+	if directory_path == "":
+		directory_path = ORGANIZED_PATH
+	else: directory_path = Path(directory_path)
+
+	metadata_api.export_tag_manifest(directory_path, manifest_path)
+
+def apply_tag_manifest(metadata_api: "MetadataAPI"):
+	manifest_path = Path(input("Enter the path of the edited manifest: "))
+
+	report = metadata_api.apply_tag_manifest(manifest_path)
+	print(f"Files updated: {report.changed_files} ({report.changed_tags} tags changed)")
+	print(f"Files already up to date: {report.unchanged_files}")
+	if report.missing_files > 0 or report.failed_files > 0:
+		logger.warning(f"{report.missing_files} files no longer exist and {report.failed_files} could not be written, see the log for details.")
+
+def enqueue_jobs(metadata_api: "MetadataAPI"):
+	kind = input("Enter the kind of jobs to queue (md/loudness/rescan): ").lower()
+	directory_path = input("Enter the directory path to queue jobs for (leave empty for the library): ")
+	force_deep_scan = kind == "rescan" and input("Check every file instead of only changed directories? (y/n): ").lower() == 'y'
+
+	if directory_path == "":
+		directory_path = ORGANIZED_PATH
+	else: directory_path = Path(directory_path)
+
+	try:
+		queued = metadata_api.enqueue_jobs(kind, directory_path, force_deep_scan)
+	except ValueError as e:
+		logger.error(str(e))
+		return
+	print(f"Jobs queued: {queued}")
+
+def run_queue_worker(metadata_api: "MetadataAPI"):
+	kinds = input("Enter the job kinds to work on, comma separated (leave empty for all): ")
+	stop_when_empty = input("Stop once the queue is empty? (y/n): ").lower() == 'y'
+
+	report = metadata_api.run_worker([kind.strip().lower() for kind in kinds.split(",")] if kinds else None, stop_when_empty)
+	print(f"Jobs done: {report.completed}")
+	print(f"Jobs to be retried: {report.retried}")
+	if report.failed > 0 or report.lost_leases > 0:
+		logger.warning(f"{report.failed} jobs failed for good and {report.lost_leases} were taken over after their lease ran out, see the log for details.")
+
+def print_job_queue_status(metadata_api: "MetadataAPI"):
+	for state, count in metadata_api.get_job_queue_status().items():
+		print(f"{state}: {count}")
+
+def print_tag_write_report(metadata_api: "MetadataAPI"):
+	report = metadata_api.get_tag_write_report()
+	print(f"Tag writes in place: {report.in_place_writes}")
+	print(f"Tag writes that rewrote the file: {report.full_rewrites} ({report.bytes_moved / 2 ** 20:.1f} MiB of audio moved)")
+
+def print_library_statistics(library_statistics: "LibraryStatistics"):
+	export_path = input("Enter a .csv or .json path to export the statistics to (leave empty to only print): ")
+
+	statistics = library_statistics.collect()
+	if statistics.total_tracks == 0:
+		logger.warning("The library index is empty, run 'rescan' once to build it.")
+		return
+
+	print(f"Tracks: {statistics.total_tracks}")
+	print("Tracks missing:")
+	for key, count in statistics.missing_by_key.items():
+		print(f"- {key}: {count}")
+	print("Tracks per main genre:")
+	for genre, count in statistics.genre_distribution.items():
+		print(f"- {genre}: {count}")
+	print(f"Albums with gaps in their track numbers: {len(statistics.albums_with_track_gaps)}")
+	for album in statistics.albums_with_track_gaps:
+		print(f"- {album['album_artist']} - {album['album']} (disc {album['disc']}): {album['missing']} of {album['highest']} missing")
+
+	if export_path != "":
+		library_statistics.export(statistics, Path(export_path))
+
+def find_in_library(library_search: "LibrarySearch"):
+	query = input("Enter search terms (title, artist, album, album artist or genre): ")
+
+	results = library_search.find(query)
+	if len(results) == 0:
+		logger.info(f"Nothing in the library index matches '{query}'.")
+		return
+
+	for result in results:
+		print(f"{result.artist} - {result.title} ({result.album}) [{result.recording_id or 'no MBID'}]")
+		print(f"    {result.path}")
+
+def get_genre_data(genre_algorithm: "GenreAlgorithm"):
 	track_id: str = input("Enter the MusicBrainz track ID: ")
 	album_id: str = input("Enter the MusicBrainz album ID: ")
 
 	genre_algorithm.get_genre_data(track_id, album_id)
 
+def _create_downloader() -> MusicDownloadInterface:
+	from src.downloading.yt_dlp_music_downloader import YTDLPMusicDownloader
+	return YTDLPMusicDownloader(logger)
+
+def _create_musicbrainz_client() -> "MusicBrainzClient":
+	from src.musicbrainz.musicbrainz_client import MusicBrainzClient
+	return MusicBrainzClient(logger)
+
+def register_commands(cli: CommandLineInterface) -> None:
+	"""Registers every command; the components they need are only built (and imported) when a command first runs."""
+	downloader: LazyComponent[MusicDownloadInterface] = LazyComponent(_create_downloader)
+	musicbrainz_client: LazyComponent["MusicBrainzClient"] = LazyComponent(_create_musicbrainz_client)
+
+	def _create_genre_algorithm() -> "GenreAlgorithm":
+		from src.genre_detection.genre_algorithm import GenreAlgorithm
+		return GenreAlgorithm(logger, musicbrainz_client.get())
+
+	genre_algorithm: LazyComponent["GenreAlgorithm"] = LazyComponent(_create_genre_algorithm)
+
+	def _create_metadata_api() -> "MetadataAPI":
+		from src.metadata.metadata_api import MetadataAPI
+		return MetadataAPI(logger, genre_algorithm.get(), musicbrainz_client.get())
+
+	metadata_api: LazyComponent["MetadataAPI"] = LazyComponent(_create_metadata_api)
+
+	def _create_library_statistics() -> "LibraryStatistics":
+		# Reads the index directly, so it does not need the rest of the metadata stack.
+		from src.indexing.library_index import LibraryIndex
+		from src.indexing.library_statistics import LibraryStatistics
+		return LibraryStatistics(logger, LibraryIndex(logger))
+
+	library_statistics: LazyComponent["LibraryStatistics"] = LazyComponent(_create_library_statistics)
+
+	def _create_library_search() -> "LibrarySearch":
+		from src.indexing.library_index import LibraryIndex
+		from src.indexing.library_search import LibrarySearch
+		return LibrarySearch(logger, LibraryIndex(logger))
+
+	library_search: LazyComponent["LibrarySearch"] = LazyComponent(_create_library_search)
+
+	cli.add_command(["download"], "Download music files.", lazy_action(download_tracks, downloader))
+	cli.add_command(["download-and-md"], "Combines downloading and setting metadata.", lazy_action(download_and_assign_metadata, downloader, metadata_api))
+	cli.add_command(["metadata", "md"], "Find metadata for the library.", lazy_action(populate_metadata_from_musicbrainz, metadata_api))
+	cli.add_command(["metadata-album", "md-a"], "Finds metadata using album... Faster, less input required.", lazy_action(populate_metadata_from_musicbrainz_album, metadata_api))
+	cli.add_command(["clear"], "Clear metadata files.", lazy_action(clear_metadata_files, metadata_api))
+	cli.add_command(["db_keys"], "Print available metadata keys.", lazy_action(print_metadata_keys, metadata_api))
+	cli.add_command(["organize"], "Organize music files.", lazy_action(organize_music_files, metadata_api))
+	cli.add_command(["organize-staged"], "Organize music files in a local staging tree, then transfer them to the library in bulk.", lazy_action(organize_music_files_staged, metadata_api))
+	cli.add_command(["recheck"], "Recheck missing metadata.", lazy_action(recheck_missing_metadata, metadata_api))
+	cli.add_command(["rescan"], "Rescans the library, skipping directories that did not change since the last rescan.", lazy_action(rescan_entire_library, metadata_api))
+	cli.add_command(["compatible"], "Make description compatible for the library.", lazy_action(make_description_compatible_for_library, metadata_api))
+	cli.add_command(["get-tracks"], "Prints the IDs for all tracks in an Album.", lazy_action(print_track_ids_from_album, metadata_api))
+	cli.add_command(["add-album-to-downloads"], "Adds an album to the downloads.csv file.", lazy_action(add_album_to_downloads, metadata_api))
+	cli.add_command(["loudness"], "Measures EBU R128 loudness and writes ReplayGain track and album gain where it is missing.", lazy_action(analyze_loudness, metadata_api))
+	cli.add_command(["manifest-export"], "Exports the tags of a directory to a CSV, JSON or Parquet manifest for bulk editing.", lazy_action(export_tag_manifest, metadata_api))
+	cli.add_command(["manifest-apply"], "Applies an edited tag manifest, saving only the files whose tags changed.", lazy_action(apply_tag_manifest, metadata_api))
+	cli.add_command(["queue"], "Queues md, loudness or rescan work as file-level jobs for workers on this host.", lazy_action(enqueue_jobs, metadata_api))
+	cli.add_command(["worker"], "Works on queued jobs, leasing one at a time so several workers on this host can share the queue.", lazy_action(run_queue_worker, metadata_api))
+	cli.add_command(["queue-status"], "Prints how many queued jobs are pending, running, done and failed.", lazy_action(print_job_queue_status, metadata_api))
+	cli.add_command(["write-report"], "Prints how many tag writes this session happened in place vs rewrote the file.", lazy_action(print_tag_write_report, metadata_api))
+	cli.add_command(["stats"], "Prints library statistics from the library index, optionally exporting them.", lazy_action(print_library_statistics, library_statistics))
+	cli.add_command(["find"], "Searches the library index by title, artist, album, album artist or genre, tolerating typos.", lazy_action(find_in_library, library_search))
+	cli.add_command(["watch"], "Watches the download folder and tags/organizes new files as they arrive.", lazy_action(watch_download_folder, metadata_api))
+	cli.add_command(["serve"], "Keeps the metadata API warm and serves it as JSON-RPC over HTTP on localhost.", lazy_action(serve_metadata_api, metadata_api, genre_algorithm))
+	cli.add_command(["remote"], "Forwards a call to a running 'serve' instance.", call_metadata_server)
+	cli.add_command(["get-genre"], "Retrieves genre information for a track.", lazy_action(get_genre_data, genre_algorithm))
+
 if __name__ == "__main__":
 	log_dir = get_user_log_directory()
 
@@ -136,23 +359,7 @@ if __name__ == "__main__":
 		min_level=LogType.DEBUG,
 	)
 
-	downloader: MusicDownloadInterface = YTDLPMusicDownloader(logger)
-	genre_algorithm: GenreAlgorithm = GenreAlgorithm(logger)
-	metadata_api: MetadataAPI = MetadataAPI(logger, genre_algorithm)
-
 	cli: CommandLineInterface = CommandLineInterface(logger)
-	cli.add_command(["download"], "Download music files.", downloader.download_tracks)
-	cli.add_command(["download-and-md"], "Combines downloading and setting metadata.", download_and_assign_metadata, arguments=[downloader, metadata_api])
-	cli.add_command(["metadata", "md"], "Find metadata for the library.", populate_metadata_from_musicbrainz, arguments=[metadata_api])
-	cli.add_command(["metadata-album", "md-a"], "Finds metadata using album... Faster, less input required.", populate_metadata_from_musicbrainz_album, arguments=[metadata_api])
-	cli.add_command(["clear"], "Clear metadata files.", clear_metadata_files, arguments=[metadata_api])
-	cli.add_command(["db_keys"], "Print available metadata keys.", print_metadata_keys, arguments=[metadata_api])
-	cli.add_command(["organize"], "Organize music files.", organize_music_files, arguments=[metadata_api])
-	cli.add_command(["recheck"], "Recheck missing metadata.", recheck_missing_metadata, arguments=[metadata_api])
-	cli.add_command(["rescan"], "Rescans the entire library recursively.", rescan_entire_library, arguments=[metadata_api])
-	cli.add_command(["compatible"], "Make description compatible for the library.", make_description_compatible_for_library, arguments=[metadata_api])
-	cli.add_command(["get-tracks"], "Prints the IDs for all tracks in an Album.", print_track_ids_from_album, arguments=[metadata_api])
-	cli.add_command(["add-album-to-downloads"], "Adds an album to the downloads.csv file.", metadata_api.add_album_to_downloads)
-	cli.add_command(["get-genre"], "Retrieves genre information for a track.", get_genre_data, arguments=[genre_algorithm])
+	register_commands(cli)
 
 	cli.start_listen_loop()
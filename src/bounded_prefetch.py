@@ -0,0 +1,61 @@
+import queue
+import threading
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class _Failure:
+	def __init__(self, error: BaseException):
+		self.error: BaseException = error
+
+
+def prefetch(items: Iterable[T], max_pending: int) -> Iterator[T]:
+	"""
+	Produces the items on a background thread, at most max_pending ahead of the consumer.
+	Chaining these turns a generator pipeline into concurrent stages joined by bounded queues: a slow stage
+	holds up the ones before it instead of letting work pile up in memory. Errors are raised in the consumer.
+	"""
+	pending: queue.Queue = queue.Queue(maxsize=max_pending)
+	stopped = threading.Event()
+
+	def put(item) -> bool:
+		while not stopped.is_set():
+			try:
+				pending.put(item, timeout=0.1)
+				return True
+			except queue.Full:
+				continue
+		return False
+
+	def produce() -> None:
+		iterator = iter(items)
+		try:
+			for item in iterator:
+				if not put(item):
+					break
+			else:
+				put(_DONE)
+		except BaseException as e:
+			put(_Failure(e))
+		finally:
+			# An abandoned generator stage gets to clean up (e.g. shut down its pool) on this thread.
+			if hasattr(iterator, "close"):
+				iterator.close()
+
+	producer = threading.Thread(target=produce, name="prefetch", daemon=True)
+	producer.start()
+
+	try:
+		while True:
+			item = pending.get()
+			if item is _DONE:
+				return
+			if isinstance(item, _Failure):
+				raise item.error
+			yield item
+	finally:
+		stopped.set()
+		producer.join()
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 ROOT: Path = Path(os.path.realpath(__file__)).parent.parent
 
@@ -11,4 +11,46 @@ DOWNLOAD_CSV_FILE: Path = ROOT.joinpath("downloads.csv")
 
 COOKIES_FILE: Path = Path("D:\\.media\\.cookies\\cookies.txt")
 
-SUPPORTED_MUSIC_EXTENSIONS: List[str] = [".mp3", ".wav", ".flac", ".m4a", ".ogg", ".wma", ".aiff", ".opus"]
\ No newline at end of file
+SUPPORTED_MUSIC_EXTENSIONS: List[str] = [".mp3", ".wav", ".flac", ".m4a", ".ogg", ".wma", ".aiff", ".opus"]
+MUSICBRAINZ_HOST: str = "musicbrainz.org"
+MUSICBRAINZ_RATE_LIMIT_INTERVAL: float = 1.0
+
+LIBRARY_INDEX_FILE: Path = ROOT.joinpath("library_index.db")
+DOWNLOAD_LEDGER_FILE: Path = ROOT.joinpath("download_ledger.csv")
+
+FFMPEG_PATH: str = "ffmpeg"
+# "always_flac", "keep_native" (remux lossy sources into Ogg/M4A without re-encoding) or "per_source".
+DOWNLOAD_CODEC_MODE: str = "always_flac"
+# Used by "per_source": the mode for each source codec as yt-dlp reports it (opus, vorbis, mp4a, aac, mp3, flac), and for any other codec.
+DOWNLOAD_CODEC_SOURCE_RULES: Dict[str, str] = {"opus": "keep_native", "vorbis": "keep_native"}
+DOWNLOAD_CODEC_DEFAULT_MODE: str = "always_flac"
+
+WATCH_SETTLE_SECONDS: float = 2.0
+WATCH_POLL_INTERVAL: float = 5.0
+
+SERVER_HOST: str = "127.0.0.1"
+SERVER_PORT: int = 8765
+RELEASE_SELECTION_FILE: Path = ROOT.joinpath("release_selections.json")
+
+STAGING_PATH: Path = ROOT.joinpath("staging")
+STAGING_TRANSFER_WORKERS: int = 4
+STAGING_VERIFY_CHECKSUMS: bool = True
+
+COVER_ART_ARCHIVE_HOST: str = "coverartarchive.org"
+COVER_ART_CACHE_PATH: Path = ROOT.joinpath("cover_art_cache")
+COVER_ART_MAX_SIZE: int = 1200
+EMBED_COVER_ART: bool = True
+
+ANALYZE_ENERGY_AND_TEMPO: bool = True
+
+MANIFEST_WORKERS: int = 4
+
+RESCAN_DEEP_SCAN_INTERVAL_DAYS: float = 7.0
+
+PREFETCH_ARTIST_CATALOGUES: bool = True
+
+JOB_QUEUE_FILE: Path = ROOT.joinpath("job_queue.db")
+JOB_LEASE_SECONDS: float = 300.0
+JOB_MAX_ATTEMPTS: int = 3
+JOB_RETRY_BACKOFF_SECONDS: float = 30.0
+WORKER_POLL_INTERVAL: float = 5.0
@@ -0,0 +1,71 @@
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from py_common.logging import HoornLogger
+
+from src.constants import COVER_ART_ARCHIVE_HOST
+from src.musicbrainz.http_connection_pool import HTTPConnectionPool
+from src.musicbrainz.musicbrainz_client import USER_AGENT
+
+REDIRECT_STATUS_CODES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS: int = 5
+
+# Sizes of the thumbnails the Cover Art Archive pre-renders for every front cover.
+THUMBNAIL_SIZES = (250, 500, 1200)
+
+
+class CoverArtArchiveError(Exception):
+	pass
+
+
+class CoverArtArchiveClient:
+	"""
+	Downloads front covers from the Cover Art Archive over kept-alive connections.
+	The archive answers with redirects to the image host (archive.org), so one connection pool is kept per host.
+	"""
+
+	def __init__(self, logger: HoornLogger, host: str = COVER_ART_ARCHIVE_HOST, port: int = None, use_https: bool = True):
+		self._logger = logger
+		self._base_url: str = f"{'https' if use_https else 'http'}://{host}{f':{port}' if port else ''}"
+		self._pools: Dict[Tuple[str, str, Optional[int]], HTTPConnectionPool] = {}
+		self._lock: threading.Lock = threading.Lock()
+
+	def get_front_cover(self, release_id: str, max_size: int = None) -> Optional[bytes]:
+		"""
+		Returns the front cover of a release, or None if the release has none.
+		With a max_size, the smallest pre-rendered thumbnail at least that large is fetched instead of the (often huge) original.
+		"""
+		thumbnail = next((size for size in THUMBNAIL_SIZES if max_size is not None and size >= max_size), None)
+		path = f"/release/{release_id}/front" + (f"-{thumbnail}" if thumbnail else "")
+		return self._get(f"{self._base_url}{path}")
+
+	def close(self) -> None:
+		with self._lock:
+			for pool in self._pools.values():
+				pool.close()
+
+	def _get(self, url: str) -> Optional[bytes]:
+		for _ in range(MAX_REDIRECTS + 1):
+			parts = urlsplit(url)
+			path = parts.path + (f"?{parts.query}" if parts.query else "")
+			status, headers, body = self._get_pool(parts.scheme, parts.hostname, parts.port).request("GET", path, {"User-Agent": USER_AGENT, "Connection": "keep-alive"})
+
+			if status == 200:
+				return body
+			if status == 404:
+				return None
+			if status in REDIRECT_STATUS_CODES and "location" in headers:
+				url = urljoin(url, headers["location"])
+				continue
+
+			raise CoverArtArchiveError(f"The Cover Art Archive responded {status} for '{url}'.")
+
+		raise CoverArtArchiveError(f"Too many redirects fetching '{url}'.")
+
+	def _get_pool(self, scheme: str, host: str, port: Optional[int]) -> HTTPConnectionPool:
+		key = (scheme, host, port)
+		with self._lock:
+			if key not in self._pools:
+				self._pools[key] = HTTPConnectionPool(self._logger, host, port, use_https=scheme == "https")
+			return self._pools[key]
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from py_common.logging import HoornLogger
+
+from src.constants import COVER_ART_CACHE_PATH
+from src.cover_art.cover_art_model import CoverArtModel
+
+
+class CoverArtCache:
+	"""
+	Content-addressed, on-disk cache of processed covers.
+	Images are stored once under their SHA-256, so reissues sharing a cover share the file;
+	`releases.json` maps every release to its image, or to null when the release has no front cover.
+	"""
+
+	def __init__(self, logger: HoornLogger, cache_path: Path = COVER_ART_CACHE_PATH):
+		self._logger = logger
+		self._cache_path: Path = cache_path
+		self._index_file: Path = cache_path.joinpath("releases.json")
+		self._lock: threading.Lock = threading.Lock()
+		self._releases: Dict[str, Optional[str]] = {}
+		self._images: Dict[str, Dict[str, object]] = {}
+		self._load()
+
+	def _load(self) -> None:
+		if not self._index_file.is_file():
+			return
+
+		try:
+			with open(self._index_file, "r", encoding="utf-8") as file:
+				data = json.load(file)
+		except (OSError, ValueError) as e:
+			self._logger.warning(f"Could not read the cover art cache index {self._index_file}: {e}")
+			return
+
+		self._releases = data.get("releases", {})
+		self._images = data.get("images", {})
+
+	def _save(self) -> None:
+		temporary_file = self._index_file.with_suffix(".tmp")
+		with open(temporary_file, "w", encoding="utf-8") as file:
+			json.dump({"releases": self._releases, "images": self._images}, file, indent=2)
+		os.replace(temporary_file, self._index_file)
+
+	def contains(self, release_id: str) -> bool:
+		"""Whether the release was looked up before, with or without a cover."""
+		return release_id in self._releases
+
+	def load(self, release_id: str) -> Optional[CoverArtModel]:
+		sha256 = self._releases.get(release_id)
+		if sha256 is None:
+			return None
+
+		try:
+			data = self._object_path(sha256).read_bytes()
+		except OSError as e:
+			self._logger.warning(f"Cached cover of release {release_id} is unreadable, fetching it again: {e}")
+			with self._lock:
+				del self._releases[release_id]
+			return None
+
+		image = self._images[sha256]
+		return CoverArtModel(release_id=release_id, sha256=sha256, mime_type=image["mime_type"], data=data, width=image["width"], height=image["height"])
+
+	def store(self, release_id: str, data: Optional[bytes], mime_type: str = "image/jpeg", width: int = 0, height: int = 0) -> Optional[CoverArtModel]:
+		"""Stores a release's processed cover; data None records that the release has none."""
+		sha256 = hashlib.sha256(data).hexdigest() if data is not None else None
+
+		with self._lock:
+			if sha256 is not None and sha256 not in self._images:
+				object_path = self._object_path(sha256)
+				object_path.parent.mkdir(parents=True, exist_ok=True)
+				object_path.write_bytes(data)
+				self._images[sha256] = {"mime_type": mime_type, "width": width, "height": height}
+
+			self._cache_path.mkdir(parents=True, exist_ok=True)
+			self._releases[release_id] = sha256
+			self._save()
+
+		if sha256 is None:
+			return None
+		return CoverArtModel(release_id=release_id, sha256=sha256, mime_type=mime_type, data=data, width=width, height=height)
+
+	def _object_path(self, sha256: str) -> Path:
+		return self._cache_path.joinpath("objects", sha256[:2], sha256)
@@ -0,0 +1,11 @@
+import pydantic
+
+
+class CoverArtModel(pydantic.BaseModel):
+	"""The front cover of a release, processed once and shared by every track of the release."""
+	release_id: str
+	sha256: str
+	mime_type: str
+	data: bytes
+	width: int = 0
+	height: int = 0
@@ -0,0 +1,44 @@
+import io
+import struct
+from typing import Tuple
+
+# Pillow is optional: without it covers are embedded as served, which the archive's thumbnails already keep small.
+try:
+	from PIL import Image
+except ImportError:
+	Image = None
+
+JPEG_QUALITY: int = 90
+
+
+def sniff_mime_type(data: bytes) -> str:
+	if data.startswith(b"\x89PNG\r\n\x1a\n"):
+		return "image/png"
+	return "image/jpeg"
+
+
+def _png_dimensions(data: bytes) -> Tuple[int, int]:
+	# The IHDR chunk always comes first and starts with the width and height.
+	return struct.unpack(">II", data[16:24])
+
+
+def process_cover_art(data: bytes, max_size: int) -> Tuple[bytes, str, int, int]:
+	"""
+	Scales a cover down to fit max_size x max_size and re-encodes it as a baseline JPEG, once per release.
+	Returns the image data, MIME type, width and height (0 when unknown).
+	"""
+	if Image is None:
+		mime_type = sniff_mime_type(data)
+		width, height = _png_dimensions(data) if mime_type == "image/png" else (0, 0)
+		return data, mime_type, width, height
+
+	with Image.open(io.BytesIO(data)) as image:
+		if max(image.size) <= max_size and image.format == "JPEG":
+			return data, "image/jpeg", image.width, image.height
+
+		image = image.convert("RGB")
+		image.thumbnail((max_size, max_size), Image.LANCZOS)
+
+		output = io.BytesIO()
+		image.save(output, "JPEG", quality=JPEG_QUALITY, optimize=True)
+		return output.getvalue(), "image/jpeg", image.width, image.height
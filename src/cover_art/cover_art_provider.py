@@ -0,0 +1,73 @@
+import threading
+from typing import Dict, Optional
+
+from py_common.logging import HoornLogger
+
+from src.constants import COVER_ART_MAX_SIZE
+from src.cover_art.cover_art_archive_client import CoverArtArchiveClient, CoverArtArchiveError
+from src.cover_art.cover_art_cache import CoverArtCache
+from src.cover_art.cover_art_model import CoverArtModel
+from src.cover_art.cover_art_processor import process_cover_art
+
+
+class CoverArtProvider:
+	"""
+	Hands out the front cover of a release for embedding.
+	Each release is downloaded and processed at most once (concurrent requests for the same release wait for the first),
+	then served from memory for the rest of the session and from the on-disk cache afterwards.
+	"""
+
+	def __init__(self, logger: HoornLogger, client: CoverArtArchiveClient = None, cache: CoverArtCache = None, max_size: int = COVER_ART_MAX_SIZE):
+		self._logger = logger
+		self._client: CoverArtArchiveClient = client if client is not None else CoverArtArchiveClient(logger)
+		self._cache: CoverArtCache = cache if cache is not None else CoverArtCache(logger)
+		self._max_size: int = max_size
+		self._covers: Dict[str, Optional[CoverArtModel]] = {}
+		self._release_locks: Dict[str, threading.Lock] = {}
+		self._lock: threading.Lock = threading.Lock()
+		self._downloads: int = 0
+
+	@property
+	def downloads(self) -> int:
+		"""Number of covers fetched from the archive by this provider."""
+		return self._downloads
+
+	def get_front_cover(self, release_id: str) -> Optional[CoverArtModel]:
+		if release_id in self._covers:
+			return self._covers[release_id]
+
+		with self._lock:
+			release_lock = self._release_locks.setdefault(release_id, threading.Lock())
+
+		with release_lock:
+			if release_id in self._covers:
+				return self._covers[release_id]
+
+			try:
+				cover = self._load_or_fetch(release_id)
+			except (CoverArtArchiveError, OSError, ValueError) as e:
+				# Not remembered, so the next track of the release tries again.
+				self._logger.warning(f"Could not get the cover of release {release_id}: {e}")
+				return None
+
+			self._covers[release_id] = cover
+			return cover
+
+	def _load_or_fetch(self, release_id: str) -> Optional[CoverArtModel]:
+		if self._cache.contains(release_id):
+			cover = self._cache.load(release_id)
+			# load() forgets releases whose image went missing, those are fetched again.
+			if cover is not None or self._cache.contains(release_id):
+				return cover
+
+		data = self._client.get_front_cover(release_id, self._max_size)
+		with self._lock:
+			self._downloads += 1
+
+		if data is None:
+			self._logger.debug(f"Release {release_id} has no front cover in the Cover Art Archive.")
+			return self._cache.store(release_id, None)
+
+		image, mime_type, width, height = process_cover_art(data, self._max_size)
+		self._logger.debug(f"Fetched the cover of release {release_id} ({len(image) // 1024} KiB).")
+		return self._cache.store(release_id, image, mime_type, width, height)
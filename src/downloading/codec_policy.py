@@ -0,0 +1,66 @@
+from enum import Enum
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+class CodecMode(Enum):
+	KeepNative = "keep_native"
+	AlwaysFlac = "always_flac"
+	PerSource = "per_source"
+
+
+# Container to remux each (yt-dlp reported) source codec into without re-encoding.
+NATIVE_CONTAINERS: Dict[str, str] = {
+	"opus": ".opus",
+	"vorbis": ".ogg",
+	"mp4a": ".m4a",
+	"aac": ".m4a",
+	"mp3": ".mp3",
+	"flac": ".flac",
+}
+
+FLAC_ARGUMENTS: List[str] = ["-c:a", "flac"]
+COPY_ARGUMENTS: List[str] = ["-c:a", "copy"]
+
+
+class CodecPolicy:
+	"""
+	Decides what a downloaded audio stream is turned into.
+
+	- KeepNative remuxes the stream into a taggable container (Ogg/M4A) without re-encoding it.
+	- AlwaysFlac encodes every stream to FLAC.
+	- PerSource looks the source codec up in `source_rules` and falls back to `default_mode` for unknown codecs.
+
+	AlwaysFlac is the default. Lossy sources gain nothing from a FLAC encode, so opting into KeepNative saves the CPU time
+	and 3-5x the disk space.
+	"""
+
+	def __init__(self, mode: CodecMode = CodecMode.AlwaysFlac, source_rules: Dict[str, CodecMode] = None, default_mode: CodecMode = CodecMode.AlwaysFlac):
+		self._mode: CodecMode = mode
+		self._source_rules: Dict[str, CodecMode] = source_rules or {}
+		self._default_mode: CodecMode = default_mode
+
+	def resolve(self, source: Path, source_codec: str = None) -> Tuple[Path, List[str]]:
+		"""Returns the target path and the FFmpeg audio codec arguments for the downloaded file."""
+		codec = self._normalize_codec(source, source_codec)
+		mode = self._mode_for(codec)
+
+		if mode == CodecMode.KeepNative and codec in NATIVE_CONTAINERS:
+			return source.with_suffix(NATIVE_CONTAINERS[codec]), COPY_ARGUMENTS
+
+		return source.with_suffix(".flac"), FLAC_ARGUMENTS
+
+	def _mode_for(self, codec: str) -> CodecMode:
+		if self._mode != CodecMode.PerSource:
+			return self._mode
+
+		return self._source_rules.get(codec, self._default_mode)
+
+	@staticmethod
+	def _normalize_codec(source: Path, source_codec: str or None) -> str:
+		if source_codec:
+			# yt-dlp reports codecs such as "opus" or "mp4a.40.2".
+			return source_codec.split(".")[0].lower()
+
+		# Without codec information, guess from the container.
+		return {".webm": "opus", ".m4a": "mp4a", ".mp3": "mp3", ".flac": "flac", ".ogg": "vorbis", ".opus": "opus"}.get(source.suffix.lower(), "")
@@ -0,0 +1,78 @@
+import csv
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from py_common.logging import HoornLogger
+
+from src.constants import DOWNLOAD_LEDGER_FILE
+from src.downloading.download_model import DownloadModel
+
+LEDGER_HEADER: List[str] = ["URL", "RECORDING ID", "RELEASE ID", "PATH"]
+
+
+class DownloadLedger:
+	"""
+	Append-only, persistent record of every track that was downloaded successfully.
+	Lets re-runs of a download list skip URLs and recordings that were acquired before.
+	"""
+
+	def __init__(self, logger: HoornLogger, ledger_file: Path = DOWNLOAD_LEDGER_FILE):
+		self._logger = logger
+		self._ledger_file: Path = ledger_file
+		self._lock: threading.Lock = threading.Lock()
+		self._by_url: Dict[str, DownloadModel] = {}
+		self._by_recording_id: Dict[str, DownloadModel] = {}
+		self._by_path: Dict[str, DownloadModel] = {}
+		self._load()
+
+	def reload(self) -> None:
+		"""Re-reads the ledger, picking up downloads recorded by other processes."""
+		with self._lock:
+			self._by_url.clear()
+			self._by_recording_id.clear()
+			self._by_path.clear()
+			self._load()
+
+	def _load(self) -> None:
+		if not self._ledger_file.is_file():
+			return
+
+		with open(self._ledger_file, "r", newline="", encoding="utf-8") as file:
+			reader = csv.reader(file)
+			next(reader, None)  # Skip the header line
+
+			for row in reader:
+				if len(row) < len(LEDGER_HEADER):
+					continue
+
+				url, recording_id, release_id, path = row[:4]
+				self._remember(DownloadModel(url=url, recording_id=recording_id or None, release_id=release_id or None, path=Path(path) if path else None))
+
+		self._logger.debug(f"Loaded {len(self._by_url)} entries from the download ledger.")
+
+	def _remember(self, download_model: DownloadModel) -> None:
+		self._by_url[download_model.url] = download_model
+		if download_model.recording_id:
+			self._by_recording_id[download_model.recording_id] = download_model
+		if download_model.path:
+			self._by_path[str(download_model.path)] = download_model
+
+	def contains(self, url: str, recording_id: str = None) -> bool:
+		"""Returns whether the URL, or a download of the same recording, is already in the ledger."""
+		return url in self._by_url or (bool(recording_id) and recording_id in self._by_recording_id)
+
+	def get_by_path(self, path: Path) -> Optional[DownloadModel]:
+		return self._by_path.get(str(path))
+
+	def record(self, download_model: DownloadModel) -> None:
+		with self._lock:
+			is_new_file = not self._ledger_file.is_file()
+
+			with open(self._ledger_file, "a", newline="", encoding="utf-8") as file:
+				writer = csv.writer(file)
+				if is_new_file:
+					writer.writerow(LEDGER_HEADER)
+				writer.writerow([download_model.url, download_model.recording_id or "", download_model.release_id or "", str(download_model.path or "")])
+
+			self._remember(download_model)
@@ -0,0 +1,64 @@
+import os
+import subprocess
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import List
+
+from py_common.logging import HoornLogger
+
+from src.constants import FFMPEG_PATH
+from src.downloading.codec_policy import CodecPolicy
+
+
+def _transcode(source: str, target: str, codec_arguments: List[str]) -> str:
+	"""Transcodes (or remuxes) the raw download inside a worker process and removes the raw file afterwards."""
+	command = [FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y", "-i", source, "-vn", *codec_arguments, target]
+	completed = subprocess.run(command, capture_output=True, text=True)
+
+	if completed.returncode != 0:
+		raise RuntimeError(f"FFmpeg failed with exit code {completed.returncode}: {completed.stderr.strip()}")
+
+	os.remove(source)
+	return target
+
+
+class TranscodePool:
+	"""
+	Transcodes downloaded audio streams on a process pool sized to the CPU count,
+	so downloads (network bound) and encodes (CPU bound) can overlap instead of taking turns.
+	What each stream becomes is decided by the `CodecPolicy`.
+	"""
+
+	def __init__(self, logger: HoornLogger, codec_policy: CodecPolicy = None, max_workers: int = None):
+		self._logger = logger
+		self._codec_policy: CodecPolicy = codec_policy if codec_policy is not None else CodecPolicy()
+		self._max_workers: int = max_workers if max_workers is not None else os.cpu_count() or 1
+		self._executor: ProcessPoolExecutor or None = None
+
+	def __enter__(self) -> "TranscodePool":
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+		self.shutdown()
+
+	def submit(self, source: Path, source_codec: str = None) -> Future:
+		"""Queues the raw file for transcoding; the future resolves to the path of the final file."""
+		target, codec_arguments = self._codec_policy.resolve(source, source_codec)
+
+		if target.suffix.lower() == source.suffix.lower():
+			# Already in the wanted container and codec, nothing to do.
+			future: Future = Future()
+			future.set_result(source)
+			return future
+
+		if self._executor is None:
+			self._logger.debug(f"Starting transcode pool with {self._max_workers} processes.")
+			self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+
+		return self._executor.submit(_transcode, str(source), str(target), codec_arguments)
+
+	def shutdown(self) -> None:
+		"""Waits for all queued transcodes to finish."""
+		if self._executor is not None:
+			self._executor.shutdown(wait=True)
+			self._executor = None
@@ -1,23 +1,37 @@
+import csv
 import os.path
 import re
 import time
 from pathlib import Path
-from typing import List, Dict
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterator, List
 
 import yt_dlp
 from py_common.logging import HoornLogger
 
-from src.constants import DOWNLOAD_PATH, COOKIES_FILE, DOWNLOAD_CSV_FILE
+from src.constants import DOWNLOAD_PATH, COOKIES_FILE, DOWNLOAD_CSV_FILE, DOWNLOAD_CODEC_MODE, DOWNLOAD_CODEC_SOURCE_RULES, DOWNLOAD_CODEC_DEFAULT_MODE
+from src.downloading.codec_policy import CodecMode, CodecPolicy
+from src.downloading.download_ledger import DownloadLedger
 from src.downloading.download_model import DownloadModel
 from src.downloading.music_download_interface import MusicDownloadInterface
+from src.downloading.transcode_pool import TranscodePool
+from src.indexing.library_index import LibraryIndex
 
 
 class YTDLPMusicDownloader(MusicDownloadInterface):
-	def __init__(self, logger: HoornLogger):
+	def __init__(self, logger: HoornLogger, codec_policy: CodecPolicy = None):
 		super().__init__(is_child=True)
 		self._logger = logger
+		self._codec_policy: CodecPolicy = codec_policy if codec_policy is not None else self._create_codec_policy()
+		self._ledger: DownloadLedger = DownloadLedger(logger)
+		self._library_index: LibraryIndex = LibraryIndex(logger)
 		self._logger.debug("YTDLPMusicDownloader initialized")
 
+	@staticmethod
+	def _create_codec_policy() -> CodecPolicy:
+		source_rules = {codec: CodecMode(mode) for codec, mode in DOWNLOAD_CODEC_SOURCE_RULES.items()}
+		return CodecPolicy(CodecMode(DOWNLOAD_CODEC_MODE), source_rules, CodecMode(DOWNLOAD_CODEC_DEFAULT_MODE))
+
 	def download_tracks(self) -> List[DownloadModel]:
 		choice = self._get_choice()
 		if choice.lower() =='single':
@@ -30,7 +44,9 @@ class YTDLPMusicDownloader(MusicDownloadInterface):
 		recording_id: str = input("Enter the recording ID: ")
 		album_id: str = input("Enter the album ID: ")
 		path: Path = self._download_urls([url])[url]
-		return DownloadModel(url=url, path=path, recording_id=recording_id, release_id=album_id)
+		download_model = DownloadModel(url=url, path=path, recording_id=recording_id, release_id=album_id)
+		self._ledger.record(download_model)
+		return download_model
 
 	def _download_csv_tracks(self) -> List[DownloadModel]:
 		file_path = input("Enter the file path containing the music URLs (csv, leave empty for default): ")
@@ -45,46 +61,69 @@ class YTDLPMusicDownloader(MusicDownloadInterface):
 			self._logger.error(f"File not found: {file_path}")
 			return []
 
-		with open(file_path, 'r') as file:
-			data = file.readlines()[1:] # Skip the header line
-			url_data = {}
-
-			for line in data:
-				parts = line.strip().split(',')
-				url_data[parts[0]] = {
-					"release id": parts[1],
-                    "recording id": parts[2],
-                    "genre": parts[4] if not want_to_detect_genres_automatically else None,
-                    "subgenres": parts[5] if not want_to_detect_genres_automatically else None
-				}
-
-			paths: Dict[str, Path] = self._download_urls([url for url, _ in url_data.items()])
-
-			download_models: List[DownloadModel] = []
-			for url, path in paths.items():
-				download_models.append(DownloadModel(
-                    url=url,
-					path=path,
-                    release_id=url_data[url]['release id'],
-                    recording_id=url_data[url]['recording id'],
-                    genre=url_data[url]['genre'],
-                    subgenre=url_data[url]['subgenres']
-                ))
-
-			missed_urls = [url for url in url_data.keys() if url not in paths.keys()]
-			for url in missed_urls:
-				self._logger.warning(f"The following url could not be downloaded: {url}, id: {url_data[url]['recording id']}")
-
-			return download_models
-
-	def _download_urls(self, urls: List[str]) -> Dict[str, Path]:
+		url_data = {}
+		skipped = 0
+
+		for row in self._read_download_rows(file_path):
+			url, release_id, recording_id = row[0], row[1], row[2]
+
+			if url == "":
+				self._logger.debug(f"Skipping row without URL for recording id: {recording_id}")
+				continue
+
+			if self._ledger.contains(url, recording_id) or self._library_index.contains_recording(recording_id):
+				skipped += 1
+				continue
+
+			url_data[url] = {
+				"release id": release_id,
+				"recording id": recording_id,
+				"genre": row[4] if not want_to_detect_genres_automatically else None,
+				"subgenres": row[5] if not want_to_detect_genres_automatically else None
+			}
+
+		self._logger.info(f"Skipping {skipped} already acquired track(s), downloading {len(url_data)} new track(s).")
+
+		download_models: List[DownloadModel] = []
+
+		def _on_downloaded(url: str, path: Path) -> None:
+			download_model = DownloadModel(
+				url=url,
+				path=path,
+				release_id=url_data[url]['release id'],
+				recording_id=url_data[url]['recording id'],
+				genre=url_data[url]['genre'],
+				subgenre=url_data[url]['subgenres']
+			)
+			self._ledger.record(download_model)
+			download_models.append(download_model)
+
+		paths: Dict[str, Path] = self._download_urls([url for url, _ in url_data.items()], _on_downloaded)
+
+		missed_urls = [url for url in url_data.keys() if url not in paths.keys()]
+		for url in missed_urls:
+			self._logger.warning(f"The following url could not be downloaded: {url}, id: {url_data[url]['recording id']}")
+
+		return download_models
+
+	def _read_download_rows(self, file_path: Path) -> Iterator[List[str]]:
+		"""
+		Streams the rows of the downloads CSV (URL,RELEASE ID,TRACK ID,TRACK TITLE,GENRE,SUBGENRES).
+		Quoted fields may contain commas; missing trailing columns are returned as empty strings.
+		"""
+		with open(file_path, 'r', newline='', encoding='utf-8') as file:
+			reader = csv.reader(file)
+			next(reader, None)  # Skip the header line
+
+			for row in reader:
+				if not row:
+					continue
+				yield [column.strip() for column in row] + [""] * (6 - len(row))
+
+	def _download_urls(self, urls: List[str], on_downloaded: Callable[[str, Path], None] = None) -> Dict[str, Path]:
+		# The raw audio stream is downloaded as-is; encoding happens on the transcode pool while the next download runs.
 		ydl_opts = {
 			'format': 'bestaudio/best',
-			'postprocessors': [{
-				'key': 'FFmpegExtractAudio',
-				'preferredcodec': 'flac',
-				'preferredquality': '192',
-			}],
 			'outtmpl': os.path.join(DOWNLOAD_PATH, '%(title)s.%(ext)s'),
 			'noplaylist': True,
 			"cookiefile": COOKIES_FILE
@@ -92,7 +131,18 @@ class YTDLPMusicDownloader(MusicDownloadInterface):
 
 		downloaded_files: Dict[str, Path] = {}
 
-		with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+		def _on_transcoded(url: str, future: Future) -> None:
+			try:
+				path = Path(future.result())
+			except Exception as e:
+				self._logger.error(f"An error occurred while transcoding '{url}': {e}")
+				return
+
+			downloaded_files[url] = path
+			if on_downloaded is not None:
+				on_downloaded(url, path)
+
+		with yt_dlp.YoutubeDL(ydl_opts) as ydl, TranscodePool(self._logger, self._codec_policy) as transcode_pool:
 			for url in urls:
 				retries = 3
 				backoff_factor = 2
@@ -103,13 +153,13 @@ class YTDLPMusicDownloader(MusicDownloadInterface):
 						title = self._clean_filename(title)
 
 						info_dict['title'] = title
-						info_dict['ext'] = 'flac'
 						ydl_opts['outtmpl']['default'] = os.path.join(DOWNLOAD_PATH, f'{title}.%(ext)s')
 
 						ydl.download([url])
 
 						file_path = ydl.prepare_filename(info_dict)
-						downloaded_files[url] = Path(file_path)
+						future = transcode_pool.submit(Path(file_path), info_dict.get('acodec'))
+						future.add_done_callback(lambda done, downloaded_url=url: _on_transcoded(downloaded_url, done))
 						time.sleep(0.5)
 						break  # Comment this line if you want to torment your soul for all eternity.
 					except yt_dlp.utils.DownloadError as e:
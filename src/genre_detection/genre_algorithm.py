@@ -1,11 +1,11 @@
 from typing import List
 
-import musicbrainzngs
 from py_common.logging import HoornLogger
 
 from src.genre_detection.genre_apis.genre_api_interface import GenreAPIInterface
 from src.genre_detection.genre_apis.music_brainz_genre_api import MusicBrainzGenreAPI
 from src.genre_detection.model.genre_data_model import GenreDataModel
+from src.musicbrainz.musicbrainz_client import MusicBrainzClient
 
 
 class GenreAlgorithm:
@@ -14,16 +14,17 @@ class GenreAlgorithm:
 	Uses several APIs to come up with a somewhat accurate guess.
 	"""
 
-	def __init__(self, logger: HoornLogger):
+	def __init__(self, logger: HoornLogger, musicbrainz_client: MusicBrainzClient):
 		self._logger = logger
+		self._musicbrainz_client: MusicBrainzClient = musicbrainz_client
 		self._genre_api_interfaces: List[GenreAPIInterface] = [
-			MusicBrainzGenreAPI(logger)
+			MusicBrainzGenreAPI(logger, musicbrainz_client)
 		]
 
 	def get_genre_data(self, mbid: str, album_id: str = None) -> GenreDataModel:
 		self._logger.debug(f"Getting genre data for {mbid}...")
 
-		recording = musicbrainzngs.get_recording_by_id(mbid, includes=['artists'])
+		recording = self._musicbrainz_client.get_recording_by_id(mbid, includes=['artists'])
 		title = recording['recording']['title']
 		artist = recording['recording']['artist-credit'][0]['artist']['name']
 
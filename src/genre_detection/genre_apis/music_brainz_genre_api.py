@@ -1,12 +1,14 @@
+from collections import Counter
 from typing import List, Tuple
 
-import musicbrainzngs
 from py_common.logging import HoornLogger
 
 from src.genre_detection.genre_apis.genre_api_interface import GenreAPIInterface
 from src.genre_detection.model.genre_data_model import GenreDataModel
 from src.genre_detection.standardization.construct_standardized_genres import ConstructStandardizedGenres
+from src.genre_detection.standardization.genre_hierarchy import GenreHierarchy
 from src.genre_detection.standardization.genre_standard_model import GenreStandardModel
+from src.musicbrainz.musicbrainz_client import MusicBrainzClient
 
 
 class MusicBrainzGenreAPI(GenreAPIInterface):
@@ -14,14 +16,36 @@ class MusicBrainzGenreAPI(GenreAPIInterface):
 	API for querying MusicBrainz genre data.
 	"""
 
-	def __init__(self, logger: HoornLogger):
+	def __init__(self, logger: HoornLogger, musicbrainz_client: MusicBrainzClient):
 		self._logger = logger
-		construct_standardized_genres: ConstructStandardizedGenres = ConstructStandardizedGenres(logger)
-		self._standardized_genres = construct_standardized_genres.construct()
-		self._standardized_genres = self._compile_list_of_standardized_genres()
-		self._unknown_genre: GenreStandardModel = self._get_unknown_genre()
+		self._musicbrainz_client: MusicBrainzClient = musicbrainz_client
+		# Compiled on first use, so commands that never map genres do not pay for it.
+		self._compiled_standardized_genres: List[GenreStandardModel] or None = None
+		self._compiled_genre_hierarchy: GenreHierarchy or None = None
+		self._compiled_unknown_genre: GenreStandardModel or None = None
 		super().__init__(is_child=True)
 
+	@property
+	def _standardized_genres(self) -> List[GenreStandardModel]:
+		if self._compiled_standardized_genres is None:
+			construct_standardized_genres: ConstructStandardizedGenres = ConstructStandardizedGenres(self._logger)
+			standardized_genres = construct_standardized_genres.construct()
+			self._compiled_genre_hierarchy = GenreHierarchy(standardized_genres)
+			self._compiled_standardized_genres = self._compile_list_of_standardized_genres(standardized_genres)
+		return self._compiled_standardized_genres
+
+	@property
+	def _genre_hierarchy(self) -> GenreHierarchy:
+		if self._compiled_genre_hierarchy is None:
+			_ = self._standardized_genres
+		return self._compiled_genre_hierarchy
+
+	@property
+	def _unknown_genre(self) -> GenreStandardModel:
+		if self._compiled_unknown_genre is None:
+			self._compiled_unknown_genre = self._get_unknown_genre()
+		return self._compiled_unknown_genre
+
 	def get_genre_data(self, track_title: str, track_artist: str = None, track_album: str = None, track_id: str = None, album_id: str = None) -> GenreDataModel:
 		self._logger.debug(f"Fetching genre data for track: {track_title} by {track_artist} ({track_id})")
 
@@ -39,7 +63,7 @@ class MusicBrainzGenreAPI(GenreAPIInterface):
 		)
 
 	def _get_genre_data_from_musicbrainz(self, track_id: str) -> List[str]:
-		recording = musicbrainzngs.get_recording_by_id(track_id, includes=["tags"])
+		recording = self._musicbrainz_client.get_recording_by_id(track_id, includes=["tags"])
 
 		try:
 			genres = recording["recording"]["tag-list"]
@@ -141,8 +165,12 @@ class MusicBrainzGenreAPI(GenreAPIInterface):
 		final_sub_genres: List[GenreStandardModel] = []
 
 		if len(raw_main_genres) == 0:
-			self._logger.warning("No main genre found for track.")
-			final_main_genre = self._unknown_genre
+			final_main_genre = self._infer_main_genre(raw_sub_genres)
+			if final_main_genre is None:
+				self._logger.warning("No main genre found for track.")
+				final_main_genre = self._unknown_genre
+			else:
+				self._logger.debug(f"No main genre found for track, inferred {final_main_genre.standardized_label} from its sub-genres.")
 		elif len(raw_main_genres) > 1:
 			self._logger.warning("Multiple main genres found for track. Choosing first known one, mapping others as sub-genre.")
 			final_main_genre = self._get_first_known_genre(raw_main_genres)
@@ -156,19 +184,31 @@ class MusicBrainzGenreAPI(GenreAPIInterface):
 
 		return final_main_genre, final_sub_genres
 
+	def _infer_main_genre(self, raw_sub_genres: List[GenreStandardModel]) -> GenreStandardModel or None:
+		"""
+		The main genre most of the sub-genres belong to (the first one on a tie), or None when none of them has one.
+		"""
+		main_genres = [self._genre_hierarchy.get_main_genre(genre) for genre in raw_sub_genres]
+		votes = Counter(genre.standardized_label for genre in main_genres if genre is not None)
+		if not votes:
+			return None
+
+		best_label = max(votes, key=votes.get)
+		return next(genre for genre in main_genres if genre is not None and genre.standardized_label == best_label)
+
 	def _get_first_known_genre(self, raw_main_genres: List[GenreStandardModel]) -> GenreStandardModel:
 		for genre in raw_main_genres:
 			if "*" not in genre.potential_names:
 				return genre
 
-	def _compile_list_of_standardized_genres(self) -> List[GenreStandardModel]:
+	def _compile_list_of_standardized_genres(self, standardized_genres: List[GenreStandardModel]) -> List[GenreStandardModel]:
 		"""
 		Transforms the standardized genre list into a compiled list of genres. This allows for faster lookups.
 		What I mean is that all the genre's subgenres are added to the list.
 		"""
 		compiled = []
 
-		for standardized_genre in self._standardized_genres:
+		for standardized_genre in standardized_genres:
 			compiled.append(standardized_genre)
 			compiled.extend(standardized_genre.get_all_sub_genres())
 
@@ -0,0 +1,47 @@
+from typing import Dict, List, Tuple
+
+from src.genre_detection.standardization.genre_standard_model import GenreStandardModel
+
+
+class GenreHierarchy:
+	"""
+	Ancestor closure of the standardized genre tree, keyed by standardized label.
+	Built once when the taxonomy is compiled, so the parent, root and nearest main genre of any genre are dictionary lookups.
+	"""
+
+	def __init__(self, standardized_genres: List[GenreStandardModel]):
+		self._genres: Dict[str, GenreStandardModel] = {}
+		# Ancestors of every genre, nearest first; top-level genres have none.
+		self._ancestors: Dict[str, Tuple[str, ...]] = {}
+		self._main_genres: Dict[str, str] = {}
+
+		for genre in standardized_genres:
+			self._add(genre, ())
+
+	def _add(self, genre: GenreStandardModel, ancestors: Tuple[str, ...]) -> None:
+		label = genre.standardized_label
+		self._genres[label] = genre
+		self._ancestors[label] = ancestors
+
+		main_genre = next((candidate for candidate in (label,) + ancestors if self._genres[candidate].is_main), None)
+		if main_genre is not None:
+			self._main_genres[label] = main_genre
+
+		for subgenre in genre.subgenres or []:
+			self._add(subgenre, (label,) + ancestors)
+
+	def get_parent(self, genre: GenreStandardModel) -> GenreStandardModel or None:
+		ancestors = self._ancestors.get(genre.standardized_label, ())
+		return self._genres[ancestors[0]] if ancestors else None
+
+	def get_root(self, genre: GenreStandardModel) -> GenreStandardModel:
+		ancestors = self._ancestors.get(genre.standardized_label, ())
+		return self._genres[ancestors[-1]] if ancestors else genre
+
+	def get_ancestors(self, genre: GenreStandardModel) -> List[GenreStandardModel]:
+		return [self._genres[label] for label in self._ancestors.get(genre.standardized_label, ())]
+
+	def get_main_genre(self, genre: GenreStandardModel) -> GenreStandardModel or None:
+		"""The genre itself when it is a main genre, otherwise its nearest main ancestor; None outside any main genre."""
+		main_genre = self._main_genres.get(genre.standardized_label)
+		return self._genres[main_genre] if main_genre is not None else None
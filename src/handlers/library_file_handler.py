@@ -1,16 +1,27 @@
+import os
 import re
 import shutil
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, Iterator, List
 
 from py_common.handlers import FileHandler
 from py_common.logging import HoornLogger
 
+from src.bounded_prefetch import prefetch
 from src.constants import SUPPORTED_MUSIC_EXTENSIONS
+from src.indexing.incremental_scan import IncrementalScan, ScanReport
+from src.indexing.library_index import LibraryIndex
+from src.metadata.helpers.library_table import LibraryTable
 from src.metadata.helpers.recording_model import RecordingModel
+from src.metadata.library_ingestor import LibraryIngestor
 from src.metadata.metadata_manipulator import MetadataKey, MetadataManipulator
 from src.metadata.missing_metadata_finder import MissingMetadataFinder
 
+# Organize runs as scan -> read tags -> validate and place, with bounded queues between the stages:
+# at most this many scanned paths, and this many chunks of read tags, wait for the next stage.
+ORGANIZE_SCAN_QUEUE_SIZE: int = 4096
+ORGANIZE_TAG_QUEUE_CHUNKS: int = 4
+
 
 class LibraryFileHandler:
 	"""Wrapper class around the low-level file handler for use with music libraries."""
@@ -19,6 +30,34 @@ class LibraryFileHandler:
 		self._file_handler = FileHandler()
 		self._metadata_manipulator = MetadataManipulator(logger)
 		self._missing_metadata_finder: MissingMetadataFinder = MissingMetadataFinder(logger)
+		self._library_ingestor: LibraryIngestor = LibraryIngestor(logger)
+		self._library_index: LibraryIndex = LibraryIndex(logger)
+
+	@property
+	def library_index(self) -> LibraryIndex:
+		return self._library_index
+
+	def reindex_file(self, file: Path) -> None:
+		"""Refreshes the index entry of a library file after its tags were written; files outside the library are left to organize."""
+		if self._library_index.get_metadata(file) is None:
+			return
+
+		self._library_index.upsert(file, self._metadata_manipulator.get_all_metadata(file))
+
+	def has_complete_metadata(self, file: Path) -> bool:
+		return self._missing_metadata_finder.is_complete(self._metadata_manipulator.get_all_metadata(file))
+
+	def is_unchanged_since_indexed(self, file: Path) -> bool:
+		"""Whether the file has the size and modification time the index recorded, e.g. right after it was moved or tagged here."""
+		indexed = self._library_index.get_file_state(file)
+		if indexed is None:
+			return False
+
+		try:
+			stat = file.stat()
+		except OSError:
+			return False
+		return indexed == (stat.st_size, stat.st_mtime)
 
 	def get_music_files(self, directory: Path) -> List[Path]:
 		"""
@@ -32,35 +71,55 @@ class LibraryFileHandler:
 
 		return files
 
+	def iterate_music_files(self, directory: Path) -> Iterator[Path]:
+		"""
+		Yields the music files in the directory and its subdirectories as they are found, one directory listing at a time.
+		"""
+		if not directory.is_dir():
+			raise ValueError("The provided path is not a valid directory.")
+
+		directories: List[str] = [str(directory)]
+		while directories:
+			with os.scandir(directories.pop()) as entries:
+				for entry in entries:
+					if entry.is_dir():
+						directories.append(entry.path)
+					elif os.path.splitext(entry.name)[1] in SUPPORTED_MUSIC_EXTENSIONS:
+						yield Path(entry.path)
+
 	def organize_music_files(self, directory_path: Path, organized_path: Path):
 		"""
         Organizes the given music files into the specified organized_path.
         """
-		all_files = [RecordingModel(metadata=self._metadata_manipulator.get_all_metadata(file), path=file) for file in self.get_music_files(directory_path)]
-		missing_metadata_files = self._missing_metadata_finder.find_missing_metadata(all_files)
-		correct_metadata_files = [file for file in all_files if file not in missing_metadata_files]
-
-		for file in correct_metadata_files:
-			self._place_accurate_file(file.path, file, organized_path)
-
-		for file in missing_metadata_files:
-			self._place_inaccurate_file(file.path, organized_path)
+		self.organize_files(self.iterate_music_files(directory_path), organized_path)
 
 		self._remove_empty_directories(directory_path)
 		self._remove_empty_directories(organized_path)
 
-	def _place_accurate_file(self, file: Path, recording_model: RecordingModel, organized_path: Path) -> None:
+	def organize_files(self, music_files: Iterable[Path], organized_path: Path) -> None:
 		"""
-		Places a music file into an organized directory structure based on its metadata.
-
-		Args:
-			file (Path): The path to the music file.
-			recording_model (RecordingModel): The metadata associated with the recording.
-			organized_path (Path): The root path of the organized music library.
+		Organizes only the given music files into the specified organized_path.
+		Files are placed chunk by chunk while later ones are still being found and read, so memory stays flat however large
+		the library is. Files moved into a part of the tree the scan has not reached yet are simply found in place again.
 		"""
+		scanned = prefetch(music_files, ORGANIZE_SCAN_QUEUE_SIZE)
+		for records in prefetch(self._library_ingestor.ingest_stream(scanned), ORGANIZE_TAG_QUEUE_CHUNKS):
+			correct_metadata_files, missing_metadata_files = self._missing_metadata_finder.split_by_completeness(LibraryTable.from_records(records))
 
-		metadata = recording_model.metadata
+			for file in correct_metadata_files.iterate_recording_models():
+				self._place_accurate_file(file.path, file, organized_path)
 
+			for file in missing_metadata_files.iterate_recording_models():
+				self._place_inaccurate_file(file.path, file, organized_path)
+
+	def get_destination(self, file: Path, organized_path: Path) -> Path:
+		"""The path organizing the file would move it to, going by its current tags."""
+		metadata = self._metadata_manipulator.get_all_metadata(file)
+		if self._missing_metadata_finder.is_complete(metadata):
+			return self._get_accurate_destination(file, metadata, organized_path)
+		return self._get_inaccurate_destination(file, organized_path)
+
+	def _get_accurate_destination(self, file: Path, metadata: Dict[MetadataKey, str], organized_path: Path) -> Path:
 		# Construct the new file name
 		track_number = int(metadata[MetadataKey.TrackNumber])
 		artist = metadata[MetadataKey.Artist]
@@ -71,9 +130,26 @@ class LibraryFileHandler:
 		# Construct the new directory path
 		genre = metadata[MetadataKey.Genre].split(';')[0]
 		album = metadata[MetadataKey.Album].replace("/", "-").replace(":", "_")
-		new_path = organized_path / "SORTED" / genre / album / new_name
+		return organized_path / "SORTED" / genre / album / new_name
+
+	def _get_inaccurate_destination(self, file: Path, organized_path: Path) -> Path:
+		return organized_path.joinpath("_MISSING METADATA").joinpath(self._clean_filename(file.name))
+
+	def _place_accurate_file(self, file: Path, recording_model: RecordingModel, organized_path: Path) -> None:
+		"""
+		Places a music file into an organized directory structure based on its metadata.
+
+		Args:
+			file (Path): The path to the music file.
+			recording_model (RecordingModel): The metadata associated with the recording.
+			organized_path (Path): The root path of the organized music library.
+		"""
+
+		metadata = recording_model.metadata
+		new_path = self._get_accurate_destination(file, metadata, organized_path)
 
 		if file == new_path:
+			self._library_index.upsert(file, metadata)
 			return  # File already exists at the correct location
 
 		# Create the directory structure if it doesn't exist
@@ -81,27 +157,43 @@ class LibraryFileHandler:
 
 		# Move and rename the file
 		shutil.move(file, new_path)
+		self._library_index.move(file, new_path, metadata)
 		self._logger.info(f"Moved '{file.name}' to '{new_path.parent.name}/{new_path.name}'")
 
-	def _place_inaccurate_file(self, file: Path, organized_path: Path) -> None:
-		cleaned_name = self._clean_filename(file.name)
-
-		new_path: Path = organized_path.joinpath("_MISSING METADATA").joinpath(cleaned_name)
+	def _place_inaccurate_file(self, file: Path, recording_model: RecordingModel, organized_path: Path) -> None:
+		new_path: Path = self._get_inaccurate_destination(file, organized_path)
 
 		if file == new_path:
+			self._library_index.upsert(file, recording_model.metadata)
 			return  # File already exists at the incorrect location
 
 		# Make directories if necessary
 		new_path.parent.mkdir(parents=True, exist_ok=True)
 
 		shutil.move(file, new_path)
+		self._library_index.move(file, new_path, recording_model.metadata)
 		self._logger.info(f"Moved {file.name} to {new_path.parent.name}/{new_path.name}")
 
 	def recheck_missing_metadata(self, organized_path: Path):
 		self.organize_music_files(organized_path.joinpath("_MISSING METADATA"), organized_path)
 
-	def rescan_entire_library(self, organized_path):
-		self.organize_music_files(organized_path, organized_path)
+	def rescan_entire_library(self, organized_path: Path, force_deep_scan: bool = False) -> ScanReport:
+		"""
+		Re-organizes the files of the library that changed since the last rescan; see `IncrementalScan`.
+		"""
+		scan = IncrementalScan(self._logger, self._library_index, organized_path, force_deep_scan)
+		self.organize_files(scan.iterate_files(), organized_path)
+		report = scan.commit()
+
+		self._remove_empty_directories(organized_path)
+		return report
+
+	def remove_empty_directories(self, directory: Path) -> None:
+		"""Removes every empty directory below the given one, deepest first, so directories that only held empty ones go too."""
+		for root, _, _ in os.walk(directory, topdown=False):
+			if Path(root) != directory and not os.listdir(root):
+				self._logger.debug(f"Removing empty directory: {Path(root).name}")
+				os.rmdir(root)
 
 	def _remove_empty_directories(self, directory: Path) -> None:
 		"""
@@ -0,0 +1,122 @@
+import os
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Set, Tuple
+
+import pydantic
+from py_common.logging import HoornLogger
+
+from src.constants import RESCAN_DEEP_SCAN_INTERVAL_DAYS, SUPPORTED_MUSIC_EXTENSIONS
+from src.indexing.library_index import LibraryIndex
+
+# Network shares and FAT-style file systems store modification times this coarsely. A directory changed this close to the
+# moment it was listed may change again within the same timestamp, so it is listed again next time instead of trusted.
+MTIME_GRANULARITY_SECONDS: float = 2.0
+
+
+class ScanReport(pydantic.BaseModel):
+	deep_scan: bool = False
+	listed_directories: int = 0
+	skipped_directories: int = 0
+	changed_files: int = 0
+	unchanged_files: int = 0
+
+
+class IncrementalScan:
+	"""
+	Finds the music files below a root that changed since the last scan, going by the `directories` table of the `LibraryIndex`.
+	A directory whose modification time did not change has had no files added, removed or renamed, so it is not listed:
+	only its known subdirectories are visited. In directories that did change, files whose size and modification time
+	match the index are skipped, and indexed files or directories that are no longer listed are forgotten.
+	Files edited in place without touching their directory are only caught by a deep scan,
+	which lists everything and runs when asked for or when the last one is more than `RESCAN_DEEP_SCAN_INTERVAL_DAYS` old.
+
+	The directory state is only stored by `commit`, once the caller has processed every yielded file.
+	"""
+
+	def __init__(self, logger: HoornLogger, library_index: LibraryIndex, root: Path, force_deep_scan: bool = False):
+		self._logger = logger
+		self._library_index: LibraryIndex = library_index
+		self._root: Path = root
+		self._started_at: float = time.time()
+		self._report: ScanReport = ScanReport(deep_scan=force_deep_scan or self._is_deep_scan_due())
+		self._scanned_directories: List[Tuple[str, Optional[str], Optional[float], int]] = []
+		self._removed_directories: List[str] = []
+		self._removed_files: List[str] = []
+
+	@property
+	def report(self) -> ScanReport:
+		return self._report
+
+	def _is_deep_scan_due(self) -> bool:
+		last_deep_scan = self._library_index.get_last_deep_scan(self._root)
+		return last_deep_scan is None or self._started_at - last_deep_scan > RESCAN_DEEP_SCAN_INTERVAL_DAYS * 24 * 60 * 60
+
+	def iterate_files(self) -> Iterator[Path]:
+		if not self._root.is_dir():
+			raise ValueError("The provided path is not a valid directory.")
+
+		directories: List[Tuple[str, Optional[str]]] = [(str(self._root), None)]
+		while directories:
+			directory, parent = directories.pop()
+			try:
+				mtime = os.stat(directory).st_mtime
+			except FileNotFoundError:
+				continue
+
+			known = None if self._report.deep_scan else self._library_index.get_directory(directory)
+			if known is not None and known[0] == mtime:
+				self._report.skipped_directories += 1
+				self._report.unchanged_files += known[1]
+				directories.extend((child, directory) for child in self._library_index.get_child_directories(directory))
+				continue
+
+			files, children = self._list(directory)
+			directories.extend((child, directory) for child in children)
+			self._removed_directories.extend(set(self._library_index.get_child_directories(directory)) - children)
+			self._removed_files.extend(set(self._library_index.get_files_in_directory(directory)) - {file.path for file in files})
+
+			for file in files:
+				if self._report.deep_scan or self._has_changed(file):
+					self._report.changed_files += 1
+					yield Path(file.path)
+				else:
+					self._report.unchanged_files += 1
+
+			is_racy = mtime >= self._started_at - MTIME_GRANULARITY_SECONDS
+			self._scanned_directories.append((directory, parent, None if is_racy else mtime, len(files)))
+
+	def _list(self, directory: str) -> Tuple[List[os.DirEntry], Set[str]]:
+		self._report.listed_directories += 1
+		files: List[os.DirEntry] = []
+		children: Set[str] = set()
+
+		with os.scandir(directory) as entries:
+			for entry in entries:
+				if entry.is_dir():
+					children.add(entry.path)
+				elif os.path.splitext(entry.name)[1] in SUPPORTED_MUSIC_EXTENSIONS:
+					files.append(entry)
+
+		return files, children
+
+	def _has_changed(self, file: os.DirEntry) -> bool:
+		indexed = self._library_index.get_file_state(Path(file.path))
+		if indexed is None:
+			return True
+
+		stat = file.stat()
+		return indexed != (stat.st_size, stat.st_mtime)
+
+	def commit(self) -> ScanReport:
+		"""Stores the state of the listed directories, so the next scan can skip the ones that stay unchanged."""
+		# The caller may have moved files to a path, or recreated a directory, that was missing during the listing.
+		removed_directories = [path for path in self._removed_directories if not os.path.exists(path)]
+		removed_files = [path for path in self._removed_files if not os.path.exists(path)]
+		self._library_index.record_directories(self._scanned_directories, removed_directories, removed_files)
+		if self._report.deep_scan:
+			self._library_index.record_deep_scan(self._root, self._started_at)
+
+		self._logger.info(f"{'Deep' if self._report.deep_scan else 'Incremental'} scan of {self._root}: listed {self._report.listed_directories} directories and skipped "
+		                  f"{self._report.skipped_directories} unchanged ones; {self._report.changed_files} files to process, {self._report.unchanged_files} unchanged.")
+		return self._report
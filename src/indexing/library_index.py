@@ -0,0 +1,216 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from py_common.logging import HoornLogger
+
+from src.constants import LIBRARY_INDEX_FILE
+from src.indexing.search_terms import SEARCHABLE_KEYS, tokenize, trigrams
+from src.metadata.metadata_manipulator import MetadataKey
+
+# SQLite's default limit on host parameters per statement is 999.
+SQLITE_PARAMETER_CHUNK_SIZE: int = 900
+
+
+def _below(directory: str) -> Tuple[str, str]:
+	"""The range of paths below a directory, for a range on an index instead of LIKE, which would treat '%' and '_' in names as wildcards."""
+	return directory + os.sep, directory + chr(ord(os.sep) + 1)
+
+
+class LibraryIndex:
+	"""
+	Persistent SQLite index of the music library.
+	Holds one row per file with its size, modification time and one column per `MetadataKey`,
+	so questions about the library can be answered without touching the (network) share.
+
+	Next to it, an inverted index (`search_terms`: term -> path) over the searchable tags and a
+	trigram index over the term vocabulary are kept in step with every change, for `LibrarySearch`.
+	The `directories` table remembers every scanned directory's modification time and number of music files,
+	so `IncrementalScan` can skip directories that did not change since the last scan.
+	"""
+
+	def __init__(self, logger: HoornLogger, index_file: Path = LIBRARY_INDEX_FILE):
+		self._logger = logger
+		self._lock: threading.RLock = threading.RLock()
+		self._connection: sqlite3.Connection = sqlite3.connect(str(index_file), check_same_thread=False)
+		self._connection.execute("PRAGMA journal_mode=WAL")
+		self._connection.execute("PRAGMA synchronous=NORMAL")
+		self._ensure_schema()
+
+	def _ensure_schema(self) -> None:
+		with self._lock, self._connection:
+			self._connection.execute("CREATE TABLE IF NOT EXISTS recordings (path TEXT PRIMARY KEY, size INTEGER, mtime REAL)")
+			existing_columns = {row[1] for row in self._connection.execute("PRAGMA table_info(recordings)")}
+
+			# New metadata keys simply become new columns.
+			for key in MetadataKey:
+				if key.value not in existing_columns:
+					self._connection.execute(f'ALTER TABLE recordings ADD COLUMN "{key.value}" TEXT NOT NULL DEFAULT \'\'')
+
+			self._connection.execute(f'CREATE INDEX IF NOT EXISTS recordings_recording_id ON recordings ("{MetadataKey.MusicBrainzRecordingID.value}")')
+			album_columns = ", ".join(f'"{key.value}"' for key in (MetadataKey.AlbumArtist, MetadataKey.Album, MetadataKey.DiscNumber))
+			self._connection.execute(f"CREATE INDEX IF NOT EXISTS recordings_album ON recordings ({album_columns})")
+
+			search_index_exists = self._connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_terms'").fetchone() is not None
+			self._connection.execute("CREATE TABLE IF NOT EXISTS search_terms (term TEXT NOT NULL, path TEXT NOT NULL, PRIMARY KEY (term, path)) WITHOUT ROWID")
+			self._connection.execute("CREATE INDEX IF NOT EXISTS search_terms_path ON search_terms (path)")
+			self._connection.execute("CREATE TABLE IF NOT EXISTS search_vocabulary (term TEXT PRIMARY KEY, trigram_count INTEGER NOT NULL) WITHOUT ROWID")
+			self._connection.execute("CREATE TABLE IF NOT EXISTS search_trigrams (trigram TEXT NOT NULL, term TEXT NOT NULL, PRIMARY KEY (trigram, term)) WITHOUT ROWID")
+
+			# A NULL mtime means the directory has to be listed again on the next scan.
+			self._connection.execute("CREATE TABLE IF NOT EXISTS directories (path TEXT PRIMARY KEY, parent TEXT, mtime REAL, file_count INTEGER NOT NULL)")
+			self._connection.execute("CREATE INDEX IF NOT EXISTS directories_parent ON directories (parent)")
+			self._connection.execute("CREATE TABLE IF NOT EXISTS deep_scans (root TEXT PRIMARY KEY, scanned_at REAL NOT NULL)")
+
+			# Indexes created before search existed get their terms once.
+			if not search_index_exists:
+				self._rebuild_search_terms()
+
+	def _rebuild_search_terms(self) -> None:
+		columns = ", ".join(f'"{key.value}"' for key in SEARCHABLE_KEYS)
+		rows = self._connection.execute(f"SELECT path, {columns} FROM recordings").fetchall()
+		self._index_search_terms([(row[0], {key: value for key, value in zip(SEARCHABLE_KEYS, row[1:])}) for row in rows])
+
+	def upsert(self, path: Path, metadata: Dict[MetadataKey, str]) -> None:
+		self.upsert_many([(path, metadata)])
+
+	def upsert_many(self, entries: Iterable[Tuple[Path, Dict[MetadataKey, str]]]) -> None:
+		rows = self._recording_rows(entries)
+		with self._lock, self._connection:
+			self._upsert_rows(rows)
+
+	def remove(self, path: Path) -> None:
+		with self._lock, self._connection:
+			self._remove_paths([str(path)])
+
+	def move(self, old_path: Path, new_path: Path, metadata: Dict[MetadataKey, str]) -> None:
+		"""Replaces the entry of a moved file in one transaction, so a failure leaves the old entry in place."""
+		rows = self._recording_rows([(new_path, metadata)])
+		with self._lock, self._connection:
+			self._remove_paths([str(old_path)])
+			self._upsert_rows(rows)
+
+	def _recording_rows(self, entries: Iterable[Tuple[Path, Dict[MetadataKey, str]]]) -> List[Tuple[tuple, Dict[MetadataKey, str]]]:
+		rows = []
+		for path, metadata in entries:
+			size, mtime = self._stat(path)
+			rows.append(((str(path), size, mtime, *[metadata.get(key, "") for key in MetadataKey]), metadata))
+		return rows
+
+	def _upsert_rows(self, rows: List[Tuple[tuple, Dict[MetadataKey, str]]]) -> None:
+		"""Writes recording rows and their search terms; runs inside the caller's transaction."""
+		columns = ", ".join(f'"{key.value}"' for key in MetadataKey)
+		placeholders = ", ".join("?" for _ in MetadataKey)
+		self._connection.executemany(f"INSERT OR REPLACE INTO recordings (path, size, mtime, {columns}) VALUES (?, ?, ?, {placeholders})", [row for row, _ in rows])
+		self._connection.executemany("DELETE FROM search_terms WHERE path = ?", [(row[0],) for row, _ in rows])
+		self._index_search_terms([(row[0], metadata) for row, metadata in rows])
+
+	def _remove_paths(self, paths: List[str]) -> None:
+		"""Forgets files and their search terms; runs inside the caller's transaction."""
+		self._connection.executemany("DELETE FROM recordings WHERE path = ?", [(path,) for path in paths])
+		self._connection.executemany("DELETE FROM search_terms WHERE path = ?", [(path,) for path in paths])
+
+	def rename(self, old_path: Path, new_path: Path) -> None:
+		"""Points the entry of a file at its new location, keeping its metadata."""
+		size, mtime = self._stat(new_path)
+		with self._lock, self._connection:
+			self._connection.execute("UPDATE recordings SET path = ?, size = ?, mtime = ? WHERE path = ?", (str(new_path), size, mtime, str(old_path)))
+			self._connection.execute("UPDATE search_terms SET path = ? WHERE path = ?", (str(new_path), str(old_path)))
+
+	def get_file_state(self, path: Path) -> Optional[Tuple[Optional[int], Optional[float]]]:
+		"""The size and modification time the file had when it was indexed, or None when it is not indexed."""
+		rows = self.query("SELECT size, mtime FROM recordings WHERE path = ?", (str(path),))
+		return rows[0] if rows else None
+
+	def get_directory(self, path: str) -> Optional[Tuple[Optional[float], int]]:
+		"""The modification time and number of music files of a directory at its last scan, or None when it was never scanned."""
+		rows = self.query("SELECT mtime, file_count FROM directories WHERE path = ?", (path,))
+		return rows[0] if rows else None
+
+	def get_child_directories(self, path: str) -> List[str]:
+		return [row[0] for row in self.query("SELECT path FROM directories WHERE parent = ?", (path,))]
+
+	def get_files_in_directory(self, path: str) -> List[str]:
+		"""The indexed files directly inside the directory, not those in its subdirectories."""
+		rows = self.query("SELECT path FROM recordings WHERE path >= ? AND path < ?", _below(path))
+		return [row[0] for row in rows if os.sep not in row[0][len(path) + 1:]]
+
+	def record_directories(self, directories: List[Tuple[str, Optional[str], Optional[float], int]], removed_directories: List[str], removed_files: List[str] = None) -> None:
+		"""
+		Stores scanned directories as (path, parent, mtime, file_count), and forgets removed directories with everything below them
+		(directories, files and their search terms) and removed files, in one transaction.
+		"""
+		with self._lock, self._connection:
+			for directory in removed_directories:
+				self._connection.execute("DELETE FROM directories WHERE path = ? OR (path >= ? AND path < ?)", (directory, *_below(directory)))
+				self._connection.execute("DELETE FROM recordings WHERE path >= ? AND path < ?", _below(directory))
+				self._connection.execute("DELETE FROM search_terms WHERE path >= ? AND path < ?", _below(directory))
+			self._remove_paths(removed_files or [])
+			self._connection.executemany("INSERT OR REPLACE INTO directories (path, parent, mtime, file_count) VALUES (?, ?, ?, ?)", directories)
+
+	def invalidate_directory(self, path: str) -> None:
+		"""Makes the next scan list the directory again, as if it had changed."""
+		with self._lock, self._connection:
+			self._connection.execute("UPDATE directories SET mtime = NULL WHERE path = ?", (path,))
+
+	def get_last_deep_scan(self, root: Path) -> Optional[float]:
+		rows = self.query("SELECT scanned_at FROM deep_scans WHERE root = ?", (str(root),))
+		return rows[0][0] if rows else None
+
+	def record_deep_scan(self, root: Path, scanned_at: float) -> None:
+		with self._lock, self._connection:
+			self._connection.execute("INSERT OR REPLACE INTO deep_scans (root, scanned_at) VALUES (?, ?)", (str(root), scanned_at))
+
+	def _index_search_terms(self, entries: List[Tuple[str, Dict[MetadataKey, str]]]) -> None:
+		"""Adds the postings of the given files and the trigrams of terms the vocabulary has not seen yet; runs inside the caller's transaction."""
+		postings: Set[Tuple[str, str]] = set()
+		for path, metadata in entries:
+			for key in SEARCHABLE_KEYS:
+				for term in tokenize(metadata.get(key, "")):
+					postings.add((term, path))
+
+		if not postings:
+			return
+
+		# Inserting in key order keeps the B-tree writes sequential, which matters for bulk upserts.
+		self._connection.executemany("INSERT OR IGNORE INTO search_terms (term, path) VALUES (?, ?)", sorted(postings))
+
+		terms = list({term for term, _ in postings})
+		known_terms: Set[str] = set()
+		for start in range(0, len(terms), SQLITE_PARAMETER_CHUNK_SIZE):
+			chunk = terms[start:start + SQLITE_PARAMETER_CHUNK_SIZE]
+			placeholders = ", ".join("?" for _ in chunk)
+			known_terms.update(row[0] for row in self._connection.execute(f"SELECT term FROM search_vocabulary WHERE term IN ({placeholders})", chunk))
+
+		new_terms = sorted(term for term in terms if term not in known_terms)
+		term_trigrams = {term: trigrams(term) for term in new_terms}
+		self._connection.executemany("INSERT INTO search_vocabulary (term, trigram_count) VALUES (?, ?)", [(term, len(grams)) for term, grams in term_trigrams.items()])
+		self._connection.executemany("INSERT OR IGNORE INTO search_trigrams (trigram, term) VALUES (?, ?)", sorted((gram, term) for term, grams in term_trigrams.items() for gram in grams))
+
+	def contains_recording(self, recording_id: str) -> bool:
+		if not recording_id:
+			return False
+
+		rows = self.query(f'SELECT 1 FROM recordings WHERE "{MetadataKey.MusicBrainzRecordingID.value}" = ? LIMIT 1', (recording_id,))
+		return len(rows) > 0
+
+	def get_metadata(self, path: Path) -> Optional[Dict[MetadataKey, str]]:
+		columns = ", ".join(f'"{key.value}"' for key in MetadataKey)
+		rows = self.query(f"SELECT {columns} FROM recordings WHERE path = ?", (str(path),))
+		if not rows:
+			return None
+
+		return {key: value for key, value in zip(MetadataKey, rows[0]) if value != ""}
+
+	def query(self, statement: str, parameters: tuple = ()) -> List[tuple]:
+		with self._lock:
+			return self._connection.execute(statement, parameters).fetchall()
+
+	def _stat(self, path: Path) -> Tuple[Optional[int], Optional[float]]:
+		try:
+			stat = path.stat()
+			return stat.st_size, stat.st_mtime
+		except OSError:
+			return None, None
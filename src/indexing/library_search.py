@@ -0,0 +1,115 @@
+from pathlib import Path
+from typing import Dict, List
+
+import pydantic
+from py_common.logging import HoornLogger
+
+from src.indexing.library_index import LibraryIndex, SQLITE_PARAMETER_CHUNK_SIZE
+from src.indexing.search_terms import tokenize, trigrams
+from src.metadata.metadata_manipulator import MetadataKey
+
+# Dice coefficient over trigrams a vocabulary term needs to count as a fuzzy match of a query word.
+FUZZY_MATCH_THRESHOLD: float = 0.5
+
+# Scores per kind of match of a query word, fuzzy matches score their similarity (below 1.0) times this.
+EXACT_MATCH_SCORE: float = 1.0
+PREFIX_MATCH_SCORE: float = 0.9
+FUZZY_MATCH_WEIGHT: float = 0.8
+
+
+class SearchResultModel(pydantic.BaseModel):
+	path: Path
+	recording_id: str
+	title: str
+	artist: str
+	album: str
+	score: float
+
+
+class LibrarySearch:
+	"""
+	Finds tracks in the library through the inverted index the `LibraryIndex` maintains.
+	Every query word has to match a title, artist, album, album artist or genre word, exactly, as a prefix, or fuzzily by trigram similarity.
+	"""
+
+	def __init__(self, logger: HoornLogger, library_index: LibraryIndex):
+		self._logger = logger
+		self._library_index: LibraryIndex = library_index
+
+	def find(self, query: str, limit: int = 25) -> List[SearchResultModel]:
+		words = list(dict.fromkeys(tokenize(query)))
+		if not words:
+			return []
+
+		scores: Dict[str, float] = {}
+		for index, word in enumerate(words):
+			word_scores = self._score_paths(self._match_terms(word))
+
+			# A track has to match every word of the query.
+			if index == 0:
+				scores = word_scores
+			else:
+				scores = {path: score + word_scores[path] for path, score in scores.items() if path in word_scores}
+
+			if not scores:
+				return []
+
+		best_paths = sorted(scores, key=lambda path: (-scores[path], path))[:limit]
+		return self._build_results(best_paths, scores)
+
+	def _match_terms(self, word: str) -> Dict[str, float]:
+		"""Vocabulary terms matching a query word, with the score of each match."""
+		matches: Dict[str, float] = {}
+
+		# Prefix matches use the term ordering of the vocabulary's primary key; the exact term is among them.
+		prefix_rows = self._library_index.query("SELECT term FROM search_vocabulary WHERE term >= ? AND term < ?", (word, word + "\uffff"))
+		for (term,) in prefix_rows:
+			matches[term] = EXACT_MATCH_SCORE if term == word else PREFIX_MATCH_SCORE
+
+		word_trigrams = trigrams(word)
+		placeholders = ", ".join("?" for _ in word_trigrams)
+		# Dice >= threshold needs at least this many trigrams in common, even against a term of the same length.
+		minimum_shared = max(1, int(FUZZY_MATCH_THRESHOLD * len(word_trigrams)))
+		fuzzy_rows = self._library_index.query(
+			f"SELECT search_trigrams.term, COUNT(*), search_vocabulary.trigram_count FROM search_trigrams "
+			f"JOIN search_vocabulary ON search_vocabulary.term = search_trigrams.term "
+			f"WHERE trigram IN ({placeholders}) GROUP BY search_trigrams.term HAVING COUNT(*) >= ?",
+			(*word_trigrams, minimum_shared)
+		)
+		for term, shared, trigram_count in fuzzy_rows:
+			similarity = 2 * shared / (len(word_trigrams) + trigram_count)
+			if similarity >= FUZZY_MATCH_THRESHOLD:
+				matches[term] = max(matches.get(term, 0.0), similarity * FUZZY_MATCH_WEIGHT)
+
+		return matches
+
+	def _score_paths(self, term_scores: Dict[str, float]) -> Dict[str, float]:
+		"""Best score per path over the terms matching one query word."""
+		if not term_scores:
+			return {}
+
+		scores: Dict[str, float] = {}
+		terms = list(term_scores)
+		for start in range(0, len(terms), SQLITE_PARAMETER_CHUNK_SIZE):
+			chunk = terms[start:start + SQLITE_PARAMETER_CHUNK_SIZE]
+			placeholders = ", ".join("?" for _ in chunk)
+			for term, path in self._library_index.query(f"SELECT term, path FROM search_terms WHERE term IN ({placeholders})", tuple(chunk)):
+				scores[path] = max(scores.get(path, 0.0), term_scores[term])
+
+		return scores
+
+	def _build_results(self, paths: List[str], scores: Dict[str, float]) -> List[SearchResultModel]:
+		if not paths:
+			return []
+
+		keys = (MetadataKey.MusicBrainzRecordingID, MetadataKey.Title, MetadataKey.Artist, MetadataKey.Album)
+		columns = ", ".join(f'"{key.value}"' for key in keys)
+		placeholders = ", ".join("?" for _ in paths)
+		rows = {row[0]: row[1:] for row in self._library_index.query(f"SELECT path, {columns} FROM recordings WHERE path IN ({placeholders})", tuple(paths))}
+
+		results: List[SearchResultModel] = []
+		for path in paths:
+			recording_id, title, artist, album = rows[path]
+			results.append(SearchResultModel(path=Path(path), recording_id=recording_id, title=title, artist=artist, album=album, score=round(scores[path], 3)))
+
+		return results
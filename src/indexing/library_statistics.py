@@ -0,0 +1,91 @@
+import csv
+import json
+from pathlib import Path
+from typing import Dict, List, Union
+
+import pydantic
+from py_common.logging import HoornLogger
+
+from src.indexing.library_index import LibraryIndex
+from src.metadata.metadata_manipulator import MetadataKey
+from src.metadata.missing_metadata_finder import COMPLETENESS_RULES
+
+StatisticValue = Union[int, float, str]
+
+
+class LibraryStatisticsModel(pydantic.BaseModel):
+	"""Aggregates over the whole library, answered from the index without touching any file."""
+	total_tracks: int
+	missing_by_key: Dict[str, int]
+	genre_distribution: Dict[str, int]
+	albums_with_track_gaps: List[Dict[str, StatisticValue]]
+
+
+def _column(key: MetadataKey) -> str:
+	return f'"{key.value}"'
+
+
+class LibraryStatistics:
+	"""Answers library-wide questions (missing tags, genre distribution, track number gaps) with aggregate queries on the `LibraryIndex`."""
+
+	def __init__(self, logger: HoornLogger, library_index: LibraryIndex):
+		self._logger = logger
+		self._library_index: LibraryIndex = library_index
+
+	def collect(self) -> LibraryStatisticsModel:
+		return LibraryStatisticsModel(
+			total_tracks=self._library_index.query("SELECT COUNT(*) FROM recordings")[0][0],
+			missing_by_key=self._missing_by_key(),
+			genre_distribution=self._genre_distribution(),
+			albums_with_track_gaps=self._albums_with_track_gaps(),
+		)
+
+	def _missing_by_key(self) -> Dict[str, int]:
+		# One pass over the table for all keys.
+		counts = ", ".join(f"SUM({_column(key)} IN ({', '.join('?' for _ in values)}))" for key, values in COMPLETENESS_RULES.items())
+		parameters = tuple(value for values in COMPLETENESS_RULES.values() for value in values)
+		row = self._library_index.query(f"SELECT {counts} FROM recordings", parameters)[0]
+
+		return {key.value: count or 0 for key, count in zip(COMPLETENESS_RULES.keys(), row)}
+
+	def _genre_distribution(self) -> Dict[str, int]:
+		# The organizer files a track under the first of its ';'-separated genres.
+		genre = _column(MetadataKey.Genre)
+		main_genre = f"CASE WHEN instr({genre}, ';') > 0 THEN substr({genre}, 1, instr({genre}, ';') - 1) ELSE {genre} END"
+		rows = self._library_index.query(f"SELECT {main_genre} AS main_genre, COUNT(*) AS tracks FROM recordings GROUP BY main_genre ORDER BY tracks DESC")
+
+		return {(name if name else "(none)"): count for name, count in rows}
+
+	def _albums_with_track_gaps(self) -> List[Dict[str, StatisticValue]]:
+		# CAST keeps the leading number of values like "3/12".
+		album_artist, album, disc, track = (_column(key) for key in (MetadataKey.AlbumArtist, MetadataKey.Album, MetadataKey.DiscNumber, MetadataKey.TrackNumber))
+		rows = self._library_index.query(f"""
+			SELECT {album_artist}, {album}, {disc}, COUNT(DISTINCT CAST({track} AS INTEGER)) AS present, MAX(CAST({track} AS INTEGER)) AS highest
+			FROM recordings
+			WHERE {album} != '' AND CAST({track} AS INTEGER) > 0
+			GROUP BY {album_artist}, {album}, {disc}
+			HAVING highest > present
+			ORDER BY {album_artist}, {album}, {disc}""")
+
+		return [{"album_artist": album_artist_value, "album": album_value, "disc": disc_value, "present": present, "highest": highest, "missing": highest - present}
+		        for album_artist_value, album_value, disc_value, present, highest in rows]
+
+	def export(self, statistics: LibraryStatisticsModel, export_path: Path) -> None:
+		"""Writes the statistics as JSON (.json) or as a long-format CSV of statistic, subject, value (anything else)."""
+		if export_path.suffix.lower() == ".json":
+			with open(export_path, "w", encoding="utf-8") as file:
+				json.dump(statistics.model_dump(), file, indent=2)
+			return
+
+		with open(export_path, "w", newline="", encoding="utf-8") as file:
+			writer = csv.writer(file)
+			writer.writerow(["STATISTIC", "SUBJECT", "VALUE"])
+			writer.writerow(["total_tracks", "", statistics.total_tracks])
+			for key, count in statistics.missing_by_key.items():
+				writer.writerow(["missing", key, count])
+			for genre, count in statistics.genre_distribution.items():
+				writer.writerow(["genre_distribution", genre, count])
+			for album in statistics.albums_with_track_gaps:
+				writer.writerow(["missing_tracks", f"{album['album_artist']} - {album['album']} (disc {album['disc']})", album["missing"]])
+
+		self._logger.info(f"Exported library statistics to {export_path}")
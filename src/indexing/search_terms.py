@@ -0,0 +1,27 @@
+import re
+import unicodedata
+from typing import List, Set
+
+from src.metadata.metadata_manipulator import MetadataKey
+
+# The tags that make a track findable.
+SEARCHABLE_KEYS: List[MetadataKey] = [MetadataKey.Title, MetadataKey.Artist, MetadataKey.Album, MetadataKey.AlbumArtist, MetadataKey.Genre]
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+	"""Splits text into lowercase, accent-free word tokens ("Beyoncé's Déjà Vu" -> ["beyonce", "s", "deja", "vu"])."""
+	text = text.casefold()
+	if text.isascii():
+		return _TOKEN_PATTERN.findall(text)
+
+	decomposed = unicodedata.normalize("NFKD", text)
+	stripped = "".join(character for character in decomposed if not unicodedata.combining(character))
+	return _TOKEN_PATTERN.findall(stripped)
+
+
+def trigrams(term: str) -> Set[str]:
+	"""Character trigrams of a term, padded so short terms and word starts still produce some."""
+	padded = f"  {term} "
+	return {padded[i:i + 3] for i in range(len(padded) - 2)}
@@ -0,0 +1,225 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pydantic
+from py_common.logging import HoornLogger
+
+from src.constants import JOB_MAX_ATTEMPTS, JOB_QUEUE_FILE, JOB_RETRY_BACKOFF_SECONDS
+
+# How many waiting jobs a claim looks at before concluding that all of them touch files other workers hold.
+CLAIM_CANDIDATES: int = 64
+
+
+class PathBusyError(Exception):
+	"""Raised by a handler that could not lock a path it needs; the job is put back without using up an attempt."""
+
+
+class JobModel(pydantic.BaseModel):
+	id: int
+	kind: str
+	path: Path
+	payload: Dict[str, Any] = {}
+	attempts: int = 0
+	lease_token: Optional[str] = None
+
+
+class JobQueue:
+	"""
+	Shared SQLite queue of file-level jobs that worker processes on this host claim one at a time.
+	Jobs hold absolute paths and their workers update this host's library index, so all workers run on the host that queued them.
+
+	- A claimed job is leased to its worker, which renews the lease while it works. A job whose lease ran out (its worker
+	  died) is handed out again, up to `JOB_MAX_ATTEMPTS` attempts, as is a failed one after an exponential back-off.
+	- Every job has an idempotency key: enqueueing work that is already queued, running or done is a no-op, and only the
+	  holder of the current lease can record a result, so a job completes once even if a stale worker finishes late.
+	- A running job locks its path: no job on the same file, or on a directory containing it (or the reverse), is handed
+	  out until it finishes or its lease runs out, so two workers never write tags to or move the same file at once.
+	  A job can lock more paths while it runs with `lock`, e.g. the destination of a move.
+	- Workers share rate limits through `wait_for_turn`, so several md workers still send one MusicBrainz request at a time.
+	"""
+
+	def __init__(self, logger: HoornLogger, queue_file: Path = JOB_QUEUE_FILE, max_attempts: int = JOB_MAX_ATTEMPTS, retry_backoff: float = JOB_RETRY_BACKOFF_SECONDS):
+		self._logger = logger
+		self._max_attempts: int = max_attempts
+		self._retry_backoff: float = retry_backoff
+		self._lock: threading.RLock = threading.RLock()
+		# Transactions are managed explicitly, so a claim can take the write lock before it reads (BEGIN IMMEDIATE).
+		self._connection: sqlite3.Connection = sqlite3.connect(str(queue_file), timeout=30.0, isolation_level=None, check_same_thread=False)
+		self._ensure_schema()
+
+	@property
+	def max_attempts(self) -> int:
+		return self._max_attempts
+
+	def _ensure_schema(self) -> None:
+		with self._transaction():
+			self._connection.execute("""CREATE TABLE IF NOT EXISTS jobs (
+				id INTEGER PRIMARY KEY AUTOINCREMENT,
+				kind TEXT NOT NULL,
+				path TEXT NOT NULL,
+				payload TEXT NOT NULL,
+				idempotency_key TEXT NOT NULL UNIQUE,
+				state TEXT NOT NULL DEFAULT 'pending',
+				attempts INTEGER NOT NULL DEFAULT 0,
+				available_at REAL NOT NULL,
+				lease_owner TEXT,
+				lease_token TEXT,
+				lease_expires_at REAL,
+				result TEXT,
+				error TEXT,
+				updated_at REAL NOT NULL)""")
+			self._connection.execute("CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (state, available_at, id)")
+			# Paths locked by running jobs next to their own; rows of jobs that are not running anymore are ignored.
+			self._connection.execute("CREATE TABLE IF NOT EXISTS job_locks (job_id INTEGER NOT NULL, path TEXT NOT NULL, PRIMARY KEY (job_id, path))")
+			self._connection.execute("CREATE TABLE IF NOT EXISTS rate_limits (name TEXT PRIMARY KEY, last_request_at REAL NOT NULL)")
+
+	@contextmanager
+	def _transaction(self) -> Iterator[None]:
+		with self._lock:
+			self._connection.execute("BEGIN IMMEDIATE")
+			try:
+				yield
+			except BaseException:
+				self._connection.execute("ROLLBACK")
+				raise
+			self._connection.execute("COMMIT")
+
+	def enqueue(self, kind: str, path: Path, idempotency_key: str, payload: Dict[str, Any] = None) -> bool:
+		"""Queues a job; returns False when a job with the same idempotency key already exists."""
+		return self.enqueue_many([(kind, path, idempotency_key, payload)]) == 1
+
+	def enqueue_many(self, jobs: Iterable[Tuple[str, Path, str, Optional[Dict[str, Any]]]]) -> int:
+		now = time.time()
+		rows = [(kind, str(path), json.dumps(payload or {}), idempotency_key, now, now) for kind, path, idempotency_key, payload in jobs]
+
+		with self._transaction():
+			before = self._connection.total_changes
+			self._connection.executemany("INSERT OR IGNORE INTO jobs (kind, path, payload, idempotency_key, available_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)", rows)
+			return self._connection.total_changes - before
+
+	def claim(self, worker_id: str, lease_seconds: float, kinds: List[str] = None) -> Optional[JobModel]:
+		"""Leases the oldest waiting job whose path no running job holds, or returns None when there is none."""
+		now = time.time()
+		kind_filter = f"AND kind IN ({', '.join('?' for _ in kinds)})" if kinds else ""
+
+		with self._transaction():
+			self._expire_leases(now)
+			candidates = self._connection.execute(f"SELECT id, kind, path, payload, attempts FROM jobs WHERE state = 'pending' AND available_at <= ? {kind_filter} ORDER BY id LIMIT ?",
+			                                      (now, *(kinds or []), CLAIM_CANDIDATES)).fetchall()
+
+			for job_id, kind, path, payload, attempts in candidates:
+				if self._is_locked(path):
+					continue
+
+				lease_token = uuid.uuid4().hex
+				self._connection.execute("UPDATE jobs SET state = 'running', attempts = attempts + 1, lease_owner = ?, lease_token = ?, lease_expires_at = ?, updated_at = ? WHERE id = ?",
+				                         (worker_id, lease_token, now + lease_seconds, now, job_id))
+				return JobModel(id=job_id, kind=kind, path=Path(path), payload=json.loads(payload), attempts=attempts + 1, lease_token=lease_token)
+
+		return None
+
+	def _is_locked(self, path: str, job_id: int = None) -> bool:
+		"""Whether a running job (other than the given one) holds the path, a directory containing it, or a file inside it."""
+		return self._connection.execute("""SELECT 1 FROM (
+				SELECT id, path FROM jobs WHERE state = 'running'
+				UNION ALL SELECT job_locks.job_id, job_locks.path FROM job_locks JOIN jobs ON jobs.id = job_locks.job_id WHERE jobs.state = 'running'
+			) WHERE id IS NOT :job_id AND (
+				path = :path OR substr(:path, 1, length(path) + 1) = path || :sep OR substr(path, 1, length(:path) + 1) = :path || :sep) LIMIT 1""",
+		                                {"path": path, "sep": os.sep, "job_id": job_id}).fetchone() is not None
+
+	def lock(self, job: JobModel, path: Path) -> bool:
+		"""Locks another path for a running job until it finishes; False when another running job holds it, or the lease was lost."""
+		with self._transaction():
+			if not self._holds_lease(job) or self._is_locked(str(path), job.id):
+				return False
+
+			self._connection.execute("INSERT OR IGNORE INTO job_locks (job_id, path) VALUES (?, ?)", (job.id, str(path)))
+			return True
+
+	def _holds_lease(self, job: JobModel) -> bool:
+		return self._connection.execute("SELECT 1 FROM jobs WHERE id = ? AND state = 'running' AND lease_token = ?", (job.id, job.lease_token)).fetchone() is not None
+
+	def _expire_leases(self, now: float) -> None:
+		"""Releases the jobs of workers that stopped renewing their lease, to be retried or given up on."""
+		expired = self._connection.execute("SELECT id, attempts FROM jobs WHERE state = 'running' AND lease_expires_at < ?", (now,)).fetchall()
+		for job_id, attempts in expired:
+			self._logger.warning(f"The lease on job {job_id} expired after attempt {attempts}.")
+			self._release(job_id, attempts, "The lease expired before the job finished.", now)
+
+	def _release(self, job_id: int, attempts: int, error: str, now: float) -> None:
+		self._connection.execute("DELETE FROM job_locks WHERE job_id = ?", (job_id,))
+		if attempts < self._max_attempts:
+			self._connection.execute("UPDATE jobs SET state = 'pending', available_at = ?, lease_owner = NULL, lease_token = NULL, lease_expires_at = NULL, error = ?, updated_at = ? WHERE id = ?",
+			                         (now + self._retry_backoff * 2 ** (attempts - 1), error, now, job_id))
+		else:
+			self._connection.execute("UPDATE jobs SET state = 'failed', lease_owner = NULL, lease_token = NULL, lease_expires_at = NULL, error = ?, updated_at = ? WHERE id = ?",
+			                         (error, now, job_id))
+
+	def renew(self, job: JobModel, lease_seconds: float) -> bool:
+		"""Extends the lease on a running job; False when the lease was lost and the job may be running elsewhere."""
+		now = time.time()
+		with self._transaction():
+			cursor = self._connection.execute("UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND state = 'running' AND lease_token = ? AND lease_expires_at >= ?",
+			                                  (now + lease_seconds, now, job.id, job.lease_token, now))
+			return cursor.rowcount == 1
+
+	def complete(self, job: JobModel, result: Dict[str, Any] = None) -> bool:
+		"""Records the result of a job; False when the lease was lost, in which case the result is dropped."""
+		now = time.time()
+		with self._transaction():
+			cursor = self._connection.execute("UPDATE jobs SET state = 'done', result = ?, error = NULL, lease_owner = NULL, lease_token = NULL, lease_expires_at = NULL, updated_at = ? "
+			                                  "WHERE id = ? AND state = 'running' AND lease_token = ?", (json.dumps(result or {}), now, job.id, job.lease_token))
+			if cursor.rowcount == 1:
+				self._connection.execute("DELETE FROM job_locks WHERE job_id = ?", (job.id,))
+			return cursor.rowcount == 1
+
+	def fail(self, job: JobModel, error: str) -> bool:
+		"""Gives a failed job back to be retried after a back-off, or marks it failed once it used up its attempts."""
+		now = time.time()
+		with self._transaction():
+			if not self._holds_lease(job):
+				return False
+
+			self._release(job.id, job.attempts, error, now)
+			return True
+
+	def postpone(self, job: JobModel, delay: float) -> bool:
+		"""Gives a job that could not start yet back to be claimed again after the delay, without counting the attempt."""
+		now = time.time()
+		with self._transaction():
+			if not self._holds_lease(job):
+				return False
+
+			self._connection.execute("DELETE FROM job_locks WHERE job_id = ?", (job.id,))
+			self._connection.execute("UPDATE jobs SET state = 'pending', attempts = attempts - 1, available_at = ?, lease_owner = NULL, lease_token = NULL, lease_expires_at = NULL, updated_at = ? WHERE id = ?",
+			                         (now + delay, now, job.id))
+			return True
+
+	def wait_for_turn(self, name: str, interval: float) -> None:
+		"""Spaces the calls of every process using this queue at least `interval` seconds apart, by reserving the next free slot."""
+		with self._transaction():
+			row = self._connection.execute("SELECT last_request_at FROM rate_limits WHERE name = ?", (name,)).fetchone()
+			now = time.time()
+			turn = max(now, row[0] + interval) if row is not None else now
+			self._connection.execute("INSERT OR REPLACE INTO rate_limits (name, last_request_at) VALUES (?, ?)", (name, turn))
+
+		if turn > now:
+			time.sleep(turn - now)
+
+	def get_status(self, kinds: List[str] = None) -> Dict[str, int]:
+		"""The number of jobs (of the given kinds) in each state: pending, running, done and failed."""
+		kind_filter = f"WHERE kind IN ({', '.join('?' for _ in kinds)})" if kinds else ""
+		with self._lock:
+			counts = dict(self._connection.execute(f"SELECT state, COUNT(*) FROM jobs {kind_filter} GROUP BY state", kinds or []).fetchall())
+		return {state: counts.get(state, 0) for state in ("pending", "running", "done", "failed")}
+
+	def close(self) -> None:
+		with self._lock:
+			self._connection.close()
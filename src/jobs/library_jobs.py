@@ -0,0 +1,152 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from py_common.logging import HoornLogger
+
+from src.analysis.replay_gain_analyzer import ReplayGainAnalyzer
+from src.downloading.download_model import DownloadModel
+from src.handlers.library_file_handler import LibraryFileHandler
+from src.indexing.incremental_scan import IncrementalScan
+from src.jobs.job_queue import JobModel, JobQueue, PathBusyError
+from src.jobs.queue_worker import QueueWorker, WorkerReport
+from src.metadata.metadata_manipulator import MetadataKey, MetadataManipulator
+from src.metadata.metadata_populater import MetadataPopulater
+from src.musicbrainz.musicbrainz_client import MusicBrainzClient
+
+METADATA_JOB: str = "md"
+LOUDNESS_JOB: str = "loudness"
+RESCAN_JOB: str = "rescan"
+JOB_KINDS: List[str] = [METADATA_JOB, LOUDNESS_JOB, RESCAN_JOB]
+
+# Name of the rate limit all workers share, since MusicBrainz limits requests per IP rather than per process.
+MUSICBRAINZ_RATE_LIMIT: str = "musicbrainz"
+
+
+def _file_key(kind: str, file: Path) -> str:
+	"""Idempotency key of a job on a file: the same file in the same state is only queued once."""
+	stat = file.stat()
+	return f"{kind}:{file}:{stat.st_size}:{stat.st_mtime}"
+
+
+class LibraryJobs:
+	"""
+	Splits md, loudness and rescan work into jobs on the shared `JobQueue`, and runs them in a `QueueWorker`.
+
+	- md: re-tags a file from the MusicBrainz recording and release IDs in its tags. Files without both IDs need the
+	  interactive md command and are not queued.
+	- loudness: writes ReplayGain for one album; album gain needs all of its tracks, so the album is the unit of work.
+	- rescan: organizes one file that changed since the last rescan into the library. Next to the file, the job locks the
+	  path it moves it to, so it does not race a loudness job on the destination album or another rescan to the same target.
+
+	Workers run on this host only: jobs hold absolute paths, and the files they tag and move are kept up to date in this host's
+	`LibraryIndex`. The MusicBrainz requests of all workers share one rate limit, that of the host's IP.
+	"""
+
+	def __init__(self, logger: HoornLogger, job_queue: JobQueue, library_file_handler: LibraryFileHandler, metadata_manipulator: MetadataManipulator, metadata_populater: MetadataPopulater, replay_gain_analyzer: ReplayGainAnalyzer, musicbrainz_client: MusicBrainzClient):
+		self._logger = logger
+		self._job_queue: JobQueue = job_queue
+		self._library_file_handler: LibraryFileHandler = library_file_handler
+		self._metadata_manipulator: MetadataManipulator = metadata_manipulator
+		self._metadata_populater: MetadataPopulater = metadata_populater
+		self._replay_gain_analyzer: ReplayGainAnalyzer = replay_gain_analyzer
+		self._musicbrainz_client: MusicBrainzClient = musicbrainz_client
+		self._handlers: Dict[str, Callable[[JobModel], Dict[str, Any]]] = {
+			METADATA_JOB: self._run_metadata_job,
+			LOUDNESS_JOB: self._run_loudness_job,
+			RESCAN_JOB: self._run_rescan_job,
+		}
+
+	@property
+	def job_queue(self) -> JobQueue:
+		return self._job_queue
+
+	def enqueue(self, kind: str, path: Path, force_deep_scan: bool = False) -> int:
+		"""Queues the jobs of one kind for a directory (the library, for rescan); returns how many were new."""
+		if kind == METADATA_JOB:
+			return self.enqueue_metadata(path)
+		if kind == LOUDNESS_JOB:
+			return self.enqueue_loudness(path)
+		if kind == RESCAN_JOB:
+			return self.enqueue_rescan(path, force_deep_scan)
+
+		raise ValueError(f"Unknown job kind '{kind}', choose from: {', '.join(JOB_KINDS)}")
+
+	def enqueue_metadata(self, directory: Path) -> int:
+		jobs = []
+		without_ids = 0
+		for file in self._library_file_handler.iterate_music_files(directory):
+			metadata = self._metadata_manipulator.get_all_metadata(file)
+			recording_id = metadata.get(MetadataKey.MusicBrainzRecordingID)
+			release_id = metadata.get(MetadataKey.MusicBrainzReleaseID)
+
+			if recording_id and release_id:
+				jobs.append((METADATA_JOB, file, _file_key(METADATA_JOB, file), {"recording_id": recording_id, "release_id": release_id}))
+			else:
+				without_ids += 1
+
+		if without_ids > 0:
+			self._logger.warning(f"Not queueing {without_ids} files without a MusicBrainz recording and release ID; the md command matches those interactively.")
+		return self._enqueue(METADATA_JOB, jobs)
+
+	def enqueue_loudness(self, directory: Path) -> int:
+		jobs = []
+		for files in self._replay_gain_analyzer.get_unanalyzed_albums(directory):
+			album_directory = Path(os.path.commonpath(files)) if len(files) > 1 else files[0]
+			state = "".join(f"{file}:{file.stat().st_size}:{file.stat().st_mtime}\n" for file in sorted(files))
+			key = f"{LOUDNESS_JOB}:{album_directory}:{hashlib.sha1(state.encode('utf-8')).hexdigest()}"
+			# The job locks the album's directory, or the track itself for a single file.
+			jobs.append((LOUDNESS_JOB, album_directory, key, {"files": [str(file) for file in files]}))
+
+		return self._enqueue(LOUDNESS_JOB, jobs)
+
+	def enqueue_rescan(self, organized_path: Path, force_deep_scan: bool = False) -> int:
+		# The scan state is committed once the changed files are queued: the queue keeps them until they are organized.
+		scan = IncrementalScan(self._logger, self._library_file_handler.library_index, organized_path, force_deep_scan)
+		jobs = [(RESCAN_JOB, file, _file_key(RESCAN_JOB, file), {"organized_path": str(organized_path)}) for file in scan.iterate_files()]
+		queued = self._enqueue(RESCAN_JOB, jobs)
+		scan.commit()
+		return queued
+
+	def _enqueue(self, kind: str, jobs: List) -> int:
+		queued = self._job_queue.enqueue_many(jobs)
+		self._logger.info(f"Queued {queued} {kind} jobs; {len(jobs) - queued} were already queued or done.")
+		return queued
+
+	def run_worker(self, kinds: List[str] = None, stop_when_empty: bool = False) -> WorkerReport:
+		"""Works on the queued jobs of the given kinds (all by default), e.g. only md while another worker runs loudness."""
+		handlers = {kind: handler for kind, handler in self._handlers.items() if not kinds or kind in kinds}
+		self._musicbrainz_client.share_rate_limit(lambda interval: self._job_queue.wait_for_turn(MUSICBRAINZ_RATE_LIMIT, interval))
+		try:
+			return QueueWorker(self._logger, self._job_queue, handlers).run(stop_when_empty)
+		finally:
+			self._musicbrainz_client.share_rate_limit(None)
+
+	def _run_metadata_job(self, job: JobModel) -> Dict[str, Any]:
+		if not job.path.is_file():
+			return {"missing": True}
+
+		download_model = DownloadModel(url="", path=job.path, recording_id=job.payload["recording_id"], release_id=job.payload["release_id"])
+		self._metadata_populater.find_and_embed_metadata_from_ids_for_file(download_model)
+		return {"missing": False}
+
+	def _run_loudness_job(self, job: JobModel) -> Dict[str, Any]:
+		files = [Path(file) for file in job.payload["files"] if Path(file).is_file()]
+		return self._replay_gain_analyzer.analyze_files(files).model_dump()
+
+	def _run_rescan_job(self, job: JobModel) -> Dict[str, Any]:
+		# A file already moved by an earlier attempt is no longer at its old path.
+		if not job.path.is_file():
+			return {"missing": True}
+
+		organized_path = Path(job.payload["organized_path"])
+		destination = self._library_file_handler.get_destination(job.path, organized_path)
+		if not self._job_queue.lock(job, destination):
+			raise PathBusyError(destination)
+
+		# The scan state was committed when the job was queued. Until the file is organized its directory has to be listed
+		# again by the next scan, also when this attempt fails or its worker dies; after a move it is listed again anyway.
+		self._library_file_handler.library_index.invalidate_directory(str(job.path.parent))
+		self._library_file_handler.organize_files([job.path], organized_path)
+		return {"missing": False}
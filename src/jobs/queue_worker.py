@@ -0,0 +1,102 @@
+import os
+import socket
+import threading
+from typing import Any, Callable, Dict
+
+import pydantic
+from py_common.logging import HoornLogger
+
+from src.constants import JOB_LEASE_SECONDS, WORKER_POLL_INTERVAL
+from src.jobs.job_queue import JobModel, JobQueue, PathBusyError
+
+
+class WorkerReport(pydantic.BaseModel):
+	completed: int = 0
+	retried: int = 0
+	failed: int = 0
+	postponed: int = 0
+	lost_leases: int = 0
+
+
+class QueueWorker:
+	"""
+	Claims jobs from a `JobQueue` and runs them with the handler registered for their kind, one at a time.
+	While a job runs, its lease is renewed every third of the lease time; a handler raising sends the job back for a retry,
+	or, with `PathBusyError`, back to wait for the path without counting the attempt.
+	Handlers must be safe to run again on the same path, since a job whose worker died is handed out again.
+	"""
+
+	def __init__(self, logger: HoornLogger, job_queue: JobQueue, handlers: Dict[str, Callable[[JobModel], Dict[str, Any]]], lease_seconds: float = JOB_LEASE_SECONDS, poll_interval: float = WORKER_POLL_INTERVAL):
+		self._logger = logger
+		self._job_queue: JobQueue = job_queue
+		self._handlers: Dict[str, Callable[[JobModel], Dict[str, Any]]] = handlers
+		self._lease_seconds: float = lease_seconds
+		self._poll_interval: float = poll_interval
+		self._worker_id: str = f"{socket.gethostname()}:{os.getpid()}"
+		self._stopped: threading.Event = threading.Event()
+
+	def run(self, stop_when_empty: bool = False) -> WorkerReport:
+		"""Works through the queue until `stop` is called or, with stop_when_empty, until every job has finished."""
+		report = WorkerReport()
+		self._logger.info(f"Worker {self._worker_id} started on {', '.join(sorted(self._handlers))} jobs.")
+
+		while not self._stopped.is_set():
+			job = self._job_queue.claim(self._worker_id, self._lease_seconds, list(self._handlers))
+			if job is None:
+				# Running jobs count too: the lease of one whose worker died runs out, and it needs someone to take it over.
+				status = self._job_queue.get_status(list(self._handlers))
+				if stop_when_empty and status["pending"] == 0 and status["running"] == 0:
+					break
+				self._stopped.wait(self._poll_interval)
+				continue
+
+			self._run_job(job, report)
+
+		self._logger.info(f"Worker {self._worker_id} stopped: {report.completed} jobs done, {report.retried} to be retried, {report.failed} failed.")
+		return report
+
+	def stop(self) -> None:
+		self._stopped.set()
+
+	def _run_job(self, job: JobModel, report: WorkerReport) -> None:
+		self._logger.info(f"Running {job.kind} job {job.id} on {job.path} (attempt {job.attempts}).")
+		finished = threading.Event()
+		heartbeat = threading.Thread(target=self._renew_lease, args=(job, finished), name=f"lease-{job.id}", daemon=True)
+		heartbeat.start()
+
+		try:
+			result = self._handlers[job.kind](job)
+		except PathBusyError as e:
+			finished.set()
+			heartbeat.join()
+			self._logger.info(f"Postponing {job.kind} job {job.id}: {e} is held by another job.")
+			if self._job_queue.postpone(job, self._poll_interval):
+				report.postponed += 1
+			else:
+				report.lost_leases += 1
+			return
+		except Exception as e:
+			finished.set()
+			heartbeat.join()
+			self._logger.error(f"The {job.kind} job {job.id} on {job.path} failed: {e}")
+			if not self._job_queue.fail(job, f"{type(e).__name__}: {e}"):
+				report.lost_leases += 1
+			elif job.attempts < self._job_queue.max_attempts:
+				report.retried += 1
+			else:
+				report.failed += 1
+			return
+
+		finished.set()
+		heartbeat.join()
+		if self._job_queue.complete(job, result):
+			report.completed += 1
+		else:
+			self._logger.warning(f"Lost the lease on {job.kind} job {job.id} before it finished; its result is dropped.")
+			report.lost_leases += 1
+
+	def _renew_lease(self, job: JobModel, finished: threading.Event) -> None:
+		while not finished.wait(self._lease_seconds / 3):
+			if not self._job_queue.renew(job, self._lease_seconds):
+				self._logger.warning(f"Could not renew the lease on {job.kind} job {job.id}.")
+				return
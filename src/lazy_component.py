@@ -0,0 +1,35 @@
+import threading
+from typing import Any, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class LazyComponent(Generic[T]):
+	"""
+	Builds a component (and imports its module) the first time it is needed, then keeps returning the same instance.
+	Lets the CLI register every command up-front without paying for subsystems the session never uses.
+	"""
+
+	def __init__(self, factory: Callable[[], T]):
+		self._factory: Callable[[], T] = factory
+		self._instance: T or None = None
+		self._lock: threading.Lock = threading.Lock()
+
+	@property
+	def is_built(self) -> bool:
+		return self._instance is not None
+
+	def get(self) -> T:
+		if self._instance is None:
+			with self._lock:
+				if self._instance is None:
+					self._instance = self._factory()
+		return self._instance
+
+
+def lazy_action(action: Callable[..., Any], *components: LazyComponent) -> Callable[[], Any]:
+	"""Wraps a command so its components are resolved when the command runs instead of when it is registered."""
+	def _run() -> Any:
+		return action(*(component.get() for component in components))
+
+	return _run
@@ -0,0 +1,373 @@
+import struct
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional
+
+from py_common.logging import HoornLogger
+
+# Anything larger than this is almost certainly embedded artwork; mutagen deals with those.
+MAX_TAG_BLOCK_SIZE: int = 16 * 1024 * 1024
+
+# ID3v2 text frames, named the same way mutagen's EasyID3 exposes them.
+ID3_TEXT_FRAMES: Dict[str, str] = {
+	"TIT2": "title",
+	"TPE1": "artist",
+	"TALB": "album",
+	"TPE2": "albumartist",
+	"TCON": "genre",
+	"TRCK": "tracknumber",
+	"TPOS": "discnumber",
+	"TIT1": "grouping",
+	"TDRC": "date",
+	"TLEN": "length",
+	"TBPM": "bpm",
+	"TSSE": "encoder",
+}
+
+# ID3v2.3 frames that mutagen upgrades to their v2.4 counterpart on load.
+ID3_V23_FALLBACK_FRAMES: Dict[str, str] = {
+	"TYER": "date",
+}
+
+# MP4 ilst atoms, named the same way mutagen's EasyMP4 exposes them.
+MP4_TEXT_ATOMS: Dict[bytes, str] = {
+	b"\xa9nam": "title",
+	b"\xa9ART": "artist",
+	b"\xa9alb": "album",
+	b"aART": "albumartist",
+	b"\xa9gen": "genre",
+	b"\xa9grp": "grouping",
+	b"\xa9day": "date",
+	b"\xa9cmt": "comment",
+	b"desc": "description",
+	b"\xa9too": "encoder",
+}
+
+MP4_INT_PAIR_ATOMS: Dict[bytes, str] = {
+	b"trkn": "tracknumber",
+	b"disk": "discnumber",
+}
+
+# Freeform/TXXX descriptions whose mutagen key differs from the lowercased description.
+FREEFORM_KEYS: Dict[str, str] = {
+	"musicbrainz track id": "musicbrainz_trackid",
+	"musicbrainz album id": "musicbrainz_albumid",
+	"musicbrainz artist id": "musicbrainz_artistid",
+	"musicbrainz album artist id": "musicbrainz_albumartistid",
+	"musicbrainz release group id": "musicbrainz_releasegroupid",
+}
+
+
+class FastTagReader:
+	"""
+	Reads tags straight out of the metadata blocks of FLAC, Ogg (Vorbis/Opus), MP3 (ID3v2) and MP4 files.
+	Only the bytes that hold the tags are read, the audio itself is never touched.
+
+	Every read returns a dictionary of lowercase tag names to their first value, named the way mutagen exposes them,
+	or None when the file contains anything this reader does not handle (the caller should fall back to mutagen then).
+	"""
+
+	def __init__(self, logger: HoornLogger):
+		self._logger = logger
+
+	def read(self, file_path: Path) -> Optional[Dict[str, str]]:
+		try:
+			with open(file_path, "rb") as file:
+				head = file.read(12)
+				file.seek(0)
+
+				if head[:4] == b"fLaC":
+					return self._read_flac(file)
+				if head[:4] == b"OggS":
+					return self._read_ogg(file)
+				if head[:3] == b"ID3" and file_path.suffix.lower() == ".mp3":
+					return self._read_id3(file)
+				if head[4:8] == b"ftyp":
+					return self._read_mp4(file)
+		except (OSError, struct.error, UnicodeDecodeError, ValueError, IndexError) as e:
+			self._logger.debug(f"Fast tag read failed for {file_path.name}, falling back: {e}")
+
+		return None
+
+	def _read_flac(self, file: BinaryIO) -> Optional[Dict[str, str]]:
+		file.seek(4)
+		tags: Dict[str, str] = {}
+
+		while True:
+			header = file.read(4)
+			if len(header) < 4:
+				return None
+
+			is_last = header[0] & 0x80
+			block_type = header[0] & 0x7F
+			block_size = int.from_bytes(header[1:4], "big")
+
+			if block_type == 4:
+				if block_size > MAX_TAG_BLOCK_SIZE:
+					return None
+				tags = self._parse_vorbis_comments(file.read(block_size))
+				if tags is None:
+					return None
+			elif block_type == 127:
+				return None
+			else:
+				file.seek(block_size, 1)
+
+			if is_last:
+				return tags
+
+	def _read_ogg(self, file: BinaryIO) -> Optional[Dict[str, str]]:
+		packets = self._read_first_ogg_packets(file, 2)
+		if packets is None:
+			return None
+
+		identification, comments = packets
+		if identification.startswith(b"OpusHead") and comments.startswith(b"OpusTags"):
+			return self._parse_vorbis_comments(comments[8:])
+		if identification.startswith(b"\x01vorbis") and comments.startswith(b"\x03vorbis"):
+			return self._parse_vorbis_comments(comments[7:])
+
+		return None
+
+	def _read_first_ogg_packets(self, file: BinaryIO, count: int) -> Optional[list]:
+		packets = []
+		current = bytearray()
+		serial = None
+
+		while len(packets) < count:
+			header = file.read(27)
+			if len(header) < 27 or header[:4] != b"OggS":
+				return None
+
+			page_serial = struct.unpack("<I", header[14:18])[0]
+			segment_count = header[26]
+			lacing = file.read(segment_count)
+
+			if serial is None:
+				serial = page_serial
+			elif page_serial != serial:
+				# Multiplexed streams are rare for audio files, leave them to mutagen.
+				return None
+
+			data = file.read(sum(lacing))
+			offset = 0
+			for segment_size in lacing:
+				current += data[offset:offset + segment_size]
+				offset += segment_size
+
+				if len(current) > MAX_TAG_BLOCK_SIZE:
+					return None
+				if segment_size < 255:
+					packets.append(bytes(current))
+					current = bytearray()
+					if len(packets) == count:
+						break
+
+		return packets
+
+	def _parse_vorbis_comments(self, data: bytes) -> Optional[Dict[str, str]]:
+		vendor_length = struct.unpack_from("<I", data, 0)[0]
+		offset = 4 + vendor_length
+		count = struct.unpack_from("<I", data, offset)[0]
+		offset += 4
+
+		tags: Dict[str, str] = {}
+		for _ in range(count):
+			length = struct.unpack_from("<I", data, offset)[0]
+			offset += 4
+			comment = data[offset:offset + length].decode("utf-8", errors="replace")
+			offset += length
+
+			if "=" not in comment:
+				continue
+
+			key, value = comment.split("=", 1)
+			tags.setdefault(key.lower(), value)
+
+		return tags
+
+	def _read_id3(self, file: BinaryIO) -> Optional[Dict[str, str]]:
+		header = file.read(10)
+		major_version = header[3]
+		flags = header[5]
+		size = self._syncsafe(header[6:10])
+
+		# v2.2 frames and unsynchronised tags are unusual enough to leave to mutagen.
+		if major_version not in (3, 4) or flags & 0x80 or size > MAX_TAG_BLOCK_SIZE:
+			return None
+
+		data = file.read(size)
+		offset = 0
+
+		if flags & 0x40:
+			if major_version == 4:
+				offset = self._syncsafe(data[0:4])
+			else:
+				offset = struct.unpack(">I", data[0:4])[0] + 4
+
+		tags: Dict[str, str] = {}
+		fallbacks: Dict[str, str] = {}
+
+		while offset + 10 <= len(data):
+			frame_id = data[offset:offset + 4]
+			if frame_id == b"\x00\x00\x00\x00":
+				break  # Reached the padding.
+			if not frame_id.isalnum():
+				return None
+
+			if major_version == 4:
+				frame_size = self._syncsafe(data[offset + 4:offset + 8])
+			else:
+				frame_size = struct.unpack(">I", data[offset + 4:offset + 8])[0]
+			frame_flags = struct.unpack(">H", data[offset + 8:offset + 10])[0]
+			frame_data = data[offset + 10:offset + 10 + frame_size]
+			offset += 10 + frame_size
+
+			# Compressed, encrypted or unsynchronised frames.
+			if (major_version == 4 and frame_flags & 0x000F) or (major_version == 3 and frame_flags & 0x00E0):
+				return None
+
+			name = frame_id.decode("ascii")
+			if name in ID3_TEXT_FRAMES:
+				value = self._decode_id3_text(frame_data)
+				if name == "TCON" and (value.isdigit() or value.startswith("(")):
+					return None  # Numeric ID3v1 genre references need mutagen's lookup table.
+				tags.setdefault(ID3_TEXT_FRAMES[name], value)
+			elif name in ID3_V23_FALLBACK_FRAMES:
+				fallbacks.setdefault(ID3_V23_FALLBACK_FRAMES[name], self._decode_id3_text(frame_data))
+			elif name == "TXXX":
+				description, _, value = self._decode_id3_text(frame_data, keep_all=True).partition("\x00")
+				key = FREEFORM_KEYS.get(description.lower(), description.lower())
+				tags.setdefault(key, value.split("\x00")[0])
+			elif name == "UFID":
+				owner, _, identifier = frame_data.partition(b"\x00")
+				if owner == b"http://musicbrainz.org":
+					tags.setdefault("musicbrainz_trackid", identifier.decode("ascii"))
+
+		for key, value in fallbacks.items():
+			tags.setdefault(key, value)
+
+		return tags
+
+	def _decode_id3_text(self, frame_data: bytes, keep_all: bool = False) -> str:
+		if not frame_data:
+			return ""
+
+		encoding = frame_data[0]
+		raw = frame_data[1:]
+
+		if encoding == 0:
+			text = raw.decode("latin-1")
+		elif encoding == 1:
+			text = raw.decode("utf-16")
+		elif encoding == 2:
+			text = raw.decode("utf-16-be")
+		elif encoding == 3:
+			text = raw.decode("utf-8")
+		else:
+			raise ValueError(f"Unknown ID3 text encoding {encoding}")
+
+		text = text.replace("\ufeff", "").rstrip("\x00")
+		return text if keep_all else text.split("\x00")[0]
+
+	def _syncsafe(self, data: bytes) -> int:
+		return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+	def _read_mp4(self, file: BinaryIO) -> Optional[Dict[str, str]]:
+		moov = self._find_top_level_atom(file, b"moov")
+		if moov is None:
+			return None
+
+		udta = self._find_child_atom(moov, b"udta")
+		meta = self._find_child_atom(udta, b"meta") if udta is not None else None
+		if meta is None:
+			return {}
+
+		ilst = self._find_child_atom(meta[4:], b"ilst")  # meta is a full box: skip version and flags.
+		if ilst is None:
+			return {}
+
+		tags: Dict[str, str] = {}
+		for name, item in self._iterate_atoms(ilst):
+			if name == b"----":
+				key, value = self._parse_mp4_freeform(item)
+				if key is not None:
+					tags.setdefault(key, value)
+				continue
+
+			data = self._find_child_atom(item, b"data")
+			if data is None:
+				continue
+
+			data_type = int.from_bytes(data[1:4], "big")
+			payload = data[8:]
+
+			if name in MP4_TEXT_ATOMS and data_type == 1:
+				tags.setdefault(MP4_TEXT_ATOMS[name], payload.decode("utf-8"))
+			elif name in MP4_INT_PAIR_ATOMS and len(payload) >= 6:
+				number, total = struct.unpack(">HH", payload[2:6])
+				tags.setdefault(MP4_INT_PAIR_ATOMS[name], f"{number}/{total}" if total else str(number))
+			elif name == b"tmpo" and len(payload) >= 2:
+				tags.setdefault("bpm", str(int.from_bytes(payload[:2], "big")))
+			elif name == b"gnre":
+				return None  # ID3v1 genre index, mutagen knows how to translate these.
+
+		return tags
+
+	def _find_top_level_atom(self, file: BinaryIO, wanted: bytes) -> Optional[bytes]:
+		file.seek(0, 2)
+		end = file.tell()
+		offset = 0
+
+		while offset + 8 <= end:
+			file.seek(offset)
+			size, name = struct.unpack(">I4s", file.read(8))
+			header_size = 8
+
+			if size == 1:
+				size = struct.unpack(">Q", file.read(8))[0]
+				header_size = 16
+			elif size == 0:
+				size = end - offset
+
+			if size < header_size:
+				return None
+
+			if name == wanted:
+				if size > MAX_TAG_BLOCK_SIZE:
+					return None
+				return file.read(size - header_size)
+
+			offset += size
+
+		return None
+
+	def _iterate_atoms(self, data: bytes):
+		offset = 0
+		while offset + 8 <= len(data):
+			size, name = struct.unpack_from(">I4s", data, offset)
+			if size < 8:
+				return
+			yield name, data[offset + 8:offset + size]
+			offset += size
+
+	def _find_child_atom(self, data: bytes, wanted: bytes) -> Optional[bytes]:
+		for name, body in self._iterate_atoms(data):
+			if name == wanted:
+				return body
+		return None
+
+	def _parse_mp4_freeform(self, item: bytes):
+		name = None
+		value = None
+
+		for child_name, body in self._iterate_atoms(item):
+			if child_name == b"name":
+				name = body[4:].decode("utf-8")
+			elif child_name == b"data" and value is None:
+				value = body[8:].decode("utf-8", errors="replace")
+
+		if name is None or value is None:
+			return None, None
+
+		return FREEFORM_KEYS.get(name.lower(), name.lower()), value
+
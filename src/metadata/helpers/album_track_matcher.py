@@ -0,0 +1,169 @@
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import mutagen
+import numpy as np
+import pydantic
+from py_common.logging import HoornLogger
+from scipy.optimize import linear_sum_assignment
+
+from src.indexing.search_terms import tokenize, trigrams
+
+# How much each hint counts towards the score of a file and track pair; all three scores run from 0 to 1.
+TITLE_WEIGHT: float = 0.5
+TRACK_NUMBER_WEIGHT: float = 0.25
+DURATION_WEIGHT: float = 0.25
+
+# Duration scores halve roughly every two seconds of difference; encoders and releases rarely differ by more than one.
+DURATION_SCALE_SECONDS: float = 3.0
+
+# Pairs scoring below this are left unmatched rather than tagged with a track they probably are not.
+MIN_MATCH_SCORE: float = 0.2
+
+# A leading "1-03", "1.03", "103" or "03" in a file name: an optional disc number followed by the track number.
+TRACK_NUMBER_PATTERN = re.compile(r"^\s*(?:(\d{1,2})\s*[-._]\s*)?(\d{1,3})(?!\d)[\s._-]*")
+
+
+class AlbumTrackModel(pydantic.BaseModel):
+	recording_id: str
+	title: str
+	disc_number: int
+	track_number: int
+	position: int
+	length: Optional[float] = None
+
+
+def tracks_from_release(release: dict) -> List[AlbumTrackModel]:
+	"""The tracks of every medium of a release (as returned with the `recordings` include), numbered through the whole release."""
+	tracks: List[AlbumTrackModel] = []
+
+	for disc_number, medium in enumerate(release.get('medium-list', []), start=1):
+		disc_number = int(medium.get('position', disc_number))
+		for index, track in enumerate(medium.get('track-list', []), start=1):
+			length = track.get('length', track['recording'].get('length'))
+			tracks.append(AlbumTrackModel(
+				recording_id=track['recording']['id'],
+				title=track.get('title', track['recording']['title']),
+				disc_number=disc_number,
+				track_number=int(track.get('position', index)),
+				position=len(tracks) + 1,
+				length=int(length) / 1000 if length else None,
+			))
+
+	return tracks
+
+
+class AlbumTrackMatcher:
+	"""
+	Assigns the files of an album to its tracks as a whole, so every track is used at most once.
+	Each file and track pair is scored on title similarity, the track number in the file name and the duration,
+	and the assignment with the highest total score is solved with the Hungarian algorithm.
+	"""
+
+	def __init__(self, logger: HoornLogger):
+		self._logger = logger
+
+	def match(self, files: List[Path], tracks: List[AlbumTrackModel]) -> Dict[Path, AlbumTrackModel]:
+		if not files or not tracks:
+			return {}
+
+		scores = self.score(files, tracks)
+		rows, columns = linear_sum_assignment(scores, maximize=True)
+
+		matches: Dict[Path, AlbumTrackModel] = {}
+		for row, column in zip(rows, columns):
+			if scores[row, column] < MIN_MATCH_SCORE:
+				self._logger.debug(f"Best track for {files[row].name} is {tracks[column].title}, but it only scores {scores[row, column]:.2f}.")
+				continue
+			matches[files[row]] = tracks[column]
+
+		return matches
+
+	def score(self, files: List[Path], tracks: List[AlbumTrackModel]) -> np.ndarray:
+		"""The files × tracks score matrix."""
+		hints = [self._parse_file_name(file.stem) for file in files]
+
+		title_scores = self._title_scores([title for title, _, _ in hints], [track.title for track in tracks])
+		number_scores = self._track_number_scores([(disc, number) for _, disc, number in hints], tracks)
+		duration_scores = self._duration_scores([self._read_length(file) for file in files], tracks)
+
+		return TITLE_WEIGHT * title_scores + TRACK_NUMBER_WEIGHT * number_scores + DURATION_WEIGHT * duration_scores
+
+	def _parse_file_name(self, stem: str) -> Tuple[str, Optional[int], Optional[int]]:
+		"""Splits a file name into its title part and the disc and track number it starts with, if any."""
+		match = TRACK_NUMBER_PATTERN.match(stem)
+		if match is None or match.end() == len(stem):
+			return stem, None, None
+
+		disc = int(match.group(1)) if match.group(1) is not None else None
+		return stem[match.end():], disc, int(match.group(2))
+
+	def _title_scores(self, file_titles: List[str], track_titles: List[str]) -> np.ndarray:
+		"""
+		Trigram overlap of the normalized titles. File names often carry the artist or other extras,
+		so how much of the track title the file name contains counts more than the plain Dice coefficient.
+		"""
+		vocabulary: Dict[str, int] = {}
+
+		def gram_indices(titles: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+			gram_sets = [{gram for term in tokenize(title) for gram in trigrams(term)} for title in titles]
+			for grams in gram_sets:
+				for gram in grams:
+					vocabulary.setdefault(gram, len(vocabulary))
+
+			rows = [row for row, grams in enumerate(gram_sets) for _ in grams]
+			columns = [vocabulary[gram] for grams in gram_sets for gram in grams]
+			return np.array(rows, dtype=np.intp), np.array(columns, dtype=np.intp)
+
+		file_grams = gram_indices(file_titles)
+		track_grams = gram_indices(track_titles)
+
+		file_matrix = np.zeros((len(file_titles), len(vocabulary)), dtype=np.float32)
+		file_matrix[file_grams] = 1.0
+		track_matrix = np.zeros((len(track_titles), len(vocabulary)), dtype=np.float32)
+		track_matrix[track_grams] = 1.0
+
+		shared = file_matrix @ track_matrix.T
+		file_counts = file_matrix.sum(axis=1)[:, np.newaxis]
+		track_counts = track_matrix.sum(axis=1)[np.newaxis, :]
+
+		with np.errstate(divide="ignore", invalid="ignore"):
+			containment = np.nan_to_num(shared / track_counts)
+			dice = np.nan_to_num(2 * shared / (file_counts + track_counts))
+
+		return 0.7 * containment + 0.3 * dice
+
+	def _track_number_scores(self, hints: List[Tuple[Optional[int], Optional[int]]], tracks: List[AlbumTrackModel]) -> np.ndarray:
+		"""1 where the number in the file name fits the track, 0 elsewhere and for files without a number."""
+		hint_discs = np.array([disc if disc is not None else -1 for disc, _ in hints])[:, np.newaxis]
+		hint_numbers = np.array([number if number is not None else -1 for _, number in hints])[:, np.newaxis]
+		discs = np.array([track.disc_number for track in tracks])[np.newaxis, :]
+		numbers = np.array([track.track_number for track in tracks])[np.newaxis, :]
+		positions = np.array([track.position for track in tracks])[np.newaxis, :]
+
+		# "03" is track 3 of any disc, "2-03" track 3 of disc 2, and box sets number "203" the same way; numbering through the whole release also counts.
+		fits_disc = (hint_discs == -1) | (hint_discs == discs)
+		fits_number = (hint_numbers == numbers) & fits_disc
+		fits_combined = (hint_discs == -1) & (hint_numbers >= 100) & (hint_numbers // 100 == discs) & (hint_numbers % 100 == numbers)
+		fits_position = (hint_discs == -1) & (hint_numbers == positions)
+
+		return (fits_number | fits_combined | fits_position).astype(np.float32)
+
+	def _duration_scores(self, file_lengths: List[Optional[float]], tracks: List[AlbumTrackModel]) -> np.ndarray:
+		"""Decays with the difference in length; 0 where either length is unknown."""
+		file_seconds = np.array([length if length is not None else np.nan for length in file_lengths], dtype=np.float64)[:, np.newaxis]
+		track_seconds = np.array([track.length if track.length is not None else np.nan for track in tracks], dtype=np.float64)[np.newaxis, :]
+
+		return np.nan_to_num(np.exp(-np.abs(file_seconds - track_seconds) / DURATION_SCALE_SECONDS)).astype(np.float32)
+
+	def _read_length(self, file: Path) -> float or None:
+		try:
+			audio = mutagen.File(file)
+		except Exception as e:
+			self._logger.debug(f"Could not read the length of {file.name}: {e}")
+			return None
+
+		if audio is None or audio.info is None or not audio.info.length:
+			return None
+		return float(audio.info.length)
@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+from typing import Dict, Tuple
+
+from src.metadata.metadata_manipulator import MetadataKey
+
+METADATA_KEYS: Tuple[MetadataKey, ...] = tuple(MetadataKey)
+_KEY_INDEX: Dict[MetadataKey, int] = {key: index for index, key in enumerate(METADATA_KEYS)}
+
+
+class CompactRecording:
+	"""
+	Lightweight, slot-based stand-in for a `RecordingModel` read from disk.
+	Values are stored as one tuple ordered like `METADATA_KEYS` (missing keys are empty strings),
+	and are interned so the many repeated artists, albums and genres of a library share one string object.
+	"""
+	__slots__ = ("_path", "_values")
+
+	def __init__(self, path: str, values: Tuple[str, ...]):
+		self._path: str = path
+		self._values: Tuple[str, ...] = tuple(sys.intern(value) for value in values)
+
+	@property
+	def path(self) -> Path:
+		return Path(self._path)
+
+	@property
+	def path_string(self) -> str:
+		return self._path
+
+	@property
+	def values(self) -> Tuple[str, ...]:
+		return self._values
+
+	def get(self, key: MetadataKey) -> str:
+		return self._values[_KEY_INDEX[key]]
+
+	def to_metadata_dict(self) -> Dict[MetadataKey, str]:
+		"""Returns the metadata in the same shape `MetadataManipulator.get_all_metadata` does (missing keys left out)."""
+		return {key: value for key, value in zip(METADATA_KEYS, self._values) if value != ""}
+
+	@staticmethod
+	def values_from_metadata(metadata: Dict[MetadataKey, str]) -> Tuple[str, ...]:
+		return tuple(metadata.get(key, "") for key in METADATA_KEYS)
@@ -0,0 +1,104 @@
+import base64
+
+from mutagen.easyid3 import EasyID3
+from mutagen.easymp4 import EasyMP4Tags
+from mutagen.flac import Picture
+from mutagen.id3 import APIC, COMM
+from mutagen.mp4 import MP4Cover
+
+REPLAYGAIN_KEYS = ("replaygain_track_gain", "replaygain_track_peak", "replaygain_album_gain", "replaygain_album_peak")
+
+# Vorbis comment key holding base64 encoded FLAC picture blocks; also taught to the ID3 and MP4 interfaces below.
+COVER_ART_KEY: str = "metadata_block_picture"
+
+_registered: bool = False
+
+
+def _id3_comment_get(id3, key):
+	frames = id3.getall("COMM")
+	return list(frames[0].text) if frames else []
+
+
+def _id3_comment_set(id3, key, value):
+	id3.delall("COMM")
+	id3.add(COMM(encoding=3, lang="eng", desc="", text=value))
+
+
+def _id3_comment_delete(id3, key):
+	id3.delall("COMM")
+
+
+def _encode_picture(mime_type: str, data: bytes) -> str:
+	picture = Picture()
+	picture.type = 3  # Front cover
+	picture.mime = mime_type
+	picture.data = data
+	return base64.b64encode(picture.write()).decode("ascii")
+
+
+def _id3_picture_get(id3, key):
+	frames = id3.getall("APIC")
+	if not frames:
+		raise KeyError(key)
+	return [_encode_picture(frame.mime, frame.data) for frame in frames]
+
+
+def _id3_picture_set(id3, key, value):
+	id3.delall("APIC")
+	for encoded_picture in value:
+		picture = Picture(base64.b64decode(encoded_picture))
+		id3.add(APIC(encoding=3, mime=picture.mime, type=picture.type, desc=picture.desc, data=picture.data))
+
+
+def _id3_picture_delete(id3, key):
+	id3.delall("APIC")
+
+
+def _mp4_picture_get(tags, key):
+	covers = tags.get("covr")
+	if not covers:
+		raise KeyError(key)
+	return [_encode_picture("image/png" if cover.imageformat == MP4Cover.FORMAT_PNG else "image/jpeg", bytes(cover)) for cover in covers]
+
+
+def _mp4_picture_set(tags, key, value):
+	covers = []
+	for encoded_picture in value:
+		picture = Picture(base64.b64decode(encoded_picture))
+		covers.append(MP4Cover(picture.data, imageformat=MP4Cover.FORMAT_PNG if picture.mime == "image/png" else MP4Cover.FORMAT_JPEG))
+	tags["covr"] = covers
+
+
+def _mp4_picture_delete(tags, key):
+	tags.pop("covr", None)
+
+
+def register_easy_tag_keys() -> None:
+	"""
+	Teaches mutagen's easy ID3 and MP4 interfaces the keys this tool writes that they do not know out of the box,
+	so MP3 and M4A files can be tagged with the same key names as FLAC and Ogg files.
+	The atoms/frames match the ones `FastTagReader` reads back.
+	"""
+	global _registered
+	if _registered:
+		return
+
+	EasyID3.RegisterTextKey("encoder", "TSSE")
+	EasyID3.RegisterTXXXKey("year", "YEAR")
+	EasyID3.RegisterTXXXKey("description", "DESCRIPTION")
+	EasyID3.RegisterKey("comment", _id3_comment_get, _id3_comment_set, _id3_comment_delete)
+	EasyID3.RegisterKey("comments", _id3_comment_get, _id3_comment_set, _id3_comment_delete)
+	EasyID3.RegisterKey(COVER_ART_KEY, _id3_picture_get, _id3_picture_set, _id3_picture_delete)
+	for key in REPLAYGAIN_KEYS:
+		# Players read ReplayGain from TXXX frames rather than the RVA2 frames EasyID3 maps these keys to by default.
+		EasyID3.RegisterTXXXKey(key, key.upper())
+
+	EasyMP4Tags.RegisterTextKey("encoder", "\xa9too")
+	EasyMP4Tags.RegisterTextKey("comments", "\xa9cmt")
+	EasyMP4Tags.RegisterFreeformKey("year", "YEAR")
+	EasyMP4Tags.RegisterFreeformKey("length", "LENGTH")
+	EasyMP4Tags.RegisterKey(COVER_ART_KEY, _mp4_picture_get, _mp4_picture_set, _mp4_picture_delete)
+	for key in REPLAYGAIN_KEYS:
+		EasyMP4Tags.RegisterFreeformKey(key, key)
+
+	_registered = True
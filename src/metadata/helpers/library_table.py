@@ -0,0 +1,49 @@
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+from src.metadata.helpers.compact_recording import CompactRecording, METADATA_KEYS
+from src.metadata.helpers.recording_model import RecordingModel
+from src.metadata.metadata_manipulator import MetadataKey
+
+
+class LibraryTable:
+	"""
+	Columnar in-memory representation of a scanned library.
+	Holds one array per `MetadataKey` plus one for the paths; missing values are empty strings.
+	"""
+
+	def __init__(self, paths: np.ndarray, columns: Dict[MetadataKey, np.ndarray]):
+		self._paths: np.ndarray = paths
+		self._columns: Dict[MetadataKey, np.ndarray] = columns
+
+	@classmethod
+	def from_records(cls, records: List[CompactRecording]) -> "LibraryTable":
+		paths = np.array([record.path_string for record in records], dtype=object)
+		values = np.empty((len(records), len(METADATA_KEYS)), dtype=object)
+		for row, record in enumerate(records):
+			values[row] = record.values
+
+		return cls(paths, {key: values[:, index] for index, key in enumerate(METADATA_KEYS)})
+
+	def __len__(self) -> int:
+		return len(self._paths)
+
+	def column(self, key: MetadataKey) -> np.ndarray:
+		return self._columns[key]
+
+	def paths(self) -> np.ndarray:
+		return self._paths
+
+	def select(self, mask: np.ndarray) -> "LibraryTable":
+		"""Returns the rows for which the boolean mask is set."""
+		return LibraryTable(self._paths[mask], {key: column[mask] for key, column in self._columns.items()})
+
+	def get_metadata(self, row: int) -> Dict[MetadataKey, str]:
+		return {key: column[row] for key, column in self._columns.items() if column[row] != ""}
+
+	def iterate_recording_models(self) -> Iterator[RecordingModel]:
+		"""Yields the rows as (unvalidated) recording models, for code that works on single files."""
+		for row in range(len(self)):
+			yield RecordingModel.model_construct(metadata=self.get_metadata(row), path=Path(self._paths[row]))
@@ -1,25 +1,35 @@
 import time
+from pathlib import Path
 from typing import Dict, Tuple, List
 
 import musicbrainzngs
 from py_common.logging import HoornLogger
 
+from src.cover_art.cover_art_provider import CoverArtProvider
 from src.genre_detection.genre_algorithm import GenreAlgorithm
 from src.genre_detection.model.genre_data_model import GenreDataModel
 from src.metadata.helpers.recording_model import RecordingModel
+from src.metadata.helpers.release_selection_memory import ReleaseSelectionMemory
 from src.metadata.helpers.release_model import ReleaseModel
 from src.metadata.metadata_manipulator import MetadataKey
+from src.musicbrainz.musicbrainz_client import MusicBrainzClient
+
+# What a release is fetched with to build its `ReleaseModel`.
+RELEASE_INCLUDES: List[str] = ['artist-credits', 'media', 'tags', 'release-groups', 'recordings']
 
 
 class MusicBrainzAPIHelper:
 	"""Helper class for interacting with MusicBrainz recording API."""
 
-	def __init__(self, logger: HoornLogger, genre_algorithm: GenreAlgorithm):
+	def __init__(self, logger: HoornLogger, genre_algorithm: GenreAlgorithm, musicbrainz_client: MusicBrainzClient, cover_art_provider: CoverArtProvider = None):
 		self._logger = logger
-		musicbrainzngs.set_useragent("Music Organization Tool", "0.0", "https://github.com/LordMartron94/music-organization-tool")
+		self._musicbrainz_client: MusicBrainzClient = musicbrainz_client
 		self._genre_algorithm = genre_algorithm
+		self._cover_art_provider: CoverArtProvider or None = cover_art_provider
+		self._release_selection_memory: ReleaseSelectionMemory = ReleaseSelectionMemory(logger)
 
-	def get_recording_by_id(self, recording_id: str, album_id: str = None, genre: str = None, subgenres: str = None) -> RecordingModel or None:
+	def get_recording_by_id(self, recording_id: str, album_id: str = None, genre: str = None, subgenres: str = None, source_directory: Path = None, release: ReleaseModel = None) -> RecordingModel or None:
+		"""Pass the `release` when it was fetched already, e.g. once for all files of an album; it is not fetched again."""
 		self._logger.debug(f"Getting recording by ID: {recording_id}")
 		metadata: Dict[MetadataKey, str] = {}
 
@@ -27,20 +37,22 @@ class MusicBrainzAPIHelper:
 		backoff_factor = 2
 		for i in range(retries):
 			try:
-				recording = musicbrainzngs.get_recording_by_id(recording_id, includes=['artists', 'releases', 'tags'])
+				recording = self._musicbrainz_client.get_recording_by_id(recording_id, includes=['artists', 'releases', 'release-groups', 'tags'])
 
 				title = recording['recording']['title']
 				artist = recording['recording']['artist-credit'][0]['artist']['name']
+				artist_id = recording['recording']['artist-credit'][0]['artist'].get('id')
 				recording_length = int(recording['recording'].get('length', 0))  # in milliseconds
 
 				# Get all releases for the recording
 				releases = recording['recording']['release-list']
 
 				# Let the user choose the correct release
-				selected_release = self._choose_release(releases, artist, title) if album_id is None else None
-				release_id = selected_release['id'] if selected_release is not None else album_id
-
-				release: ReleaseModel = self.get_release_by_id(release_id, recording_id)
+				if release is None:
+					selected_release = self._choose_release(releases, artist, title, artist_id, source_directory) if album_id is None else None
+					release_id = selected_release['id'] if selected_release is not None else album_id
+					release = self.get_release_by_id(release_id, recording_id)
+				release_id = release.mbid
 
 				metadata[MetadataKey.Artist] = artist
 				metadata[MetadataKey.Title] = title
@@ -51,7 +63,8 @@ class MusicBrainzAPIHelper:
 				metadata[MetadataKey.Date] = release.metadata[MetadataKey.Date]
 				metadata[MetadataKey.Year] = release.metadata[MetadataKey.Year]
 				metadata[MetadataKey.Length] = str(recording_length / 1000)  # Convert milliseconds to seconds
-				metadata[MetadataKey.Grouping] = "No Energy"
+				metadata[MetadataKey.MusicBrainzRecordingID] = recording_id
+				metadata[MetadataKey.MusicBrainzReleaseID] = release_id
 
 				genre_data: GenreDataModel = self._genre_algorithm.get_genre_data(recording_id, release_id) if subgenres is None else None
 
@@ -61,7 +74,9 @@ class MusicBrainzAPIHelper:
 				metadata[MetadataKey.Genre] = main_genre if genre is None else genre
 				metadata[MetadataKey.Comments] = "Subgenres: " + ("; ".join(sub_genres) if subgenres is None else subgenres)
 
-				recording_model = RecordingModel(mbid=recording_id, metadata=metadata)
+				cover_art = self._cover_art_provider.get_front_cover(release_id) if self._cover_art_provider is not None else None
+
+				recording_model = RecordingModel(mbid=recording_id, artist_id=artist_id, metadata=metadata, cover_art=cover_art)
 				recording_model.set_sub_genres(sub_genres)
 
 				return recording_model
@@ -81,7 +96,24 @@ class MusicBrainzAPIHelper:
 		self._logger.error(f"Failed to get recording after {retries} retries, skipping.")
 		return None  # Or handle the failure appropriately
 
-	def _choose_release(self, releases: List[dict], artist: str, title: str) -> dict:
+	def _choose_release(self, releases: List[dict], artist: str, title: str, artist_id: str = None, source_directory: Path = None) -> dict:
+		"""
+		Selects the release for a recording: a release remembered for the same album or folder is reused,
+		otherwise the user is prompted and the choice is remembered.
+		"""
+		remembered_release = self._release_selection_memory.recall(releases, artist_id, source_directory)
+		if remembered_release is not None:
+			self._logger.info(f"Using remembered release '{remembered_release.get('title', 'Unknown Album')}' for {artist} - {title}.")
+			return remembered_release
+
+		if len(releases) == 1:
+			return releases[0]
+
+		selected_release = self._prompt_for_release(releases, artist, title)
+		self._release_selection_memory.remember(selected_release, artist_id, source_directory)
+		return selected_release
+
+	def _prompt_for_release(self, releases: List[dict], artist: str, title: str) -> dict:
 		"""Prompts the user to select the correct release from a list."""
 		self._logger.info(f"Found multiple releases for {artist} - {title}. Please choose the correct one:")
 		for i, release in enumerate(releases):
@@ -102,13 +134,19 @@ class MusicBrainzAPIHelper:
 
 	def get_release_by_id(self, release_id: str, recording_id: str) -> ReleaseModel:
 		self._logger.debug(f"Getting release by ID: {release_id}")
-		release = musicbrainzngs.get_release_by_id(release_id, includes=['artist-credits', 'media', 'tags', 'release-groups', 'recordings'])['release']
-
+		release = self._musicbrainz_client.get_release_by_id(release_id, includes=RELEASE_INCLUDES)['release']
+		return self.release_model_from_release(release, recording_id)
+
+	def release_model_from_release(self, release: dict, recording_id: str, position: Tuple[int, int] = None) -> ReleaseModel:
+		"""
+		Builds the model of a release fetched with `RELEASE_INCLUDES`. The (track, disc) `position` picks the track when
+		known; otherwise the first track of the recording is used, which is ambiguous when a release repeats it.
+		"""
 		metadata: Dict[MetadataKey, str] = {}
 
 		album = release['title']
 		album_artist = release['artist-credit'][0]['artist']['name']
-		track_number, disc_number = self._get_track_and_disc_number(release, recording_id)
+		track_number, disc_number = position if position is not None else self._get_track_and_disc_number(release, recording_id)
 		release_date = self._get_release_date(release)
 
 		metadata[MetadataKey.Album] = album
@@ -118,7 +156,7 @@ class MusicBrainzAPIHelper:
 		metadata[MetadataKey.Date] = release_date
 		metadata[MetadataKey.Year] = release_date[:4]
 
-		release_model = ReleaseModel(mbid=release_id, metadata=metadata)
+		release_model = ReleaseModel(mbid=release['id'], metadata=metadata)
 		return release_model
 
 	def _get_track_and_disc_number(self, release: dict, recording_id: str) -> Tuple[int, int]:
@@ -3,13 +3,16 @@ from typing import Dict, Optional, List
 
 import pydantic
 
+from src.cover_art.cover_art_model import CoverArtModel
 from src.metadata.metadata_manipulator import MetadataKey
 
 
 class RecordingModel(pydantic.BaseModel):
 	mbid: Optional[str] = None
+	artist_id: Optional[str] = None
 	path: Optional[Path] = None
 	metadata: Dict[MetadataKey, str]
+	cover_art: Optional[CoverArtModel] = None
 	_sub_genres: Optional[List[str]] = None
 
 	def set_sub_genres(self, sub_genres: List[str]) -> None:
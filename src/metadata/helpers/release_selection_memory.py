@@ -0,0 +1,78 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from py_common.logging import HoornLogger
+
+from src.constants import RELEASE_SELECTION_FILE
+
+
+class ReleaseSelectionMemory:
+	"""
+	Persistently remembers which release the user picked, keyed by artist + release group and by source directory.
+	A remembered release is only reused for a recording that actually appears on it.
+	"""
+
+	def __init__(self, logger: HoornLogger, memory_file: Path = RELEASE_SELECTION_FILE):
+		self._logger = logger
+		self._memory_file: Path = memory_file
+		self._lock: threading.Lock = threading.Lock()
+		self._by_release_group: Dict[str, str] = {}
+		self._by_directory: Dict[str, str] = {}
+		self._load()
+
+	def _load(self) -> None:
+		if not self._memory_file.is_file():
+			return
+
+		try:
+			with open(self._memory_file, "r", encoding="utf-8") as file:
+				data = json.load(file)
+		except (OSError, ValueError) as e:
+			self._logger.warning(f"Could not read the release selections from {self._memory_file}: {e}")
+			return
+
+		self._by_release_group = data.get("by_release_group", {})
+		self._by_directory = data.get("by_directory", {})
+
+	def _save(self) -> None:
+		temporary_file = self._memory_file.with_suffix(".tmp")
+		with open(temporary_file, "w", encoding="utf-8") as file:
+			json.dump({"by_release_group": self._by_release_group, "by_directory": self._by_directory}, file, indent=2)
+		os.replace(temporary_file, self._memory_file)
+
+	def recall(self, releases: List[dict], artist_id: str = None, source_directory: Path = None) -> Optional[dict]:
+		"""Returns the remembered release among the releases of a recording, if there is one."""
+		releases_by_id: Dict[str, dict] = {release["id"]: release for release in releases}
+
+		if source_directory is not None:
+			release_id = self._by_directory.get(self._directory_key(source_directory))
+			if release_id in releases_by_id:
+				return releases_by_id[release_id]
+
+		if artist_id:
+			for release in releases:
+				release_id = self._by_release_group.get(self._release_group_key(artist_id, release))
+				if release_id in releases_by_id:
+					return releases_by_id[release_id]
+
+		return None
+
+	def remember(self, release: dict, artist_id: str = None, source_directory: Path = None) -> None:
+		with self._lock:
+			if artist_id and release.get("release-group", {}).get("id"):
+				self._by_release_group[self._release_group_key(artist_id, release)] = release["id"]
+			if source_directory is not None:
+				self._by_directory[self._directory_key(source_directory)] = release["id"]
+
+			self._save()
+
+	@staticmethod
+	def _release_group_key(artist_id: str, release: dict) -> str:
+		return f"{artist_id}/{release.get('release-group', {}).get('id', '')}"
+
+	@staticmethod
+	def _directory_key(source_directory: Path) -> str:
+		return os.path.normcase(os.path.abspath(source_directory))
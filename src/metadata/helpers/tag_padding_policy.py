@@ -0,0 +1,43 @@
+import threading
+
+import pydantic
+from mutagen import PaddingInfo
+
+# Padding reserved whenever a write has to grow the tag block anyway; enough for years of text tag edits.
+GENEROUS_TAG_PADDING: int = 64 * 1024
+
+
+class TagWriteReport(pydantic.BaseModel):
+	"""Counts of tag writes that fit in the existing padding vs writes that had to rewrite the file."""
+	in_place_writes: int = 0
+	full_rewrites: int = 0
+	bytes_moved: int = 0
+
+
+class TagPaddingPolicy:
+	"""
+	Padding callback for mutagen's `save(padding=...)`.
+
+	Existing padding is always kept when the new tags fit (mutagen would otherwise trim large padding, forcing a rewrite),
+	so edits happen in place. When the tags do not fit, the audio after them has to be moved anyway,
+	so generous padding is reserved for all later edits.
+	"""
+
+	def __init__(self, padding_on_rewrite: int = GENEROUS_TAG_PADDING):
+		self._padding_on_rewrite: int = padding_on_rewrite
+		self._lock: threading.Lock = threading.Lock()
+		self._report: TagWriteReport = TagWriteReport()
+
+	def choose_padding(self, info: PaddingInfo) -> int:
+		with self._lock:
+			if info.padding >= 0:
+				self._report.in_place_writes += 1
+				return info.padding
+
+			self._report.full_rewrites += 1
+			self._report.bytes_moved += info.size
+			return self._padding_on_rewrite
+
+	def get_report(self) -> TagWriteReport:
+		with self._lock:
+			return self._report.model_copy()
@@ -0,0 +1,101 @@
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Deque, Iterable, Iterator, List, Tuple
+
+from py_common.logging import HoornLogger, LogType
+
+from src.metadata.helpers.compact_recording import CompactRecording
+from src.metadata.metadata_manipulator import MetadataManipulator
+
+# Number of files a worker parses per task; large enough to amortize the pickling round-trip.
+INGESTION_CHUNK_SIZE: int = 256
+
+# Below this amount of files the pool start-up costs more than it saves.
+MIN_FILES_FOR_PROCESS_POOL: int = 2 * INGESTION_CHUNK_SIZE
+
+# Documented budget for the parent's working set, measured by benchmarks/ingestion_benchmark.py.
+# A CompactRecording plus its interned strings costs roughly 700 bytes for typical tags.
+MEMORY_BUDGET_BYTES_PER_FILE: int = 1024
+
+# When streaming, each worker has at most this many chunks queued, which bounds the memory of tags read ahead of the consumer.
+CHUNKS_IN_FLIGHT_PER_WORKER: int = 2
+
+_worker_manipulator: MetadataManipulator or None = None
+
+
+def _initialize_worker() -> None:
+	global _worker_manipulator
+	_worker_manipulator = MetadataManipulator(HoornLogger(min_level=LogType.WARNING))
+
+
+def _read_chunk(paths: List[str]) -> List[Tuple[str, Tuple[str, ...]]]:
+	"""Reads the tags of a chunk of files inside a worker process, returning plain tuples to keep pickling cheap."""
+	if _worker_manipulator is None:
+		_initialize_worker()
+
+	return [(path, CompactRecording.values_from_metadata(_worker_manipulator.get_all_metadata(Path(path)))) for path in paths]
+
+
+class LibraryIngestor:
+	"""
+	Reads the tags of many music files at once by spreading the parsing over a process pool.
+	Produces `CompactRecording`s instead of pydantic models to keep the working set small.
+	"""
+
+	def __init__(self, logger: HoornLogger, max_workers: int = None):
+		self._logger = logger
+		self._max_workers: int = max_workers if max_workers is not None else os.cpu_count() or 1
+
+	def ingest(self, music_files: List[Path]) -> List[CompactRecording]:
+		paths: List[str] = [str(file) for file in music_files]
+		chunks: List[List[str]] = [paths[i:i + INGESTION_CHUNK_SIZE] for i in range(0, len(paths), INGESTION_CHUNK_SIZE)]
+
+		if len(paths) < MIN_FILES_FOR_PROCESS_POOL or self._max_workers <= 1:
+			self._logger.debug(f"Ingesting {len(paths)} files in-process.")
+			results = map(_read_chunk, chunks)
+			return self._to_records(results)
+
+		self._logger.debug(f"Ingesting {len(paths)} files over {self._max_workers} processes in {len(chunks)} chunks.")
+		with ProcessPoolExecutor(max_workers=self._max_workers, initializer=_initialize_worker) as executor:
+			return self._to_records(executor.map(_read_chunk, chunks))
+
+	def ingest_stream(self, music_files: Iterable[Path]) -> Iterator[List[CompactRecording]]:
+		"""
+		Reads the tags of files as they arrive from the iterable and yields them chunk by chunk, in order.
+		Only a few chunks are in flight at a time, so memory does not depend on the number of files, and the first
+		chunk is read in-process so its records are available without waiting for the pool to start.
+		"""
+		paths = (str(file) for file in music_files)
+		chunks = iter(lambda: list(islice(paths, INGESTION_CHUNK_SIZE)), [])
+
+		first_chunk = next(chunks, None)
+		if first_chunk is None:
+			return
+		yield self._to_records([_read_chunk(first_chunk)])
+
+		if self._max_workers <= 1:
+			for chunk in chunks:
+				yield self._to_records([_read_chunk(chunk)])
+			return
+
+		with ProcessPoolExecutor(max_workers=self._max_workers, initializer=_initialize_worker) as executor:
+			in_flight: Deque[Future] = deque()
+			for chunk in chunks:
+				in_flight.append(executor.submit(_read_chunk, chunk))
+				if len(in_flight) >= self._max_workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+					yield self._to_records([in_flight.popleft().result()])
+
+			while in_flight:
+				yield self._to_records([in_flight.popleft().result()])
+
+	def _to_records(self, chunk_results) -> List[CompactRecording]:
+		records: List[CompactRecording] = []
+
+		for chunk in chunk_results:
+			for path, values in chunk:
+				records.append(CompactRecording(path, values))
+
+		return records
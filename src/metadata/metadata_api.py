@@ -3,24 +3,46 @@ from typing import Dict, List
 
 from py_common.logging import HoornLogger
 
+from src.analysis.energy_tempo_pool import EnergyTempoPool
+from src.analysis.replay_gain_analyzer import LoudnessReport, ReplayGainAnalyzer
+from src.constants import ANALYZE_ENERGY_AND_TEMPO, EMBED_COVER_ART, PREFETCH_ARTIST_CATALOGUES
+from src.cover_art.cover_art_provider import CoverArtProvider
 from src.downloading.download_model import DownloadModel
 from src.genre_detection.genre_algorithm import GenreAlgorithm
 from src.handlers.library_file_handler import LibraryFileHandler
+from src.indexing.incremental_scan import ScanReport
+from src.indexing.library_search import LibrarySearch, SearchResultModel
+from src.jobs.job_queue import JobQueue
+from src.jobs.library_jobs import LibraryJobs
+from src.jobs.queue_worker import WorkerReport
+from src.lazy_component import LazyComponent
 from src.metadata.clear_metadata import ClearMetadata
+from src.metadata.helpers.tag_padding_policy import TagWriteReport
 from src.metadata.helpers.track_model import TrackModel
 from src.metadata.metadata_manipulator import MetadataManipulator, MetadataKey
 from src.metadata.metadata_populater import MetadataPopulater
+from src.metadata.tag_manifest import ManifestApplyReport, TagManifest
+from src.musicbrainz.musicbrainz_client import MusicBrainzClient
+from src.staging.library_stager import LibraryStager
 
 
 class MetadataAPI:
 	"""Facade class for manipulating music metadata."""
 
-	def __init__(self, logger: HoornLogger, genre_algorithm: GenreAlgorithm):
+	def __init__(self, logger: HoornLogger, genre_algorithm: GenreAlgorithm, musicbrainz_client: MusicBrainzClient):
 		self._logger = logger
-		self._metadata_clear_tool: ClearMetadata = ClearMetadata(logger)
-		self._metadata_manipulator: MetadataManipulator = MetadataManipulator(logger)
-		self._musicbrainz_metadata_populater: MetadataPopulater = MetadataPopulater(logger, genre_algorithm)
 		self._library_file_handler: LibraryFileHandler = LibraryFileHandler(logger)
+		self._library_stager: LibraryStager = LibraryStager(logger, self._library_file_handler)
+		self._library_search: LibrarySearch = LibrarySearch(logger, self._library_file_handler.library_index)
+		self._metadata_manipulator: MetadataManipulator = MetadataManipulator(logger, on_file_written=self._library_file_handler.reindex_file)
+		self._replay_gain_analyzer: ReplayGainAnalyzer = ReplayGainAnalyzer(logger, self._library_file_handler, self._metadata_manipulator)
+		self._cover_art_provider: CoverArtProvider or None = CoverArtProvider(logger) if EMBED_COVER_ART else None
+		self._energy_tempo_pool: EnergyTempoPool or None = EnergyTempoPool(logger) if ANALYZE_ENERGY_AND_TEMPO else None
+		self._metadata_clear_tool: ClearMetadata = ClearMetadata(logger, self._library_file_handler, self._metadata_manipulator)
+		self._tag_manifest: TagManifest = TagManifest(logger, self._library_file_handler, self._metadata_manipulator)
+		self._musicbrainz_metadata_populater: MetadataPopulater = MetadataPopulater(logger, genre_algorithm, musicbrainz_client, self._library_file_handler, self._metadata_manipulator, self._cover_art_provider, self._energy_tempo_pool, PREFETCH_ARTIST_CATALOGUES)
+		# The queue file is only opened by the commands that use it.
+		self._library_jobs: LazyComponent[LibraryJobs] = LazyComponent(lambda: LibraryJobs(logger, JobQueue(logger), self._library_file_handler, self._metadata_manipulator, self._musicbrainz_metadata_populater, self._replay_gain_analyzer, musicbrainz_client))
 
 	def clear_genres(self, music_directory: Path) -> None:
 		self._metadata_clear_tool.clear_genres(music_directory)
@@ -31,6 +53,12 @@ class MetadataAPI:
 	def update_metadata_from_dict(self, file_path: Path, metadata_dict: Dict[MetadataKey, str]) -> None:
 		self._metadata_manipulator.update_metadata_from_dict(file_path, metadata_dict)
 
+	def export_tag_manifest(self, directory_path: Path, manifest_path: Path) -> int:
+		return self._tag_manifest.export(directory_path, manifest_path)
+
+	def apply_tag_manifest(self, manifest_path: Path) -> ManifestApplyReport:
+		return self._tag_manifest.apply(manifest_path)
+
 	def make_description_compatible(self, file_path: Path) -> None:
 		self._metadata_manipulator.make_description_compatible(file_path)
 
@@ -51,6 +79,30 @@ class MetadataAPI:
 	def get_all_metadata(self, file_path: Path) -> Dict[MetadataKey, str]:
 		return self._metadata_manipulator.get_all_metadata(file_path)
 
+	def has_complete_metadata(self, file_path: Path) -> bool:
+		return self._library_file_handler.has_complete_metadata(file_path)
+
+	def is_unchanged_since_indexed(self, file_path: Path) -> bool:
+		return self._library_file_handler.is_unchanged_since_indexed(file_path)
+
+	def get_tag_write_report(self) -> TagWriteReport:
+		return self._metadata_manipulator.get_tag_write_report()
+
+	def analyze_loudness(self, directory_path: Path) -> LoudnessReport:
+		return self._replay_gain_analyzer.analyze_directory(directory_path)
+
+	def enqueue_jobs(self, kind: str, path: Path, force_deep_scan: bool = False) -> int:
+		return self._library_jobs.get().enqueue(kind, path, force_deep_scan)
+
+	def run_worker(self, kinds: List[str] = None, stop_when_empty: bool = False) -> WorkerReport:
+		return self._library_jobs.get().run_worker(kinds, stop_when_empty)
+
+	def get_job_queue_status(self) -> Dict[str, int]:
+		return self._library_jobs.get().job_queue.get_status()
+
+	def find_in_library(self, query: str, limit: int = 25) -> List[SearchResultModel]:
+		return self._library_search.find(query, limit)
+
 	def get_metadata_keys(self, file_path: Path) -> List:
 		return self._metadata_manipulator.get_metadata_keys(file_path)
 
@@ -63,11 +115,17 @@ class MetadataAPI:
 	def organize_music_files(self, directory_path: Path, organized_path: Path) -> None:
 		self._library_file_handler.organize_music_files(directory_path, organized_path)
 
+	def organize_music_files_staged(self, directory_path: Path, organized_path: Path) -> None:
+		self._library_stager.organize(directory_path, organized_path)
+
+	def organize_files(self, music_files: List[Path], organized_path: Path) -> None:
+		self._library_file_handler.organize_files(music_files, organized_path)
+
 	def recheck_missing_metadata(self, organized_path: Path):
 		self._library_file_handler.recheck_missing_metadata(organized_path)
 
-	def rescan_entire_library(self, organized_path: Path):
-		self._library_file_handler.rescan_entire_library(organized_path)
+	def rescan_entire_library(self, organized_path: Path, force_deep_scan: bool = False) -> ScanReport:
+		return self._library_file_handler.rescan_entire_library(organized_path, force_deep_scan)
 
 	def populate_metadata_from_musicbrainz_album(self, directory_path: Path, album_id: str):
 		self._musicbrainz_metadata_populater.find_and_embed_metadata_from_album(directory_path, album_id)
@@ -1,10 +1,20 @@
+import base64
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, List
 
 import mutagen
+from mutagen._vorbis import VComment
+from mutagen.easyid3 import EasyID3
+from mutagen.easymp4 import EasyMP4Tags
+from mutagen.flac import FLAC, Picture
 from py_common.logging import HoornLogger
 
+from src.cover_art.cover_art_model import CoverArtModel
+from src.metadata.fast_tag_reader import FastTagReader
+from src.metadata.helpers.easy_tag_keys import COVER_ART_KEY, register_easy_tag_keys
+from src.metadata.helpers.tag_padding_policy import TagPaddingPolicy, TagWriteReport
+
 
 class MetadataKey(Enum):
 	Title = "title"
@@ -19,6 +29,7 @@ class MetadataKey(Enum):
 	TrackNumber = "tracknumber"
 	DiscNumber = "discnumber"
 	Grouping = "grouping"
+	BPM = "bpm"
 
 	Date = "date"
 	Year = "year"
@@ -26,23 +37,51 @@ class MetadataKey(Enum):
 	Encoder = "encoder"
 	Length = "length"
 
+	MusicBrainzRecordingID = "musicbrainz_trackid"
+	MusicBrainzReleaseID = "musicbrainz_albumid"
+
+	ReplayGainTrackGain = "replaygain_track_gain"
+	ReplayGainTrackPeak = "replaygain_track_peak"
+	ReplayGainAlbumGain = "replaygain_album_gain"
+	ReplayGainAlbumPeak = "replaygain_album_peak"
+
 
 class MetadataManipulator:
 	"""
 	Class to help with music metadata manipulation.
 	Relies on the mutagen library for reading and writing metadata.
+	Files are opened through mutagen's easy interfaces, so the same key names work for FLAC, Ogg, MP3 and M4A files.
 	"""
 
-	def __init__(self, logger: HoornLogger):
+	def __init__(self, logger: HoornLogger, use_fast_tag_reader: bool = True, on_file_written: Callable[[Path], None] = None):
 		self._logger: HoornLogger = logger
+		self._fast_tag_reader: FastTagReader or None = FastTagReader(logger) if use_fast_tag_reader else None
+		self._padding_policy: TagPaddingPolicy = TagPaddingPolicy()
+		self._on_file_written: Callable[[Path], None] or None = on_file_written
+		register_easy_tag_keys()
 
-	def _load_file(self, file_path: Path) -> mutagen.File:
+	def _load_file(self, file_path: Path, easy: bool = True) -> mutagen.File:
 		try:
-			return mutagen.File(str(file_path))
+			file = mutagen.File(str(file_path), easy=easy)
 		except mutagen.MutagenError as e:
 			self._logger.error(f"Error loading file {file_path}: {e}")
 			return None
 
+		if file is not None and file.tags is None:
+			file.add_tags()
+
+		return file
+
+	def _save(self, file: mutagen.File) -> None:
+		file.save(padding=self._padding_policy.choose_padding)
+
+		if self._on_file_written is not None:
+			self._on_file_written(Path(file.filename))
+
+	def get_tag_write_report(self) -> TagWriteReport:
+		"""Returns how many writes of this manipulator happened in place vs rewrote the whole file."""
+		return self._padding_policy.get_report()
+
 	def make_description_compatible(self, file_path: Path):
 		self._logger.debug(f"Making description compatible for file {file_path.name}")
 
@@ -55,11 +94,12 @@ class MetadataManipulator:
 		file["comment"] = description_value
 		file["comments"] = description_value
 
-		file.save()
+		self._save(file)
 
 		self._logger.debug(f"Description compatible for file {file_path.name} - Done")
 
-	def update_metadata_from_dict(self, file_path: Path, metadata_dict: Dict[MetadataKey, str]) -> None:
+	def update_metadata_from_dict(self, file_path: Path, metadata_dict: Dict[MetadataKey, str], cover_art: CoverArtModel = None, removed_keys: List[MetadataKey] = None) -> None:
+		"""Writes the given tags, and the cover if one is given, and deletes the removed keys, with a single save of the file."""
 		file: mutagen.File = self._load_file(file_path)
 
 		if file is None:
@@ -76,7 +116,42 @@ class MetadataManipulator:
 
 			file[key.value] = value
 
-		file.save()
+		for key in removed_keys or []:
+			self._remove_key(file, key)
+
+		if cover_art is not None:
+			self._set_cover_art(file, cover_art)
+
+		self._save(file)
+
+	def remove_keys(self, file_path: Path, keys: List[MetadataKey]) -> None:
+		"""Deletes the given tags from the file, instead of leaving them behind as empty values."""
+		self.update_metadata_from_dict(file_path, {}, removed_keys=keys)
+
+	@staticmethod
+	def _remove_key(file: mutagen.File, key: MetadataKey) -> None:
+		# The description is mirrored into the comment fields when written, so those go with it.
+		names = [key.value, "comment", "comments"] if key == MetadataKey.Comments else [key.value]
+		for name in names:
+			if name in file:
+				del file[name]
+
+	def _set_cover_art(self, file: mutagen.File, cover_art: CoverArtModel) -> None:
+		picture = Picture()
+		picture.type = 3  # Front cover
+		picture.mime = cover_art.mime_type
+		picture.width = cover_art.width
+		picture.height = cover_art.height
+		picture.depth = 24
+		picture.data = cover_art.data
+
+		if isinstance(file, FLAC):
+			file.clear_pictures()
+			file.add_picture(picture)
+		elif isinstance(file.tags, (VComment, EasyID3, EasyMP4Tags)):
+			file[COVER_ART_KEY] = [base64.b64encode(picture.write()).decode("ascii")]
+		else:
+			self._logger.warning(f"Cannot embed cover art into {Path(file.filename).name}, its tag format is not supported.")
 
 	def update_metadata(self, file_path: Path, metadata_key: MetadataKey, new_value: str) -> None:
 		file: mutagen.File = self._load_file(file_path)
@@ -85,7 +160,7 @@ class MetadataManipulator:
 			self._logger.warning(f"Metadata key {metadata_key.value} not found in file {file_path}")
 
 		file[metadata_key.value] = new_value
-		file.save()
+		self._save(file)
 
 	def clear_metadata(self, file_path: Path, metadata_key: MetadataKey, empty_value: str) -> None:
 		self.update_metadata(file_path, metadata_key, empty_value)
@@ -100,6 +175,11 @@ class MetadataManipulator:
 		return file[metadata_key.value]
 
 	def get_all_metadata(self, file_path: Path) -> Dict[MetadataKey, str]:
+		if self._fast_tag_reader is not None:
+			tags = self._fast_tag_reader.read(file_path)
+			if tags is not None:
+				return {key: tags[key.value] for key in MetadataKey if key.value in tags}
+
 		file: mutagen.File = self._load_file(file_path)
 		if file is None:
 			return {}
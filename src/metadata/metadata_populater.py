@@ -1,41 +1,65 @@
+import csv
 import os
 import re
-from difflib import SequenceMatcher
+from concurrent.futures import Future
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
 import musicbrainzngs
 from py_common.logging import HoornLogger
 
+from src.analysis.energy_tempo_meter import EnergyTempoModel
+from src.analysis.energy_tempo_pool import EnergyTempoPool
 from src.constants import DOWNLOAD_CSV_FILE
+from src.cover_art.cover_art_provider import CoverArtProvider
 from src.downloading.download_model import DownloadModel
 from src.genre_detection.genre_algorithm import GenreAlgorithm
 from src.handlers.library_file_handler import LibraryFileHandler
-from src.metadata.helpers.musicbrainz_api_helper import MusicBrainzAPIHelper
+from src.metadata.helpers.album_track_matcher import AlbumTrackMatcher, AlbumTrackModel, tracks_from_release
+from src.metadata.helpers.musicbrainz_api_helper import MusicBrainzAPIHelper, RELEASE_INCLUDES
 from src.metadata.helpers.musicbrainz_result_interpreter import MusicBrainzResultInterpreter
 from src.metadata.helpers.recording_model import RecordingModel
 from src.metadata.helpers.track_model import TrackModel
 from src.metadata.metadata_manipulator import MetadataManipulator, MetadataKey
+from src.musicbrainz.artist_catalogue import ArtistCatalogue
+from src.musicbrainz.musicbrainz_client import MusicBrainzClient
+
+# Tagging a file searched for by name takes a search and four lookups (the recording, its release and two for its genre).
+# An artist's catalogue answers all of them, so it is only browsed when that takes fewer requests than the remaining files would.
+LOOKUPS_PER_FILE: int = 5
 
 
 class MetadataPopulater:
-	def __init__(self, logger: HoornLogger, genre_algorithm: GenreAlgorithm):
+	def __init__(self, logger: HoornLogger, genre_algorithm: GenreAlgorithm, musicbrainz_client: MusicBrainzClient, library_file_handler: LibraryFileHandler, metadata_manipulator: MetadataManipulator, cover_art_provider: CoverArtProvider = None, energy_tempo_pool: EnergyTempoPool = None, prefetch_artist_catalogues: bool = False):
 		self._logger = logger
-		self._music_library_handler: LibraryFileHandler = LibraryFileHandler(logger)
-		self._metadata_manipulator: MetadataManipulator = MetadataManipulator(logger)
+		self._music_library_handler: LibraryFileHandler = library_file_handler
+		self._metadata_manipulator: MetadataManipulator = metadata_manipulator
 		self._musicbrainz_interpreter: MusicBrainzResultInterpreter = MusicBrainzResultInterpreter(logger)
-		self._recording_helper: MusicBrainzAPIHelper = MusicBrainzAPIHelper(logger, genre_algorithm)
-		musicbrainzngs.set_useragent("Music Organization Tool", "0.0", "https://github.com/LordMartron94/music-organization-tool")
+		self._musicbrainz_client: MusicBrainzClient = musicbrainz_client
+		self._recording_helper: MusicBrainzAPIHelper = MusicBrainzAPIHelper(logger, genre_algorithm, musicbrainz_client, cover_art_provider)
+		self._album_track_matcher: AlbumTrackMatcher = AlbumTrackMatcher(logger)
+		self._energy_tempo_pool: EnergyTempoPool or None = energy_tempo_pool
+		self._energy_tempo_analyses: Dict[Path, Future] = {}
+		self._prefetch_artist_catalogues: bool = prefetch_artist_catalogues
+		# Artist id -> the prefetched catalogue, or None when it was not worth browsing.
+		self._artist_catalogues: Dict[str, ArtistCatalogue or None] = {}
 
 	def find_and_embed_metadata(self, directory_path: Path):
 		"""
 		Main function to find and embed metadata for all FLAC files in the download directory.
+		After the first file of an artist is matched, the artist's catalogue can be prefetched, so their later files are
+		matched and tagged from it without searching.
 		"""
 		self._logger.info("Starting metadata finder...")
 		files: List[Path] = self._get_files(directory_path)
-		for file in files:
-			self._logger.info(f"Processing file: {file.name}")
-			self._process_file(file)
+		self._start_energy_tempo_analysis(files)
+		try:
+			for index, file in enumerate(files):
+				self._logger.info(f"Processing file: {file.name}")
+				self._process_file(file, len(files) - index - 1)
+		finally:
+			self._release_artist_catalogues()
+			self._end_energy_tempo_analysis(files)
 
 	def find_and_embed_metadata_from_ids_for_file(self, download_model: DownloadModel) -> None:
 		file_path = download_model.path
@@ -44,65 +68,115 @@ class MetadataPopulater:
 		genre = download_model.genre
 		subgenres = download_model.subgenre
 
-		recording_model: RecordingModel = self._recording_helper.get_recording_by_id(recording_id, release_id, genre=genre, subgenres=subgenres)
-
-		if recording_model is None:
-			return
+		self._start_energy_tempo_analysis([file_path])
+		try:
+			source_directory = file_path.parent if file_path is not None else None
+			recording_model: RecordingModel = self._recording_helper.get_recording_by_id(recording_id, release_id, genre=genre, subgenres=subgenres, source_directory=source_directory)
 
-		self._embed_metadata(file_path, recording_model)
+			if recording_model is not None:
+				self._embed_metadata(file_path, recording_model)
+		finally:
+			self._end_energy_tempo_analysis([file_path])
 
 	def find_and_embed_metadata_from_album(self, directory_path: Path, album_id: str):
 		self._logger.info("Starting metadata finder...")
 		files: List[Path] = self._get_files(directory_path)
-		for file in files:
-			self._logger.info(f"Processing file: {file.name}")
-			self._process_file(file, album_id)
-
-	def _process_file(self, file: Path, album_id: str = None) -> None:
+		self._start_energy_tempo_analysis(files)
+		try:
+			# The album is fetched once and its files are matched to its tracks together, so no two files claim the same track.
+			album = self._musicbrainz_client.get_release_by_id(album_id, includes=RELEASE_INCLUDES)
+			matches: Dict[Path, AlbumTrackModel] = self._album_track_matcher.match(files, tracks_from_release(album['release']))
+
+			for file in files:
+				self._logger.info(f"Processing file: {file.name}")
+				track = matches.get(file)
+				recording_model = self._get_album_track_recording(album['release'], track) if track is not None else None
+				if recording_model:
+					self._embed_metadata(file, recording_model)
+				else:
+					self._logger.warning(f"No matching track on the album for {file.name}")
+		finally:
+			self._end_energy_tempo_analysis(files)
+
+	def _get_album_track_recording(self, release: dict, track: AlbumTrackModel) -> RecordingModel or None:
+		# The matched position is used, since a release (e.g. a box set) can hold the same recording more than once.
+		release_model = self._recording_helper.release_model_from_release(release, track.recording_id, (track.track_number, track.disc_number))
+		return self._recording_helper.get_recording_by_id(track.recording_id, release=release_model)
+
+	def _process_file(self, file: Path, remaining_files: int = 0) -> None:
 		"""
 		Processes a single music file to find and embed metadata.
 		"""
 
-		recording_model = self._find_recording(file, album_id)
+		recording_model = self._match_in_artist_catalogues(file) or self._find_recording(file)
 		if recording_model:
 			self._embed_metadata(file, recording_model)
+			self._prefetch_artist_catalogue(recording_model.artist_id, remaining_files)
 		else:
 			self._logger.warning(f"No metadata found for {file.name}")
 
-	def _find_recording(self, file: Path, album_id: str = None) -> RecordingModel or None:
+	def _match_in_artist_catalogues(self, file: Path) -> RecordingModel or None:
+		for catalogue in self._artist_catalogues.values():
+			recording_id = catalogue.match(file.stem) if catalogue is not None else None
+			if recording_id is None:
+				continue
+
+			self._logger.info(f"Matched {file.name} in the catalogue of {catalogue.artist_name}.")
+			try:
+				return self._recording_helper.get_recording_by_id(recording_id, source_directory=file.parent)
+			except musicbrainzngs.MusicBrainzError as e:
+				self._logger.error(f"MusicBrainzError: {e}")
+
+		return None
+
+	def _prefetch_artist_catalogue(self, artist_id: str, remaining_files: int) -> None:
+		if not self._prefetch_artist_catalogues or artist_id is None or artist_id in self._artist_catalogues or remaining_files == 0:
+			return
+
+		catalogue = ArtistCatalogue(self._logger, artist_id)
+		try:
+			loaded = catalogue.load(self._musicbrainz_client, remaining_files * LOOKUPS_PER_FILE)
+		except musicbrainzngs.MusicBrainzError as e:
+			self._logger.warning(f"Could not prefetch the catalogue of artist {artist_id}: {e}")
+			loaded = False
+
+		self._artist_catalogues[artist_id] = catalogue if loaded else None
+		if loaded:
+			self._musicbrainz_client.attach_catalogue(catalogue)
+
+	def _release_artist_catalogues(self) -> None:
+		for catalogue in self._artist_catalogues.values():
+			if catalogue is not None:
+				self._musicbrainz_client.detach_catalogue(catalogue)
+		self._artist_catalogues.clear()
+
+	def _find_recording(self, file: Path) -> RecordingModel or None:
 		"""
 		Tries to find the MusicBrainz recording ID for the given file.
 		Prompts the user for manual input or to skip if automatic search fails.
 		"""
 
-		if album_id is not None:
-			album = musicbrainzngs.get_release_by_id(album_id, includes=["recordings"])
-			recording_ids = [recording['recording']['id'] for recording in album['release']['medium-list'][0]['track-list']]
-			models = [self._recording_helper.get_recording_by_id(recording_id, album_id) for recording_id in recording_ids]
-			models = [model for model in models if model is not None]
-			return self._choose_model(models, file)
-		else:
-			try:
-				artist = input(f"Enter the author name for {file.stem}: ")
+		try:
+			artist = input(f"Enter the author name for {file.stem}: ")
 
-				search_results = self._search_musicbrainz(file.stem, artist)
-				recording_id = self._musicbrainz_interpreter.choose_best_result(search_results, file.stem)
-				recording_model: RecordingModel = self._recording_helper.get_recording_by_id(recording_id)
-				return recording_model
-			except musicbrainzngs.MusicBrainzError as e:
-				self._logger.error(f"MusicBrainzError: {e}")
+			search_results = self._search_musicbrainz(file.stem, artist)
+			recording_id = self._musicbrainz_interpreter.choose_best_result(search_results, file.stem)
+			recording_model: RecordingModel = self._recording_helper.get_recording_by_id(recording_id, source_directory=file.parent)
+			return recording_model
+		except musicbrainzngs.MusicBrainzError as e:
+			self._logger.error(f"MusicBrainzError: {e}")
 
-			manual = self._get_manual_mbid(file)
-			if manual:
-				return self._recording_helper.get_recording_by_id(manual)
+		manual = self._get_manual_mbid(file)
+		if manual:
+			return self._recording_helper.get_recording_by_id(manual, source_directory=file.parent)
 
-			return None
+		return None
 
 	def _search_musicbrainz(self, recording: str, artist: str) -> dict:
 		"""
 		Searches MusicBrainz for recordings matching the given query.
 		"""
-		return musicbrainzngs.search_recordings(recording=recording, artist=artist)
+		return self._musicbrainz_client.search_recordings(recording=recording, artist=artist)
 
 	def _get_manual_mbid(self, file: Path) -> str or None:
 		"""
@@ -127,36 +201,63 @@ class MetadataPopulater:
 
 	def _embed_metadata(self, file: Path, recording_model: RecordingModel):
 		"""
-		Embeds as much metadata as possible from MusicBrainz into the FLAC file for Plexamp compatibility.
+		Embeds as much metadata as possible from MusicBrainz, and the release's cover, into the FLAC file for Plexamp compatibility.
 		"""
+		metadata = dict(recording_model.metadata)
+		energy_tempo = self._get_energy_tempo(file)
+		if energy_tempo is not None:
+			metadata[MetadataKey.Grouping] = energy_tempo.energy.value
+			metadata[MetadataKey.BPM] = str(energy_tempo.bpm)
+
 		try:
-			self._metadata_manipulator.update_metadata_from_dict(file, recording_model.metadata)
+			self._metadata_manipulator.update_metadata_from_dict(file, metadata, recording_model.cover_art)
 			self._logger.info(f"Embedded metadata into {file.name}")
 		except musicbrainzngs.MusicBrainzError as e:
 			self._logger.error(f"MusicBrainzError: {e}")
 		except Exception as e:
 			self._logger.error(f"Error embedding metadata: {e}")
 
-	def _get_files(self, directory_path: Path) -> List[Path]:
-		return self._music_library_handler.get_music_files(directory_path)
+	def _start_energy_tempo_analysis(self, files: List[Path]) -> None:
+		"""Queues the audio analysis of the files right away, so it runs while their metadata is being looked up."""
+		if self._energy_tempo_pool is None:
+			return
 
-	def _choose_model(self, models: List[RecordingModel], file: Path):
-		ranked_models = self._rank_models_based_on_similarity_to_title(models, file.stem)
-		return ranked_models[0]
+		for file in files:
+			if file is not None and file not in self._energy_tempo_analyses:
+				self._energy_tempo_analyses[file] = self._energy_tempo_pool.submit(file)
+
+	def _get_energy_tempo(self, file: Path) -> EnergyTempoModel or None:
+		future = self._energy_tempo_analyses.pop(file, None)
+		if future is None:
+			return None
 
-	def _rank_models_based_on_similarity_to_title(self, models: List[RecordingModel], title: str) -> List[RecordingModel]:
-		ranked_models = sorted(models, key=lambda model: self._similarity_score(model.metadata[MetadataKey.Title], title), reverse=True)
-		return ranked_models
+		try:
+			return future.result()
+		except Exception as e:
+			self._logger.warning(f"Could not analyze the energy and tempo of {file.name}: {e}")
+			return None
 
-	def _similarity_score(self, title1: str, title2: str) -> float:
-		matcher = SequenceMatcher(None, title1.lower(), title2.lower())
-		return matcher.ratio()
+	def _end_energy_tempo_analysis(self, files: List[Path]) -> None:
+		"""Drops the analyses of skipped files and stops the pool's processes, which the next run starts again when needed."""
+		self._discard_energy_tempo_analyses(files)
+		if self._energy_tempo_pool is not None:
+			self._energy_tempo_pool.shutdown()
+
+	def _discard_energy_tempo_analyses(self, files: List[Path]) -> None:
+		"""Drops the analyses of files that were skipped, cancelling them if they have not started yet."""
+		for file in files:
+			future = self._energy_tempo_analyses.pop(file, None)
+			if future is not None:
+				future.cancel()
+
+	def _get_files(self, directory_path: Path) -> List[Path]:
+		return self._music_library_handler.get_music_files(directory_path)
 
 	def get_track_ids_in_album(self, album_id: str = None) -> List[TrackModel]:
 		if album_id is None:
 			album_id = input("Enter the MusicBrainz album ID: ")
 
-		album = musicbrainzngs.get_release_by_id(album_id, includes=["recordings"])
+		album = self._musicbrainz_client.get_release_by_id(album_id, includes=["recordings"])
 		selected_medium = self._get_selected_medium(album)
 		recording_ids, recording_titles, recording_track_numbers = [], [], []
 
@@ -200,7 +301,7 @@ class MetadataPopulater:
 
 		# Header Columns: URL,RELEASE ID,TRACK ID,TRACK TITLE,GENRE,SUBGENRES
 		# Leaving URL Genre and Subgenres blank for now
-		with open(file_path, 'a') as csvfile:
+		with open(file_path, 'a', newline='', encoding='utf-8') as csvfile:
+			writer = csv.writer(csvfile)
 			for track in tracks:
-				line: str = f",{album_id},{track.mbid},{track.title},,\n"
-				csvfile.write(line)
+				writer.writerow(["", album_id, track.mbid, track.title, "", ""])
@@ -1,10 +1,23 @@
-from typing import List
+from pathlib import Path
+from typing import Dict, List, Tuple
 
+import numpy as np
 from py_common.logging import HoornLogger
 
+from src.metadata.helpers.compact_recording import CompactRecording
+from src.metadata.helpers.library_table import LibraryTable
 from src.metadata.helpers.recording_model import RecordingModel
 from src.metadata.metadata_manipulator import MetadataManipulator, MetadataKey
 
+# Values that count as "missing" per required key. An absent key is read as an empty string.
+COMPLETENESS_RULES: Dict[MetadataKey, List[str]] = {
+	MetadataKey.Title: [""],
+	MetadataKey.Artist: [""],
+	MetadataKey.Date: ["", "0000-00-00"],
+	MetadataKey.Genre: ["", "No Genre"],
+	MetadataKey.TrackNumber: ["", "0"],
+}
+
 
 class MissingMetadataFinder:
 	""" Utility class to find music files with missing metadata."""
@@ -14,35 +27,36 @@ class MissingMetadataFinder:
 		self._metadata_helper: MetadataManipulator = MetadataManipulator(logger)
 
 	def find_missing_metadata(self, music_files: List[RecordingModel]) -> List[RecordingModel]:
-		missing_metadata_files = []
-
-		for file in music_files:
-			metadata = file.metadata
-
-			title = metadata[MetadataKey.Title]
-			artist = metadata[MetadataKey.Artist]
-			release_date = metadata[MetadataKey.Date]
-			genre = metadata[MetadataKey.Genre]
-			track_number = metadata[MetadataKey.TrackNumber]
-
-			checks = {
-				"title": self._check_value(title),
-                "artist": self._check_value(artist),
-                "release_date": self._check_value(release_date, "0000-00-00"),
-                "genre": self._check_value(genre, "No Genre"),
-                "track_number": self._check_value(track_number, "0")
-			}
-
-			for key, check in checks.items():
-				if check:
-					self._logger.warning(f"Missing metadata for {file.path.stem}: {key}")
-					missing_metadata_files.append(file)
-					break
-
-		return missing_metadata_files
-
-	def _check_value(self, value, extra_check: str = None) -> bool:
-		if value == "" or value is None or (extra_check and value == extra_check):
-			return True
-
-		return False
+		records = [CompactRecording(str(file.path), CompactRecording.values_from_metadata(file.metadata)) for file in music_files]
+		missing_mask = self.get_missing_metadata_mask(LibraryTable.from_records(records))
+
+		return [file for file, missing in zip(music_files, missing_mask) if missing]
+
+	def is_complete(self, metadata: Dict[MetadataKey, str]) -> bool:
+		"""Whether one file's metadata passes every completeness rule."""
+		return all(metadata.get(key, "") not in invalid_values for key, invalid_values in COMPLETENESS_RULES.items())
+
+	def split_by_completeness(self, table: LibraryTable) -> Tuple[LibraryTable, LibraryTable]:
+		"""
+		Splits the table into the rows with complete metadata and the rows missing at least one required value.
+		"""
+		missing_mask = self.get_missing_metadata_mask(table)
+		return table.select(~missing_mask), table.select(missing_mask)
+
+	def get_missing_metadata_mask(self, table: LibraryTable) -> np.ndarray:
+		"""
+		Evaluates every completeness rule as a vectorized mask over the table's columns.
+		Returns a boolean array that is set for every row that misses at least one required value.
+		"""
+		missing_mask = np.zeros(len(table), dtype=bool)
+		paths = table.paths()
+
+		for key, invalid_values in COMPLETENESS_RULES.items():
+			key_missing = np.isin(table.column(key), invalid_values)
+
+			for row in np.flatnonzero(key_missing & ~missing_mask):
+				self._logger.warning(f"Missing metadata for {Path(paths[row]).stem}: {key.value}")
+
+			missing_mask |= key_missing
+
+		return missing_mask
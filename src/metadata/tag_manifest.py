@@ -0,0 +1,174 @@
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pydantic
+from py_common.logging import HoornLogger
+
+from src.constants import MANIFEST_WORKERS
+from src.handlers.library_file_handler import LibraryFileHandler
+from src.metadata.metadata_manipulator import MetadataKey, MetadataManipulator
+
+# pyarrow is optional: without it manifests can still be written and read as CSV or JSON.
+try:
+	import pyarrow
+	import pyarrow.parquet
+except ImportError:
+	pyarrow = None
+
+PATH_COLUMN: str = "path"
+MANIFEST_COLUMNS: List[str] = [PATH_COLUMN] + [key.value for key in MetadataKey]
+
+ManifestRow = Dict[str, str]
+
+
+class ManifestApplyReport(pydantic.BaseModel):
+	changed_files: int = 0
+	changed_tags: int = 0
+	unchanged_files: int = 0
+	missing_files: int = 0
+	failed_files: int = 0
+
+
+class TagManifest:
+	"""
+	Exports the tags of a directory to a manifest (.csv, .json or .parquet) that can be edited in bulk with any tool,
+	and applies an edited manifest back: every file is compared with its current tags and only files that differ are saved, once each.
+	Columns left out of a manifest are left alone, so a manifest can be cut down to just the tags being fixed;
+	a cell that was cleared deletes the tag.
+	"""
+
+	def __init__(self, logger: HoornLogger, library_file_handler: LibraryFileHandler, metadata_manipulator: MetadataManipulator, max_workers: int = MANIFEST_WORKERS):
+		self._logger = logger
+		self._library_file_handler: LibraryFileHandler = library_file_handler
+		self._metadata_manipulator: MetadataManipulator = metadata_manipulator
+		self._max_workers: int = max_workers
+
+	def export(self, directory: Path, manifest_path: Path) -> int:
+		"""Writes one row per music file in the directory; returns the number of rows."""
+		if manifest_path.suffix.lower() == ".parquet" and pyarrow is None:
+			self._logger.error("Parquet manifests need pyarrow, which is not installed. Export to .csv or .json instead.")
+			return 0
+
+		files = self._library_file_handler.get_music_files(directory)
+		with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+			rows = list(executor.map(self._read_row, files))
+
+		self._write_rows(manifest_path, rows)
+		self._logger.info(f"Exported the tags of {len(rows)} files to {manifest_path}")
+		return len(rows)
+
+	def apply(self, manifest_path: Path) -> ManifestApplyReport:
+		report = ManifestApplyReport()
+		rows = self._read_rows(manifest_path)
+		if rows is None:
+			return report
+
+		with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+			futures = {executor.submit(self._apply_row, row): row[PATH_COLUMN] for row in rows}
+
+			for future in as_completed(futures):
+				path = futures[future]
+				try:
+					changed_tags = future.result()
+				except FileNotFoundError:
+					self._logger.warning(f"{path} is in the manifest but no longer exists, skipping it.")
+					report.missing_files += 1
+					continue
+				except Exception as e:
+					self._logger.error(f"Could not apply the manifest to {path}: {e}")
+					report.failed_files += 1
+					continue
+
+				if changed_tags == 0:
+					report.unchanged_files += 1
+				else:
+					report.changed_files += 1
+					report.changed_tags += changed_tags
+
+		return report
+
+	def _read_row(self, file: Path) -> ManifestRow:
+		metadata = self._metadata_manipulator.get_all_metadata(file)
+		row: ManifestRow = {PATH_COLUMN: str(file)}
+		row.update({key.value: metadata.get(key, "") for key in MetadataKey})
+		return row
+
+	def _apply_row(self, row: ManifestRow) -> int:
+		"""Saves the file when the row differs from its current tags; returns the number of tags changed."""
+		file = Path(row[PATH_COLUMN])
+		if not file.is_file():
+			raise FileNotFoundError(file)
+
+		current = self._metadata_manipulator.get_all_metadata(file)
+		changes: Dict[MetadataKey, str] = {}
+		removed_keys: List[MetadataKey] = []
+		for key in MetadataKey:
+			if key.value not in row:
+				continue
+
+			# Empty cells and missing tags are the same thing; None comes from empty JSON or Parquet cells.
+			value = row[key.value] if row[key.value] is not None else ""
+			if value == current.get(key, ""):
+				continue
+
+			if value == "":
+				removed_keys.append(key)
+			else:
+				changes[key] = value
+
+		if changes or removed_keys:
+			self._logger.debug(f"Updating {', '.join(key.value for key in [*changes, *removed_keys])} of {file.name}")
+			self._metadata_manipulator.update_metadata_from_dict(file, changes, removed_keys=removed_keys)
+
+		return len(changes) + len(removed_keys)
+
+	def _write_rows(self, manifest_path: Path, rows: List[ManifestRow]) -> None:
+		suffix = manifest_path.suffix.lower()
+
+		if suffix == ".json":
+			with open(manifest_path, "w", encoding="utf-8") as file:
+				json.dump(rows, file, indent=1, ensure_ascii=False)
+		elif suffix == ".parquet":
+			columns = {column: [row[column] for row in rows] for column in MANIFEST_COLUMNS}
+			pyarrow.parquet.write_table(pyarrow.table(columns, schema=pyarrow.schema([(column, pyarrow.string()) for column in MANIFEST_COLUMNS])), manifest_path)
+		else:
+			with open(manifest_path, "w", newline="", encoding="utf-8") as file:
+				writer = csv.DictWriter(file, fieldnames=MANIFEST_COLUMNS)
+				writer.writeheader()
+				writer.writerows(rows)
+
+	def _read_rows(self, manifest_path: Path) -> List[ManifestRow] or None:
+		suffix = manifest_path.suffix.lower()
+
+		if suffix == ".json":
+			with open(manifest_path, "r", encoding="utf-8") as file:
+				rows = json.load(file)
+		elif suffix == ".parquet":
+			if pyarrow is None:
+				self._logger.error("Parquet manifests need pyarrow, which is not installed.")
+				return None
+			rows = pyarrow.parquet.read_table(manifest_path).to_pylist()
+		else:
+			with open(manifest_path, "r", newline="", encoding="utf-8") as file:
+				rows = list(csv.DictReader(file))
+
+		valid_rows, invalid_rows = self._split_valid_rows(rows)
+		if invalid_rows > 0:
+			self._logger.warning(f"Ignoring {invalid_rows} manifest rows without a '{PATH_COLUMN}'.")
+
+		return valid_rows
+
+	def _split_valid_rows(self, rows: List[ManifestRow]) -> Tuple[List[ManifestRow], int]:
+		# A file listed twice keeps its last row, so it is still saved only once.
+		valid: Dict[str, ManifestRow] = {}
+		invalid = 0
+		for row in rows:
+			if not isinstance(row, dict) or not row.get(PATH_COLUMN):
+				invalid += 1
+				continue
+			valid[row[PATH_COLUMN]] = {key: (str(value) if value is not None else None) for key, value in row.items()}
+
+		return list(valid.values()), invalid
@@ -0,0 +1,147 @@
+import math
+from typing import Any, Dict, List, Set, Tuple, TYPE_CHECKING
+
+from py_common.logging import HoornLogger
+
+from src.indexing.search_terms import tokenize
+
+if TYPE_CHECKING:
+	from src.musicbrainz.musicbrainz_client import MusicBrainzClient
+
+# The largest page the MusicBrainz browse endpoints hand out.
+BROWSE_PAGE_SIZE: int = 100
+RELEASE_BROWSE_INCLUDES: List[str] = ["artist-credits", "release-groups", "media", "recordings", "tags"]
+RECORDING_BROWSE_INCLUDES: List[str] = ["artist-credits", "tags"]
+
+# Lookups asking for no more than this are answered from the catalogue.
+RECORDING_LOOKUP_INCLUDES: Set[str] = {"artists", "artist-credits", "releases", "release-groups", "tags"}
+RELEASE_LOOKUP_INCLUDES: Set[str] = {"artists", "artist-credits", "release-groups", "media", "recordings", "tags"}
+
+# The fields a recording lookup lists for each release of the recording.
+RELEASE_SUMMARY_KEYS: Tuple[str, ...] = ("id", "title", "status", "date", "country", "release-group")
+
+# Words in downloaded file names that are not part of the title.
+FILE_NAME_NOISE_TOKENS: Set[str] = {"official", "audio", "video", "music", "lyrics", "lyric", "visualizer", "hq", "hd"}
+
+
+class ArtistCatalogue:
+	"""
+	The releases an artist is credited on or appears on, with their track lists, and the artist's recordings,
+	browsed from MusicBrainz a page at a time. Attached to the `MusicBrainzClient`, it answers the recording and release
+	lookups of tagging locally, and `match` finds the recording a file name refers to without a search.
+	"""
+
+	def __init__(self, logger: HoornLogger, artist_id: str):
+		self._logger = logger
+		self._artist_id: str = artist_id
+		self._artist_name: str = artist_id
+		self._artist_tokens: Set[str] = set()
+		self._releases: Dict[str, Dict[str, Any]] = {}
+		self._recordings: Dict[str, Dict[str, Any]] = {}
+		# Recording id -> release id -> the release as a recording lookup lists it.
+		self._releases_by_recording: Dict[str, Dict[str, Dict[str, Any]]] = {}
+		self._recordings_by_title: Dict[Tuple[str, ...], List[str]] = {}
+
+	@property
+	def artist_name(self) -> str:
+		return self._artist_name
+
+	def load(self, musicbrainz_client: "MusicBrainzClient", max_requests: int) -> bool:
+		"""
+		Browses the catalogue. Gives up and returns False as soon as it is clear that would take more than max_requests pages.
+		"""
+		browses = [
+			(musicbrainz_client.browse_releases, "release", RELEASE_BROWSE_INCLUDES, {"artist": self._artist_id}, self._add_release),
+			# Releases the artist only appears on, such as compilations.
+			(musicbrainz_client.browse_releases, "release", RELEASE_BROWSE_INCLUDES, {"track_artist": self._artist_id}, self._add_release),
+			(musicbrainz_client.browse_recordings, "recording", RECORDING_BROWSE_INCLUDES, {"artist": self._artist_id}, self._add_recording),
+		]
+
+		requests = 0
+		for browse, entity, includes, filters, add in browses:
+			offset = 0
+			while True:
+				page = browse(includes=includes, limit=BROWSE_PAGE_SIZE, offset=offset, **filters)
+				requests += 1
+				items = page[f"{entity}-list"]
+				count = int(page[f"{entity}-count"])
+				offset += len(items)
+
+				for item in items:
+					add(item)
+
+				if not items or offset >= count:
+					break
+				if requests + math.ceil((count - offset) / BROWSE_PAGE_SIZE) > max_requests:
+					self._logger.info(f"Not prefetching the catalogue of {self._artist_name}: its {count} {entity}s take more than {max_requests} requests.")
+					return False
+
+		self._logger.info(f"Prefetched the catalogue of {self._artist_name}: {len(self._releases)} releases and {len(self._recordings)} recordings in {requests} requests.")
+		return True
+
+	def _add_release(self, release: Dict[str, Any]) -> None:
+		self._releases[release["id"]] = release
+		summary = {key: release[key] for key in RELEASE_SUMMARY_KEYS if key in release}
+
+		for medium in release.get("medium-list", []):
+			for track in medium.get("track-list", []):
+				self._releases_by_recording.setdefault(track["recording"]["id"], {})[release["id"]] = summary
+
+	def _add_recording(self, recording: Dict[str, Any]) -> None:
+		self._recordings[recording["id"]] = recording
+		self._recordings_by_title.setdefault(tuple(tokenize(recording.get("title", ""))), []).append(recording["id"])
+
+		if not self._artist_tokens:
+			for credit in recording.get("artist-credit", []):
+				# The adapted credit list interleaves the credits with their join phrases.
+				if isinstance(credit, dict) and credit["artist"].get("id") == self._artist_id:
+					self._artist_name = credit["artist"].get("name", self._artist_id)
+					self._artist_tokens = set(tokenize(self._artist_name))
+
+	def get_recording(self, recording_id: str, includes: List[str] = None) -> Dict[str, Any] or None:
+		"""The recording as a lookup with these includes returns it, or None when the catalogue cannot answer the lookup."""
+		recording = self._recordings.get(recording_id)
+		if recording is None or not set(includes or []) <= RECORDING_LOOKUP_INCLUDES:
+			return None
+
+		if "releases" not in (includes or []):
+			return recording
+		return dict(recording, **{"release-list": list(self._releases_by_recording.get(recording_id, {}).values())})
+
+	def get_release(self, release_id: str, includes: List[str] = None) -> Dict[str, Any] or None:
+		"""The release as a lookup with these includes returns it, or None when the catalogue cannot answer the lookup."""
+		release = self._releases.get(release_id)
+		if release is None or not set(includes or []) <= RELEASE_LOOKUP_INCLUDES:
+			return None
+		return release
+
+	def match(self, file_stem: str) -> str or None:
+		"""
+		Finds the recording whose title appears in the file name, e.g. "03 - Artist - Title (Official Video)".
+		The longest title wins; anything else in the name must be numbers, the artist's name or noise words.
+		Returns None rather than guess when the rest of the name says more, or when several recordings share the title.
+		"""
+		tokens = tokenize(file_stem)
+		title: Tuple[str, ...] = ()
+		title_start = 0
+
+		for start in range(len(tokens)):
+			for end in range(len(tokens), start + len(title), -1):
+				if tuple(tokens[start:end]) in self._recordings_by_title:
+					title, title_start = tuple(tokens[start:end]), start
+					break
+
+		if not title:
+			return None
+
+		ignored_tokens = self._artist_tokens | FILE_NAME_NOISE_TOKENS
+		remaining_tokens = tokens[:title_start] + tokens[title_start + len(title):]
+		if any(not token.isdigit() and token not in ignored_tokens for token in remaining_tokens):
+			return None
+
+		candidates = self._recordings_by_title[title]
+		if len(candidates) > 1:
+			# Live versions, demos and the like carry a disambiguation; the plain recording is the one meant.
+			candidates = [recording_id for recording_id in candidates if not self._recordings[recording_id].get("disambiguation")]
+
+		return candidates[0] if len(candidates) == 1 else None
@@ -0,0 +1,30 @@
+import asyncio
+from typing import Any, Dict, List
+
+from src.musicbrainz.musicbrainz_client import MusicBrainzClient
+
+
+class AsyncMusicBrainzClient:
+	"""
+	Asyncio front-end for the `MusicBrainzClient`.
+	Requests run on worker threads over the same keep-alive pool, so coroutines can overlap their network waits
+	while the client still enforces the rate limit.
+	"""
+
+	def __init__(self, client: MusicBrainzClient):
+		self._client: MusicBrainzClient = client
+
+	async def get_recording_by_id(self, recording_id: str, includes: List[str] = None) -> Dict[str, Any]:
+		return await asyncio.to_thread(self._client.get_recording_by_id, recording_id, includes)
+
+	async def get_release_by_id(self, release_id: str, includes: List[str] = None) -> Dict[str, Any]:
+		return await asyncio.to_thread(self._client.get_release_by_id, release_id, includes)
+
+	async def search_recordings(self, query: str = "", limit: int = None, offset: int = None, **fields) -> Dict[str, Any]:
+		return await asyncio.to_thread(self._client.search_recordings, query, limit, offset, **fields)
+
+	async def browse_releases(self, includes: List[str] = None, limit: int = None, offset: int = None, **filters) -> Dict[str, Any]:
+		return await asyncio.to_thread(self._client.browse_releases, includes, limit, offset, **filters)
+
+	async def browse_recordings(self, includes: List[str] = None, limit: int = None, offset: int = None, **filters) -> Dict[str, Any]:
+		return await asyncio.to_thread(self._client.browse_recordings, includes, limit, offset, **filters)
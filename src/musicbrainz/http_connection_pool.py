@@ -0,0 +1,86 @@
+import http.client
+import queue
+import threading
+from typing import Dict, Tuple
+
+from py_common.logging import HoornLogger
+
+# Errors that mean a kept-alive connection was closed by the server while idle.
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.CannotSendRequest, BrokenPipeError, ConnectionResetError)
+
+
+class HTTPConnectionPool:
+	"""
+	Thread-safe pool of persistent (keep-alive) HTTP(S) connections to a single host.
+	Connections are handed out most-recently-used first, so the warmest connection gets reused.
+	"""
+
+	def __init__(self, logger: HoornLogger, host: str, port: int = None, use_https: bool = True, max_connections: int = 4, timeout: float = 30.0):
+		self._logger = logger
+		self._host: str = host
+		self._port: int = port
+		self._use_https: bool = use_https
+		self._timeout: float = timeout
+		self._idle_connections: queue.LifoQueue = queue.LifoQueue()
+		self._available: threading.BoundedSemaphore = threading.BoundedSemaphore(max_connections)
+		self._connections_opened: int = 0
+		self._lock: threading.Lock = threading.Lock()
+
+	@property
+	def connections_opened(self) -> int:
+		"""Total number of connections that had to be established (i.e. paid TCP/TLS setup)."""
+		return self._connections_opened
+
+	def request(self, method: str, path: str, headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+		"""
+		Performs a request over a pooled connection and returns the status, headers and body.
+		A request on a connection the server already closed is retried once on a fresh connection.
+		"""
+		with self._available:
+			connection, reused = self._acquire()
+
+			try:
+				response = self._send(connection, method, path, headers)
+			except STALE_CONNECTION_ERRORS:
+				connection.close()
+				if not reused:
+					raise
+				self._logger.debug(f"Pooled connection to {self._host} went stale, reconnecting.")
+				connection = self._open()
+				response = self._send(connection, method, path, headers)
+			except Exception:
+				connection.close()
+				raise
+
+			status, response_headers, body, keep_alive = response
+			if keep_alive:
+				self._idle_connections.put(connection)
+			else:
+				connection.close()
+
+			return status, response_headers, body
+
+	def close(self) -> None:
+		while not self._idle_connections.empty():
+			self._idle_connections.get_nowait().close()
+
+	def _acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+		try:
+			return self._idle_connections.get_nowait(), True
+		except queue.Empty:
+			return self._open(), False
+
+	def _open(self) -> http.client.HTTPConnection:
+		with self._lock:
+			self._connections_opened += 1
+
+		if self._use_https:
+			return http.client.HTTPSConnection(self._host, self._port, timeout=self._timeout)
+		return http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+
+	def _send(self, connection: http.client.HTTPConnection, method: str, path: str, headers: Dict[str, str]):
+		connection.request(method, path, headers=headers)
+		response = connection.getresponse()
+		body = response.read()
+		keep_alive = not response.will_close
+		return response.status, {key.lower(): value for key, value in response.getheaders()}, body, keep_alive
@@ -0,0 +1,160 @@
+import json
+import re
+import threading
+import time
+import urllib.error
+from typing import Any, Callable, Dict, List, TYPE_CHECKING
+from urllib.parse import urlencode
+
+import musicbrainzngs
+from py_common.logging import HoornLogger
+
+from src.constants import MUSICBRAINZ_HOST, MUSICBRAINZ_RATE_LIMIT_INTERVAL
+from src.musicbrainz.http_connection_pool import HTTPConnectionPool
+from src.musicbrainz.musicbrainz_json_adapter import MusicBrainzJSONAdapter
+
+if TYPE_CHECKING:
+	from src.musicbrainz.artist_catalogue import ArtistCatalogue
+
+USER_AGENT: str = "Music Organization Tool/0.0 ( https://github.com/LordMartron94/music-organization-tool )"
+LUCENE_SPECIAL: str = r'([+\-&|!(){}\[\]\^"~*?:\\\/])'
+RETRYABLE_STATUS_CODES = (429, 503)
+
+
+class MusicBrainzClient:
+	"""
+	Client for the MusicBrainz web service that keeps its HTTP connections alive between requests.
+	Mirrors the parts of the musicbrainzngs API this tool uses: results have the same shape,
+	and failures raise the same musicbrainzngs exceptions.
+
+	Lookups of recordings and releases held by an attached `ArtistCatalogue` are answered from it without a request.
+	Requests are spaced within this process; `share_rate_limit` spaces them together with other processes, e.g. queue workers.
+	"""
+
+	def __init__(self, logger: HoornLogger, host: str = MUSICBRAINZ_HOST, port: int = None, use_https: bool = True, rate_limit_interval: float = MUSICBRAINZ_RATE_LIMIT_INTERVAL, max_connections: int = 4, retries: int = 3):
+		self._logger = logger
+		self._pool: HTTPConnectionPool = HTTPConnectionPool(logger, host, port, use_https, max_connections)
+		self._adapter: MusicBrainzJSONAdapter = MusicBrainzJSONAdapter()
+		self._rate_limit_interval: float = rate_limit_interval
+		self._retries: int = retries
+		self._last_request_time: float = 0.0
+		self._rate_limit_lock: threading.Lock = threading.Lock()
+		self._shared_rate_limit: Callable[[float], None] or None = None
+		self._base_url: str = f"{'https' if use_https else 'http'}://{host}{f':{port}' if port else ''}"
+		self._catalogues: List["ArtistCatalogue"] = []
+
+	@property
+	def connection_pool(self) -> HTTPConnectionPool:
+		return self._pool
+
+	def get_recording_by_id(self, recording_id: str, includes: List[str] = None) -> Dict[str, Any]:
+		for catalogue in list(self._catalogues):
+			recording = catalogue.get_recording(recording_id, includes)
+			if recording is not None:
+				return {"recording": recording}
+
+		return self._adapter.adapt_entity("recording", self._get(f"recording/{recording_id}", includes))
+
+	def get_release_by_id(self, release_id: str, includes: List[str] = None) -> Dict[str, Any]:
+		for catalogue in list(self._catalogues):
+			release = catalogue.get_release(release_id, includes)
+			if release is not None:
+				return {"release": release}
+
+		return self._adapter.adapt_entity("release", self._get(f"release/{release_id}", includes))
+
+	def search_recordings(self, query: str = "", limit: int = None, offset: int = None, **fields) -> Dict[str, Any]:
+		return self._adapter.adapt_list("recording", self._search("recording", query, limit, offset, fields))
+
+	def browse_releases(self, includes: List[str] = None, limit: int = None, offset: int = None, **filters) -> Dict[str, Any]:
+		"""Browses the releases linked to an entity, e.g. `artist=<mbid>` or `track_artist=<mbid>`; at most 100 per page."""
+		return self._adapter.adapt_list("release", self._browse("release", includes, limit, offset, filters))
+
+	def browse_recordings(self, includes: List[str] = None, limit: int = None, offset: int = None, **filters) -> Dict[str, Any]:
+		"""Browses the recordings linked to an entity, e.g. `artist=<mbid>`; at most 100 per page."""
+		return self._adapter.adapt_list("recording", self._browse("recording", includes, limit, offset, filters))
+
+	def share_rate_limit(self, wait_for_turn: Callable[[float], None] or None) -> None:
+		"""Waits for the given function, called with the rate limit interval, before every request; None goes back to the limit of this process."""
+		self._shared_rate_limit = wait_for_turn
+
+	def attach_catalogue(self, catalogue: "ArtistCatalogue") -> None:
+		self._catalogues.append(catalogue)
+
+	def detach_catalogue(self, catalogue: "ArtistCatalogue") -> None:
+		if catalogue in self._catalogues:
+			self._catalogues.remove(catalogue)
+
+	def close(self) -> None:
+		self._pool.close()
+
+	def _search(self, entity: str, query: str, limit: int, offset: int, fields: Dict[str, str]) -> Dict[str, Any]:
+		# Same (non-strict) query construction as musicbrainzngs.
+		query_parts = [query] if query else []
+		for key, value in fields.items():
+			value = re.sub(LUCENE_SPECIAL, r"\\\1", str(value)).lower()
+			if value:
+				query_parts.append(f"{key}:({value})")
+
+		parameters: Dict[str, Any] = {"query": " ".join(query_parts).strip()}
+		if limit is not None:
+			parameters["limit"] = limit
+		if offset is not None:
+			parameters["offset"] = offset
+
+		return self._request(entity, parameters)
+
+	def _browse(self, entity: str, includes: List[str], limit: int, offset: int, filters: Dict[str, str]) -> Dict[str, Any]:
+		parameters: Dict[str, Any] = dict(filters)
+		if includes:
+			parameters["inc"] = "+".join(includes)
+		if limit is not None:
+			parameters["limit"] = limit
+		if offset is not None:
+			parameters["offset"] = offset
+
+		return self._request(entity, parameters)
+
+	def _get(self, path: str, includes: List[str] = None) -> Dict[str, Any]:
+		parameters = {"inc": "+".join(includes)} if includes else {}
+		return self._request(path, parameters)
+
+	def _request(self, path: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+		parameters = dict(parameters, fmt="json")
+		request_path = f"/ws/2/{path}?{urlencode(parameters)}"
+		headers = {"User-Agent": USER_AGENT, "Accept": "application/json", "Connection": "keep-alive"}
+
+		for attempt in range(self._retries + 1):
+			self._wait_for_rate_limit()
+
+			try:
+				status, response_headers, body = self._pool.request("GET", request_path, headers)
+			except OSError as e:
+				if attempt == self._retries:
+					raise musicbrainzngs.NetworkError(cause=e)
+				self._logger.warning(f"Network error requesting '{request_path}': {e}, retrying...")
+				continue
+
+			if status == 200:
+				return json.loads(body)
+
+			if status in RETRYABLE_STATUS_CODES and attempt < self._retries:
+				wait_time = float(response_headers.get("retry-after", 2 ** attempt))
+				self._logger.warning(f"MusicBrainz responded {status}, retrying in {wait_time} seconds...")
+				time.sleep(wait_time)
+				continue
+
+			cause = urllib.error.HTTPError(f"{self._base_url}{request_path}", status, body.decode("utf-8", errors="replace"), response_headers, None)
+			raise musicbrainzngs.ResponseError(cause=cause)
+
+	def _wait_for_rate_limit(self) -> None:
+		"""MusicBrainz allows roughly one request per second per client; space requests accordingly."""
+		with self._rate_limit_lock:
+			if self._shared_rate_limit is not None:
+				self._shared_rate_limit(self._rate_limit_interval)
+				return
+
+			wait_time = self._last_request_time + self._rate_limit_interval - time.monotonic()
+			if wait_time > 0:
+				time.sleep(wait_time)
+			self._last_request_time = time.monotonic()
@@ -0,0 +1,81 @@
+from typing import Any, Dict, List
+
+# JSON web service list keys and the names musicbrainzngs uses for them.
+LIST_KEYS: Dict[str, str] = {
+	"releases": "release-list",
+	"recordings": "recording-list",
+	"artists": "artist-list",
+	"release-groups": "release-group-list",
+	"media": "medium-list",
+	"tracks": "track-list",
+	"tags": "tag-list",
+	"genres": "genre-list",
+	"aliases": "alias-list",
+	"isrcs": "isrc-list",
+	"label-info": "label-info-list",
+}
+
+
+class MusicBrainzJSONAdapter:
+	"""
+	Converts MusicBrainz JSON web service responses into the dictionary shape musicbrainzngs produces from the XML service,
+	so code written against musicbrainzngs keeps working unchanged.
+	"""
+
+	def adapt_entity(self, entity: str, data: Dict[str, Any]) -> Dict[str, Any]:
+		"""Adapts a lookup result, e.g. `{'recording': {...}}` for `entity='recording'`."""
+		return {entity: self._adapt(data)}
+
+	def adapt_list(self, entity: str, data: Dict[str, Any]) -> Dict[str, Any]:
+		"""Adapts a search or browse result, e.g. `{'recording-list': [...], 'recording-count': 10}`."""
+		plural = f"{entity}s"
+		result: Dict[str, Any] = {
+			f"{entity}-list": [self._adapt(item) for item in data.get(plural, [])],
+			f"{entity}-count": data.get("count", data.get(f"{entity}-count", 0)),
+		}
+
+		if f"{entity}-offset" in data:
+			result[f"{entity}-offset"] = data[f"{entity}-offset"]
+
+		return result
+
+	def _adapt(self, value: Any) -> Any:
+		if isinstance(value, dict):
+			return self._adapt_dict(value)
+		if isinstance(value, list):
+			return [self._adapt(item) for item in value]
+		if isinstance(value, bool):
+			return value
+		if isinstance(value, (int, float)):
+			# The XML service is all text, musicbrainzngs hands out numbers as strings.
+			return str(value)
+		return value
+
+	def _adapt_dict(self, data: Dict[str, Any]) -> Dict[str, Any]:
+		adapted: Dict[str, Any] = {}
+
+		for key, value in data.items():
+			# musicbrainzngs leaves out elements the XML does not contain.
+			if value is None or value == "":
+				continue
+
+			if key == "artist-credit":
+				adapted[key] = self._adapt_artist_credit(value)
+				adapted["artist-credit-phrase"] = "".join(credit.get("name", "") + credit.get("joinphrase", "") for credit in value)
+			elif key == "score":
+				adapted["ext:score"] = str(value)
+			else:
+				adapted[LIST_KEYS.get(key, key)] = self._adapt(value)
+
+		return adapted
+
+	def _adapt_artist_credit(self, credits: List[Dict[str, Any]]) -> List[Any]:
+		# musicbrainzngs interleaves the credits with their join phrases as plain strings.
+		adapted: List[Any] = []
+
+		for credit in credits:
+			adapted.append({"artist": self._adapt(credit.get("artist", {})), "name": credit.get("name", "")})
+			if credit.get("joinphrase"):
+				adapted.append(credit["joinphrase"])
+
+		return adapted
@@ -0,0 +1,202 @@
+import inspect
+import json
+import threading
+from collections.abc import KeysView
+from enum import Enum
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+import pydantic
+from py_common.logging import HoornLogger
+
+from src.constants import SERVER_HOST, SERVER_PORT
+from src.downloading.download_model import DownloadModel
+from src.genre_detection.genre_algorithm import GenreAlgorithm
+from src.metadata.metadata_api import MetadataAPI
+from src.metadata.metadata_manipulator import MetadataKey
+
+# JSON-RPC 2.0 error codes.
+PARSE_ERROR: int = -32700
+INVALID_REQUEST: int = -32600
+METHOD_NOT_FOUND: int = -32601
+INVALID_PARAMS: int = -32602
+INTERNAL_ERROR: int = -32603
+
+
+class InvalidParamsError(ValueError):
+	"""Raised by a method for parameters it cannot work with, answered with INVALID_PARAMS instead of INTERNAL_ERROR."""
+
+
+def to_json_value(value: Any) -> Any:
+	"""Converts the return values of the API (paths, enums, pydantic models) into plain JSON values."""
+	if isinstance(value, pydantic.BaseModel):
+		return value.model_dump(mode="json")
+	if isinstance(value, Enum):
+		return value.value
+	if isinstance(value, Path):
+		return str(value)
+	if isinstance(value, dict):
+		return {to_json_value(key): to_json_value(item) for key, item in value.items()}
+	if isinstance(value, (list, tuple, set, KeysView)):
+		return [to_json_value(item) for item in value]
+	return value
+
+
+class MetadataServer:
+	"""
+	Resident server that keeps one warm `MetadataAPI` and `GenreAlgorithm` (with their connections, indexes and caches)
+	and serves their operations as JSON-RPC 2.0 over HTTP on localhost.
+	Calls are executed one at a time, like they would be in the interactive CLI.
+
+	Only the non-interactive operations are exposed; the ones that prompt for input stay CLI-only.
+	"""
+
+	def __init__(self, logger: HoornLogger, metadata_api: MetadataAPI, genre_algorithm: GenreAlgorithm, host: str = SERVER_HOST, port: int = SERVER_PORT):
+		self._logger = logger
+		self._metadata_api: MetadataAPI = metadata_api
+		self._genre_algorithm: GenreAlgorithm = genre_algorithm
+		self._host: str = host
+		self._port: int = port
+		self._call_lock: threading.Lock = threading.Lock()
+		self._server: ThreadingHTTPServer or None = None
+
+		api = metadata_api
+		self._methods: Dict[str, Callable[..., Any]] = {
+			"ping": lambda: "pong",
+			"get_all_metadata": lambda file_path: api.get_all_metadata(Path(file_path)),
+			"get_metadata_keys": lambda file_path: api.get_metadata_keys(Path(file_path)),
+			"get_tag_write_report": lambda: api.get_tag_write_report(),
+			"find_in_library": lambda query, limit=25: api.find_in_library(query, limit),
+			"analyze_loudness": lambda directory_path: api.analyze_loudness(Path(directory_path)),
+			"update_metadata_from_dict": lambda file_path, metadata: api.update_metadata_from_dict(Path(file_path), {MetadataKey(key): value for key, value in metadata.items()}),
+			"export_tag_manifest": lambda directory_path, manifest_path: api.export_tag_manifest(Path(directory_path), Path(manifest_path)),
+			"apply_tag_manifest": lambda manifest_path: api.apply_tag_manifest(Path(manifest_path)),
+			"make_description_compatible_for_library": lambda directory_path: api.make_description_compatible_for_library(Path(directory_path)),
+			"clear_genres": lambda music_directory: api.clear_genres(Path(music_directory)),
+			"clear_dates": lambda music_directory: api.clear_dates(Path(music_directory)),
+			"populate_metadata_from_musicbrainz_album": lambda directory_path, album_id: api.populate_metadata_from_musicbrainz_album(Path(directory_path), album_id),
+			"populate_metadata_from_musicbrainz_for_file": self._populate_metadata_from_musicbrainz_for_file,
+			"organize_music_files": lambda directory_path, organized_path: api.organize_music_files(Path(directory_path), Path(organized_path)),
+			"organize_music_files_staged": lambda directory_path, organized_path: api.organize_music_files_staged(Path(directory_path), Path(organized_path)),
+			"organize_files": lambda music_files, organized_path: api.organize_files([Path(file) for file in music_files], Path(organized_path)),
+			"recheck_missing_metadata": lambda organized_path: api.recheck_missing_metadata(Path(organized_path)),
+			"rescan_entire_library": lambda organized_path, force_deep_scan=False: api.rescan_entire_library(Path(organized_path), force_deep_scan),
+			"enqueue_jobs": lambda kind, path, force_deep_scan=False: api.enqueue_jobs(kind, Path(path), force_deep_scan),
+			"get_job_queue_status": lambda: api.get_job_queue_status(),
+			"get_genre_data": lambda mbid, album_id=None: genre_algorithm.get_genre_data(mbid, album_id),
+		}
+
+	def _populate_metadata_from_musicbrainz_for_file(self, url: str, path: str, recording_id: str, release_id: str, genre: str = None, subgenre: str = None) -> None:
+		# Without a release ID the populater asks on stdin which release to use, which would block the server.
+		if not recording_id or not release_id:
+			raise InvalidParamsError("Both recording_id and release_id are required; releases can only be chosen interactively in the CLI.")
+
+		download_model = DownloadModel(url=url, path=Path(path), recording_id=recording_id, release_id=release_id, genre=genre, subgenre=subgenre)
+		self._metadata_api.populate_metadata_from_musicbrainz_for_file(download_model)
+
+	@property
+	def method_names(self):
+		return sorted(self._methods.keys())
+
+	@property
+	def server_address(self):
+		return self._server.server_address if self._server is not None else (self._host, self._port)
+
+	def start(self) -> ThreadingHTTPServer:
+		"""Binds the socket; call `serve_forever` (or run it on a thread) afterwards."""
+		server = self
+
+		class Handler(MetadataServerRequestHandler):
+			metadata_server = server
+
+		self._server = ThreadingHTTPServer((self._host, self._port), Handler)
+		return self._server
+
+	def serve_forever(self) -> None:
+		if self._server is None:
+			self.start()
+
+		self._logger.info(f"Serving the metadata API on http://{self.server_address[0]}:{self.server_address[1]}/. Press Ctrl+C to stop.")
+		try:
+			self._server.serve_forever()
+		except KeyboardInterrupt:
+			self._logger.info("Stopped serving.")
+		finally:
+			self._server.server_close()
+
+	def shutdown(self) -> None:
+		if self._server is not None:
+			self._server.shutdown()
+			self._server.server_close()
+
+	def handle(self, request: Any) -> Dict[str, Any] or None:
+		"""Handles a single decoded JSON-RPC request object and returns the response object (None for notifications)."""
+		if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or not isinstance(request.get("method"), str):
+			return self._error(None, INVALID_REQUEST, "Invalid Request")
+
+		request_id = request.get("id")
+		method = self._methods.get(request["method"])
+		if method is None:
+			return self._error(request_id, METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+
+		params = request.get("params", {})
+		try:
+			arguments = inspect.signature(method).bind(*params) if isinstance(params, list) else inspect.signature(method).bind(**params)
+		except TypeError as e:
+			return self._error(request_id, INVALID_PARAMS, str(e))
+
+		try:
+			with self._call_lock:
+				result = method(*arguments.args, **arguments.kwargs)
+		except InvalidParamsError as e:
+			return self._error(request_id, INVALID_PARAMS, str(e))
+		except Exception as e:
+			self._logger.error(f"Error while handling '{request['method']}': {e}")
+			return self._error(request_id, INTERNAL_ERROR, str(e))
+
+		if "id" not in request:
+			return None
+
+		return {"jsonrpc": "2.0", "id": request_id, "result": to_json_value(result)}
+
+	@staticmethod
+	def _error(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+		return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+class MetadataServerRequestHandler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"
+	disable_nagle_algorithm = True
+	metadata_server: MetadataServer = None
+
+	def do_POST(self) -> None:
+		body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+		try:
+			request = json.loads(body)
+		except ValueError:
+			return self._send(MetadataServer._error(None, PARSE_ERROR, "Parse error"))
+
+		if isinstance(request, list):
+			responses = [response for response in map(self.metadata_server.handle, request) if response is not None]
+			return self._send(responses if responses else None)
+
+		self._send(self.metadata_server.handle(request))
+
+	def _send(self, payload: Any) -> None:
+		if payload is None:
+			self.send_response(204)
+			self.send_header("Content-Length", "0")
+			self.end_headers()
+			return
+
+		body = json.dumps(payload).encode("utf-8")
+		self.send_response(200)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args) -> None:
+		pass
@@ -0,0 +1,61 @@
+"""
+Thin client for the resident `MetadataServer`.
+Only imports the standard library, so a scripted call costs a few milliseconds instead of a cold start of the tool.
+
+Usage: python -m src.server.metadata_server_client <method> ['<json params>']
+"""
+import http.client
+import itertools
+import json
+import sys
+from typing import Any
+
+from src.constants import SERVER_HOST, SERVER_PORT
+
+
+class MetadataServerError(Exception):
+	"""Raised when the server answers a call with a JSON-RPC error."""
+
+	def __init__(self, code: int, message: str):
+		super().__init__(f"{message} (code {code})")
+		self.code: int = code
+
+
+class MetadataServerClient:
+	"""Calls operations on a running `MetadataServer` over a single keep-alive connection."""
+
+	def __init__(self, host: str = SERVER_HOST, port: int = SERVER_PORT, timeout: float = None):
+		self._connection: http.client.HTTPConnection = http.client.HTTPConnection(host, port, timeout=timeout)
+		self._ids = itertools.count(1)
+
+	def call(self, method: str, **params) -> Any:
+		request_id = next(self._ids)
+		body = json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}).encode("utf-8")
+
+		self._connection.request("POST", "/", body, {"Content-Type": "application/json"})
+		response = json.loads(self._connection.getresponse().read())
+
+		if "error" in response:
+			raise MetadataServerError(response["error"]["code"], response["error"]["message"])
+
+		return response["result"]
+
+	def close(self) -> None:
+		self._connection.close()
+
+
+if __name__ == "__main__":
+	if len(sys.argv) < 2:
+		print(__doc__.strip())
+		sys.exit(2)
+
+	client = MetadataServerClient()
+	try:
+		result = client.call(sys.argv[1], **(json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}))
+	except MetadataServerError as e:
+		print(e, file=sys.stderr)
+		sys.exit(1)
+	finally:
+		client.close()
+
+	print(json.dumps(result, indent=2))
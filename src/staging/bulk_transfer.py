@@ -0,0 +1,106 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+import pydantic
+from py_common.logging import HoornLogger
+
+from src.constants import STAGING_TRANSFER_WORKERS, STAGING_VERIFY_CHECKSUMS
+from src.staging.remote_directory_cache import RemoteDirectoryCache
+
+TRANSFER_CHUNK_SIZE: int = 1024 * 1024
+PARTIAL_SUFFIX: str = ".part"
+
+
+class TransferReport(pydantic.BaseModel):
+	transferred: int = 0
+	failed: int = 0
+	replaced: int = 0
+	bytes_transferred: int = 0
+
+
+class BulkTransfer:
+	"""
+	Copies many files to a (network) destination in parallel.
+	Each file is written under a temporary name, verified (size, and optionally a SHA-256 of the written copy)
+	and only then renamed into place, after which the source is removed. A failed file stays at its source for the next run.
+	"""
+
+	def __init__(self, logger: HoornLogger, directory_cache: RemoteDirectoryCache, max_workers: int = STAGING_TRANSFER_WORKERS, verify_checksums: bool = STAGING_VERIFY_CHECKSUMS):
+		self._logger = logger
+		self._directory_cache: RemoteDirectoryCache = directory_cache
+		self._max_workers: int = max_workers
+		self._verify_checksums: bool = verify_checksums
+
+	def transfer(self, transfers: List[Tuple[Path, Path]], on_transferred: Callable[[Path, Path], None] = None) -> TransferReport:
+		report = TransferReport()
+
+		# Create the destination directories up-front and sequentially, they are shared between files.
+		for directory in sorted({destination.parent for _, destination in transfers}):
+			self._directory_cache.ensure_directory(directory)
+
+		with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+			futures = {executor.submit(self._transfer_file, source, destination): (source, destination) for source, destination in transfers}
+
+			for future in as_completed(futures):
+				source, destination = futures[future]
+				try:
+					size, replaced = future.result()
+				except (OSError, ValueError) as e:
+					self._logger.error(f"Transferring '{source}' to '{destination}' failed: {e}")
+					report.failed += 1
+					continue
+
+				report.transferred += 1
+				report.replaced += int(replaced)
+				report.bytes_transferred += size
+				self._directory_cache.add(destination)
+
+				if on_transferred is not None:
+					on_transferred(source, destination)
+
+		return report
+
+	def _transfer_file(self, source: Path, destination: Path) -> Tuple[int, bool]:
+		partial = destination.with_name(destination.name + PARTIAL_SUFFIX)
+		replaced = self._directory_cache.exists(destination)
+
+		try:
+			source_hash = self._copy(source, partial)
+			self._verify(source, partial, source_hash)
+			os.replace(partial, destination)
+		except BaseException:
+			partial.unlink(missing_ok=True)
+			raise
+
+		size = source.stat().st_size
+		source.unlink()
+		return size, replaced
+
+	@staticmethod
+	def _copy(source: Path, target: Path) -> str:
+		digest = hashlib.sha256()
+
+		with open(source, "rb") as reader, open(target, "wb") as writer:
+			while chunk := reader.read(TRANSFER_CHUNK_SIZE):
+				digest.update(chunk)
+				writer.write(chunk)
+
+		return digest.hexdigest()
+
+	def _verify(self, source: Path, copy: Path, source_hash: str) -> None:
+		if copy.stat().st_size != source.stat().st_size:
+			raise ValueError("size mismatch after copy")
+
+		if not self._verify_checksums:
+			return
+
+		digest = hashlib.sha256()
+		with open(copy, "rb") as reader:
+			while chunk := reader.read(TRANSFER_CHUNK_SIZE):
+				digest.update(chunk)
+
+		if digest.hexdigest() != source_hash:
+			raise ValueError("checksum mismatch after copy")
@@ -0,0 +1,43 @@
+from pathlib import Path
+from typing import List, Tuple
+
+from py_common.logging import HoornLogger
+
+from src.constants import STAGING_PATH
+from src.handlers.library_file_handler import LibraryFileHandler
+from src.staging.bulk_transfer import BulkTransfer, TransferReport
+from src.staging.remote_directory_cache import RemoteDirectoryCache
+
+
+class LibraryStager:
+	"""
+	Staging mode for libraries on a network share.
+	Incoming files are read and arranged in a local staging tree, so all the small I/O stays local,
+	then the whole tree is pushed to the share in one parallel, verified bulk transfer.
+	"""
+
+	def __init__(self, logger: HoornLogger, library_file_handler: LibraryFileHandler, staging_path: Path = STAGING_PATH):
+		self._logger = logger
+		self._library_file_handler: LibraryFileHandler = library_file_handler
+		self._staging_path: Path = staging_path
+
+	def organize(self, directory_path: Path, organized_path: Path) -> TransferReport:
+		"""Organizes the music files in directory_path into the staging tree, then transfers the tree to organized_path."""
+		self._staging_path.mkdir(parents=True, exist_ok=True)
+		self._library_file_handler.organize_files(self._library_file_handler.get_music_files(directory_path), self._staging_path)
+		self._library_file_handler.remove_empty_directories(directory_path)
+		return self.transfer(organized_path)
+
+	def transfer(self, organized_path: Path) -> TransferReport:
+		"""Transfers everything in the staging tree (including leftovers of interrupted runs) to organized_path."""
+		staged_files = self._library_file_handler.get_music_files(self._staging_path) if self._staging_path.is_dir() else []
+		transfers: List[Tuple[Path, Path]] = [(file, organized_path.joinpath(file.relative_to(self._staging_path))) for file in staged_files]
+
+		directory_cache = RemoteDirectoryCache(self._logger)
+		bulk_transfer = BulkTransfer(self._logger, directory_cache)
+		report = bulk_transfer.transfer(transfers, on_transferred=self._library_file_handler.library_index.rename)
+
+		self._library_file_handler.remove_empty_directories(self._staging_path)
+		self._logger.info(f"Transferred {report.transferred} file(s) ({report.bytes_transferred / 2 ** 20:.1f} MiB, {report.replaced} replaced) "
+		                  f"to {organized_path} with {directory_cache.remote_listings} remote directory listing(s); {report.failed} failed and stay staged.")
+		return report
@@ -0,0 +1,53 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Set
+
+from py_common.logging import HoornLogger
+
+
+class RemoteDirectoryCache:
+	"""
+	Caches the directory listings of a slow (network share) directory tree.
+	Every directory is listed at most once per run; directories and files created through the cache are added to it,
+	so existence checks and `mkdir`s do not need a round-trip to the share.
+	"""
+
+	def __init__(self, logger: HoornLogger):
+		self._logger = logger
+		self._lock: threading.RLock = threading.RLock()
+		self._listings: Dict[Path, Set[str]] = {}
+		self.remote_listings: int = 0
+
+	def list(self, directory: Path) -> Set[str]:
+		with self._lock:
+			listing = self._listings.get(directory)
+			if listing is not None:
+				return listing
+
+			try:
+				with os.scandir(directory) as entries:
+					listing = {entry.name for entry in entries}
+			except (FileNotFoundError, NotADirectoryError):
+				listing = set()
+
+			self.remote_listings += 1
+			self._listings[directory] = listing
+			return listing
+
+	def exists(self, path: Path) -> bool:
+		return path.name in self.list(path.parent)
+
+	def ensure_directory(self, directory: Path) -> None:
+		with self._lock:
+			if directory.parent == directory or self.exists(directory):
+				return
+
+			self.ensure_directory(directory.parent)
+			directory.mkdir(exist_ok=True)
+			self.add(directory)
+			self._listings[directory] = set()
+
+	def add(self, path: Path) -> None:
+		with self._lock:
+			self.list(path.parent).add(path.name)
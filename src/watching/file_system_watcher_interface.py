@@ -0,0 +1,21 @@
+from abc import abstractmethod
+from pathlib import Path
+from typing import Set
+
+
+class FileSystemWatcherInterface:
+	def __init__(self, is_child: bool = False):
+		if is_child:
+			return
+
+		raise NotImplementedError("You cannot instantiate an interface. Use a concrete implementation.")
+
+	@abstractmethod
+	def poll(self, timeout: float) -> Set[Path]:
+		"""Waits up to `timeout` seconds and returns the files that were created or changed since the last call."""
+		raise NotImplementedError("You are attempting to call the method of an interface directly, use the concrete implementation.")
+
+	@abstractmethod
+	def close(self) -> None:
+		"""Releases the resources held by the watcher."""
+		raise NotImplementedError("You are attempting to call the method of an interface directly, use the concrete implementation.")
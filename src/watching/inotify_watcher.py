@@ -0,0 +1,119 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+from pathlib import Path
+from typing import Dict, List, Set
+
+from py_common.logging import HoornLogger
+
+from src.watching.file_system_watcher_interface import FileSystemWatcherInterface
+
+IN_MODIFY: int = 0x00000002
+IN_CLOSE_WRITE: int = 0x00000008
+IN_MOVED_TO: int = 0x00000080
+IN_CREATE: int = 0x00000100
+IN_Q_OVERFLOW: int = 0x00004000
+IN_IGNORED: int = 0x00008000
+IN_ISDIR: int = 0x40000000
+
+IN_NONBLOCK: int = 0o4000
+IN_CLOEXEC: int = 0o2000000
+
+WATCH_MASK: int = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+EVENT_HEADER = struct.Struct("iIII")
+READ_BUFFER_SIZE: int = 64 * 1024
+
+
+class InotifyWatcher(FileSystemWatcherInterface):
+	"""
+	Recursive directory watcher on top of the Linux inotify API (through ctypes, no extra dependency).
+	New subdirectories are watched as soon as they are created.
+	"""
+
+	def __init__(self, logger: HoornLogger, directories: List[Path]):
+		super().__init__(is_child=True)
+		self._logger = logger
+		self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+		self._fd: int = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+		if self._fd < 0:
+			raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+		self._watches: Dict[int, Path] = {}
+		for directory in directories:
+			self._watch_tree(directory)
+
+		self._logger.debug(f"Watching {len(self._watches)} directories through inotify.")
+
+	def _watch_tree(self, directory: Path) -> Set[Path]:
+		"""Watches the directory and all of its subdirectories, returning the files already inside them."""
+		files: Set[Path] = set()
+
+		for root, _, names in os.walk(directory):
+			self._watch(Path(root))
+			files.update(Path(root, name) for name in names)
+
+		return files
+
+	def _watch(self, directory: Path) -> None:
+		descriptor = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+		if descriptor < 0:
+			self._logger.warning(f"Could not watch {directory}: {os.strerror(ctypes.get_errno())}")
+			return
+
+		self._watches[descriptor] = directory
+
+	def poll(self, timeout: float) -> Set[Path]:
+		changed: Set[Path] = set()
+		readable, _, _ = select.select([self._fd], [], [], timeout)
+
+		while readable:
+			try:
+				buffer = os.read(self._fd, READ_BUFFER_SIZE)
+			except BlockingIOError:
+				break
+
+			changed.update(self._parse_events(buffer))
+			readable, _, _ = select.select([self._fd], [], [], 0)
+
+		return changed
+
+	def _parse_events(self, buffer: bytes) -> Set[Path]:
+		changed: Set[Path] = set()
+		offset = 0
+
+		while offset < len(buffer):
+			descriptor, mask, _, name_length = EVENT_HEADER.unpack_from(buffer, offset)
+			offset += EVENT_HEADER.size
+			name = buffer[offset:offset + name_length].rstrip(b"\x00")
+			offset += name_length
+
+			if mask & IN_Q_OVERFLOW:
+				self._logger.warning("The inotify event queue overflowed, some changes may be missed until the next event.")
+				continue
+
+			if mask & IN_IGNORED:
+				self._watches.pop(descriptor, None)
+				continue
+
+			directory = self._watches.get(descriptor)
+			if directory is None or not name:
+				continue
+
+			path = directory.joinpath(os.fsdecode(name))
+			if mask & IN_ISDIR:
+				# Files may have landed in the new directory before the watch was added.
+				if mask & (IN_CREATE | IN_MOVED_TO):
+					changed.update(self._watch_tree(path))
+				continue
+
+			changed.add(path)
+
+		return changed
+
+	def close(self) -> None:
+		if self._fd >= 0:
+			os.close(self._fd)
+			self._fd = -1
@@ -0,0 +1,55 @@
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from py_common.logging import HoornLogger
+
+from src.watching.file_system_watcher_interface import FileSystemWatcherInterface
+
+
+class PollingWatcher(FileSystemWatcherInterface):
+	"""
+	Fallback watcher for platforms or file systems without inotify (Windows, network shares).
+	Compares the size and modification time of every file against the previous scan.
+	"""
+
+	def __init__(self, logger: HoornLogger, directories: List[Path], interval: float):
+		super().__init__(is_child=True)
+		self._logger = logger
+		self._directories: List[Path] = directories
+		self._interval: float = interval
+		self._snapshot: Dict[Path, Tuple[int, float]] = self._scan()
+		self._last_scan: float = time.monotonic()
+
+	def _scan(self) -> Dict[Path, Tuple[int, float]]:
+		snapshot: Dict[Path, Tuple[int, float]] = {}
+
+		for directory in self._directories:
+			for root, _, names in os.walk(directory):
+				for name in names:
+					path = Path(root, name)
+					try:
+						stat = path.stat()
+					except OSError:
+						continue
+					snapshot[path] = (stat.st_size, stat.st_mtime)
+
+		return snapshot
+
+	def poll(self, timeout: float) -> Set[Path]:
+		remaining = self._interval - (time.monotonic() - self._last_scan)
+		if remaining > timeout:
+			time.sleep(timeout)
+			return set()
+
+		time.sleep(max(remaining, 0))
+		snapshot = self._scan()
+		self._last_scan = time.monotonic()
+
+		changed = {path for path, signature in snapshot.items() if self._snapshot.get(path) != signature}
+		self._snapshot = snapshot
+		return changed
+
+	def close(self) -> None:
+		self._snapshot = {}
@@ -0,0 +1,47 @@
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+class StabilityTracker:
+	"""
+	Debounces file events: a file is only handed out once it has seen no events
+	and kept the same size and modification time for `settle_seconds`.
+	"""
+
+	def __init__(self, settle_seconds: float):
+		self._settle_seconds: float = settle_seconds
+		self._pending: Dict[Path, Tuple[float, Optional[Tuple[int, float]]]] = {}
+
+	def __len__(self) -> int:
+		return len(self._pending)
+
+	def touch(self, path: Path) -> None:
+		self._pending[path] = (time.monotonic(), self._signature(path))
+
+	def pop_stable(self) -> List[Path]:
+		now = time.monotonic()
+		stable: List[Path] = []
+
+		for path, (last_seen, signature) in list(self._pending.items()):
+			if now - last_seen < self._settle_seconds:
+				continue
+
+			current = self._signature(path)
+			if current is None:
+				del self._pending[path]  # Removed or renamed before it settled.
+			elif current == signature:
+				del self._pending[path]
+				stable.append(path)
+			else:
+				self._pending[path] = (now, current)
+
+		return stable
+
+	@staticmethod
+	def _signature(path: Path) -> Optional[Tuple[int, float]]:
+		try:
+			stat = path.stat()
+			return stat.st_size, stat.st_mtime
+		except OSError:
+			return None
@@ -0,0 +1,100 @@
+import sys
+from pathlib import Path
+from typing import List, Set
+
+from py_common.logging import HoornLogger
+
+from src.constants import SUPPORTED_MUSIC_EXTENSIONS, WATCH_SETTLE_SECONDS, WATCH_POLL_INTERVAL
+from src.downloading.download_ledger import DownloadLedger
+from src.metadata.metadata_api import MetadataAPI
+from src.metadata.metadata_manipulator import MetadataKey
+from src.watching.file_system_watcher_interface import FileSystemWatcherInterface
+from src.watching.inotify_watcher import InotifyWatcher
+from src.watching.polling_watcher import PollingWatcher
+from src.watching.stability_tracker import StabilityTracker
+
+
+class WatchFolderDaemon:
+	"""
+	Long-running watch mode that processes new downloads as they arrive, instead of waiting for a manual `md`/`organize`.
+
+	Files are debounced until they are stable, tagged from the IDs in the download ledger when they are not tagged yet,
+	and then only those files are organized into the library. Downloads the ledger cannot tag and whose metadata is
+	incomplete stay where they are, for the interactive `md`. Files whose size and modification time match the library
+	index are skipped: those are the daemon's own moves and tag writes coming back as events.
+	No directory is walked after start-up (except by the polling fallback).
+	"""
+
+	def __init__(self, logger: HoornLogger, metadata_api: MetadataAPI, settle_seconds: float = WATCH_SETTLE_SECONDS, poll_interval: float = WATCH_POLL_INTERVAL):
+		self._logger = logger
+		self._metadata_api: MetadataAPI = metadata_api
+		self._ledger: DownloadLedger = DownloadLedger(logger)
+		self._settle_seconds: float = settle_seconds
+		self._poll_interval: float = poll_interval
+
+	def run(self, download_path: Path, organized_path: Path, watch_library: bool = False) -> None:
+		directories: List[Path] = [download_path, organized_path] if watch_library else [download_path]
+		watcher: FileSystemWatcherInterface = self._create_watcher(directories)
+		tracker: StabilityTracker = StabilityTracker(self._settle_seconds)
+
+		self._logger.info(f"Watching {', '.join(str(directory) for directory in directories)} for changes. Press Ctrl+C to stop.")
+
+		try:
+			while True:
+				for path in self._filter_music_files(watcher.poll(timeout=min(self._settle_seconds, 1.0))):
+					tracker.touch(path)
+
+				stable = tracker.pop_stable()
+				if stable:
+					self._process(stable, download_path, organized_path)
+		except KeyboardInterrupt:
+			self._logger.info("Stopped watching.")
+		finally:
+			watcher.close()
+
+	def _create_watcher(self, directories: List[Path]) -> FileSystemWatcherInterface:
+		if sys.platform.startswith("linux"):
+			try:
+				return InotifyWatcher(self._logger, directories)
+			except (OSError, AttributeError) as e:
+				self._logger.warning(f"Inotify is unavailable ({e}), falling back to polling.")
+
+		return PollingWatcher(self._logger, directories, self._poll_interval)
+
+	@staticmethod
+	def _filter_music_files(paths: Set[Path]) -> List[Path]:
+		return [path for path in paths if path.suffix.lower() in SUPPORTED_MUSIC_EXTENSIONS]
+
+	def _process(self, files: List[Path], download_path: Path, organized_path: Path) -> None:
+		self._logger.info(f"Processing {len(files)} new or changed file(s).")
+		self._ledger.reload()
+
+		files_to_organize: List[Path] = []
+		for file in files:
+			if not file.exists() or self._metadata_api.is_unchanged_since_indexed(file):
+				continue
+
+			if not file.is_relative_to(download_path) or self._tag_from_ledger(file) or self._metadata_api.has_complete_metadata(file):
+				files_to_organize.append(file)
+			else:
+				self._logger.info(f"Leaving {file.name} in place: it has no ledger entry with both MusicBrainz IDs to tag it from, run 'md' on it.")
+
+		if files_to_organize:
+			self._metadata_api.organize_files(files_to_organize, organized_path)
+
+	def _tag_from_ledger(self, file: Path) -> bool:
+		"""Tags a download from the IDs in the ledger; returns whether the file carries the ledger's recording afterwards."""
+		download_model = self._ledger.get_by_path(file)
+		if download_model is None or not download_model.recording_id:
+			return False
+
+		metadata = self._metadata_api.get_all_metadata(file)
+		if metadata.get(MetadataKey.MusicBrainzRecordingID) == download_model.recording_id:
+			return True  # Already tagged, e.g. by download-and-md.
+
+		# Without a release ID the populater asks on stdin which release to use, which would stall the daemon.
+		if not download_model.release_id:
+			return False
+
+		self._metadata_api.populate_metadata_from_musicbrainz_for_file(download_model)
+		return self._metadata_api.get_all_metadata(file).get(MetadataKey.MusicBrainzRecordingID) == download_model.recording_id